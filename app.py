@@ -1,386 +1,80 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, send_file
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, send_file, Response
 from flask_session import Session
-import pandas as pd
 import os
+import logging
 from datetime import datetime, timedelta
 import re
 import time
 import io
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from werkzeug.utils import secure_filename
-from scraper import BEUResultScraper
+from scraper import BEUResultScraper, merge_attempts
+from metrics import REGISTRY, STUDENT_LOOKUP_SECONDS, CACHE_HITS, CACHE_MISSES
+from jobs import JOBS, worker_id
+from profiling import PhaseTimeline, JobProfiler
+from result_cache import ResultCache
+from warehouse import ResultWarehouse, split_registration_number
+from watcher import watcher_from_env
+from rank_index import RankIndex, board_key
+from snapshots import SnapshotStore, COHORT_VIEWS
+from preview import PreviewStore, job_sources, save_sources
+from processor import (
+    BRANCH_CODES, COLLEGE_CODE, COLLEGE_NAMES, BRANCH_FULL_NAMES, ResultProcessor, read_registration_csv,
+    resolve_branch_code, registration_groups, plan_semesters, select_semester_links, no_matching_semesters_error,
+    export_results, continuation_token, resume_spec
+)
+
+# Levelled logging; set BEU_LOG_LEVEL=DEBUG for per-student parse details or WARNING to silence progress
+logging.basicConfig(
+    level=os.environ.get('BEU_LOG_LEVEL', 'INFO').upper(),
+    format='%(asctime)s %(levelname)s %(name)s: %(message)s'
+)
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'beu-results-automation-2024'
 app.config['SESSION_TYPE'] = 'filesystem'
 Session(app)
 
-# Branch codes mapping
-BRANCH_CODES = {
-    'Electronics Engineering (VLSI)': '159',
-    'Computer Science & Engineering (CSE)': '105',
-    'Electrical & Electronics Engineering (EEE)': '110',
-    'Civil Engineering': '101',
-    'Mining Engineering': '113',
-    'Mechanical Engineering': '102'
-}
-
-# College code (constant)
-COLLEGE_CODE = '124'
-
-# College code to name mapping
-COLLEGE_NAMES = {
-    '124': 'Sher Shah Engineering College'
-}
-
-# Branch code to full name mapping
-BRANCH_FULL_NAMES = {
-    '159': 'Electronics Engineering (VLSI)',
-    '105': 'Computer Science & Engineering (CSE)',
-    '110': 'Electrical & Electronics Engineering (EEE)',
-    '101': 'Civil Engineering',
-    '113': 'Mining Engineering',
-    '102': 'Mechanical Engineering'
-}
-
 # Login credentials
 VALID_USERNAME = 'Result@SEC'
 VALID_PASSWORD = 'SEC@Result12#'
 
-class ResultProcessor:
-    def __init__(self):
-        pass
-        
-    def get_available_semesters(self, admission_year):
-        """Get available semesters based on admission year and current date"""
-        current_year = datetime.now().year
-        current_month = datetime.now().month
-        
-        # Calculate how many semesters should be available
-        years_passed = current_year - admission_year
-        
-        # Assuming 2 semesters per year, and considering current month
-        if current_month >= 7:  # After July, odd semester results are usually out
-            available_semesters = (years_passed * 2) + 1
-        else:  # Before July, even semester results from previous year
-            available_semesters = years_passed * 2
-        
-        # Cap at 8 semesters maximum
-        available_semesters = min(available_semesters, 8)
-        
-        return list(range(1, available_semesters + 1))
-    
-    def convert_to_dataframe(self, results_data):
-        """Convert scraped results to pandas DataFrame"""
-        df_data = []
-        
-        for result in results_data:
-            if result.get('error'):
-                # Add error entries
-                row = {
-                    'Registration Number': result['registration_number'],
-                    'Name': 'ERROR',
-                    'Semester': result.get('semester', ''),
-                    'Year': result.get('year', ''),
-                    'Error': result['error'],
-                    'SGPA': '',
-                    'CGPA': '',
-                    'Result': ''
-                }
-                df_data.append(row)
-            else:
-                # Add successful results
-                row = {
-                    'Registration Number': result['registration_number'],
-                    'Name': result.get('name', ''),
-                    'Semester': result.get('semester', ''),
-                    'Year': result.get('year', ''),
-                    'SGPA': result.get('sgpa', ''),
-                    'CGPA': result.get('cgpa', ''),
-                    'Result': result.get('result', ''),
-                    'Error': ''
-                }
-                df_data.append(row)
-        
-        # Create DataFrame
-        df = pd.DataFrame(df_data)
-        
-        # Sort by registration number and semester
-        if not df.empty and 'Registration Number' in df.columns and 'Semester' in df.columns:
-            df = df.sort_values(['Registration Number', 'Semester'])
-        
-        return df
-    
-    def create_formatted_excel(self, results, filename, branch_code, admission_year, selected_semesters):
-        """Create formatted Excel file with college header and multi-semester layout"""
-        if not results:
-            return None
-        
-        filepath = os.path.join('temp', filename)
-        os.makedirs('temp', exist_ok=True)
-        
-        # Import required libraries for Excel formatting
-        from openpyxl import Workbook
-        from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-        from openpyxl.utils import get_column_letter
-        
-        # Create workbook and worksheet
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Results"
-        
-        # Get college and branch names
-        college_name = COLLEGE_NAMES.get(COLLEGE_CODE, f"College Code {COLLEGE_CODE}")
-        branch_name = BRANCH_FULL_NAMES.get(branch_code, f"Branch Code {branch_code}")
-        
-        # Header styles
-        header_font = Font(name='Arial', size=14, bold=True)
-        subheader_font = Font(name='Arial', size=12, bold=True)
-        column_header_font = Font(name='Arial', size=10, bold=True)
-        data_font = Font(name='Arial', size=9)
-        
-        header_fill = PatternFill(start_color='366092', end_color='366092', fill_type='solid')
-        subheader_fill = PatternFill(start_color='D9E2F3', end_color='D9E2F3', fill_type='solid')
-        semester_fill = PatternFill(start_color='E2EFDA', end_color='E2EFDA', fill_type='solid')
-        
-        center_alignment = Alignment(horizontal='center', vertical='center')
-        
-        # Row 1: College Header
-        ws.merge_cells('A1:Z1')  # Merge across many columns
-        ws['A1'] = f"{COLLEGE_CODE} - {college_name}"
-        ws['A1'].font = header_font
-        ws['A1'].fill = header_fill
-        ws['A1'].alignment = center_alignment
-        ws['A1'].font = Font(name='Arial', size=14, bold=True, color='FFFFFF')
-        
-        # Row 2: Course and Result Type
-        ws.merge_cells('A2:Z2')
-        ws['A2'] = f"{branch_name} Multi-Semester Results {admission_year}"
-        ws['A2'].font = subheader_font
-        ws['A2'].fill = subheader_fill
-        ws['A2'].alignment = center_alignment
-        
-        # Row 3: Empty row for spacing
-        ws.row_dimensions[3].height = 10
-        
-        # Row 4: Column headers
-        current_row = 4
-        
-        # Column A: Registration No.
-        ws['A4'] = "Registration No."
-        ws['A4'].font = column_header_font
-        ws['A4'].alignment = center_alignment
-        
-        # Column B: Name of Student
-        ws['B4'] = "Name of Student"
-        ws['B4'].font = column_header_font
-        ws['B4'].alignment = center_alignment
-        
-        # Starting from Column C: Semester headers
-        current_col = 3  # Column C
-        semester_start_cols = {}
-        
-        # Organize results by registration number and semester
-        student_data = {}
-        all_subjects = set()
-        
-        for result in results:
-            reg_num = result.get('registration_number', '')
-            semester = result.get('semester', 0)
-            
-            if reg_num not in student_data:
-                student_data[reg_num] = {
-                    'name': result.get('name', result.get('student_name', '')),
-                    'semesters': {}
-                }
-            
-            student_data[reg_num]['semesters'][semester] = result
-            
-            # Collect all subjects for this semester
-            if 'subjects' in result and result['subjects']:
-                # Handle both dict and list formats
-                if isinstance(result['subjects'], dict):
-                    for subject_name in result['subjects'].keys():
-                        all_subjects.add(f"S{semester}_{subject_name}")
-                elif isinstance(result['subjects'], list):
-                    for subject in result['subjects']:
-                        if isinstance(subject, dict) and 'name' in subject:
-                            all_subjects.add(f"S{semester}_{subject['name']}")
-                        else:
-                            all_subjects.add(f"S{semester}_{str(subject)}")
-        
-        # Create semester headers and sub-columns
-        for semester in sorted(selected_semesters):
-            semester_start_cols[semester] = current_col
-            
-            # Get subjects for this semester from results
-            semester_subjects = []
-            for result in results:
-                if result.get('semester') == semester and 'subjects' in result and result['subjects']:
-                    # Handle both dict and list formats
-                    if isinstance(result['subjects'], dict):
-                        for subject_name in result['subjects'].keys():
-                            if subject_name not in semester_subjects:
-                                semester_subjects.append(subject_name)
-                    elif isinstance(result['subjects'], list):
-                        for subject in result['subjects']:
-                            if isinstance(subject, dict) and 'name' in subject:
-                                if subject['name'] not in semester_subjects:
-                                    semester_subjects.append(subject['name'])
-                            else:
-                                subject_str = str(subject)
-                                if subject_str not in semester_subjects:
-                                    semester_subjects.append(subject_str)
-            
-            # Calculate columns needed for this semester (SGPA + CGPA + subjects)
-            cols_needed = 2 + len(semester_subjects)  # SGPA, CGPA, + subjects
-            
-            # Merge cells for semester header
-            start_col_letter = get_column_letter(current_col)
-            end_col_letter = get_column_letter(current_col + cols_needed - 1)
-            ws.merge_cells(f'{start_col_letter}4:{end_col_letter}4')
-            
-            semester_cell = ws[f'{start_col_letter}4']
-            semester_cell.value = f"SEMESTER {semester}"
-            semester_cell.font = column_header_font
-            semester_cell.fill = semester_fill
-            semester_cell.alignment = center_alignment
-            
-            # Sub-headers for this semester (Row 5)
-            sub_col = current_col
-            
-            # SGPA column
-            ws[f'{get_column_letter(sub_col)}5'] = "SGPA"
-            ws[f'{get_column_letter(sub_col)}5'].font = Font(name='Arial', size=9, bold=True)
-            ws[f'{get_column_letter(sub_col)}5'].alignment = center_alignment
-            sub_col += 1
-            
-            # CGPA column
-            ws[f'{get_column_letter(sub_col)}5'] = "CGPA"
-            ws[f'{get_column_letter(sub_col)}5'].font = Font(name='Arial', size=9, bold=True)
-            ws[f'{get_column_letter(sub_col)}5'].alignment = center_alignment
-            sub_col += 1
-            
-            # Subject columns
-            for subject in semester_subjects:
-                ws[f'{get_column_letter(sub_col)}5'] = subject
-                ws[f'{get_column_letter(sub_col)}5'].font = Font(name='Arial', size=8, bold=True)
-                ws[f'{get_column_letter(sub_col)}5'].alignment = center_alignment
-                sub_col += 1
-            
-            current_col += cols_needed
-        
-        # Fill data rows starting from row 6
-        data_row = 6
-        for reg_num in sorted(student_data.keys()):
-            student = student_data[reg_num]
-            
-            # Column A: Registration Number
-            ws[f'A{data_row}'] = reg_num
-            ws[f'A{data_row}'].font = data_font
-            ws[f'A{data_row}'].alignment = center_alignment
-            
-            # Column B: Student Name
-            ws[f'B{data_row}'] = student['name']
-            ws[f'B{data_row}'].font = data_font
-            
-            # Fill semester data
-            for semester in sorted(selected_semesters):
-                if semester in student['semesters']:
-                    result = student['semesters'][semester]
-                    start_col = semester_start_cols[semester]
-                    
-                    # SGPA
-                    ws[f'{get_column_letter(start_col)}{data_row}'] = result.get('sgpa', '')
-                    ws[f'{get_column_letter(start_col)}{data_row}'].font = data_font
-                    ws[f'{get_column_letter(start_col)}{data_row}'].alignment = center_alignment
-                    
-                    # CGPA
-                    ws[f'{get_column_letter(start_col + 1)}{data_row}'] = result.get('cgpa', '')
-                    ws[f'{get_column_letter(start_col + 1)}{data_row}'].font = data_font
-                    ws[f'{get_column_letter(start_col + 1)}{data_row}'].alignment = center_alignment
-                    
-                    # Subject marks
-                    if 'subjects' in result and result['subjects']:
-                        subject_col = start_col + 2
-                        if isinstance(result['subjects'], dict):
-                            for subject_name, subject_data in result['subjects'].items():
-                                marks = subject_data.get('marks', '') if isinstance(subject_data, dict) else subject_data
-                                ws[f'{get_column_letter(subject_col)}{data_row}'] = marks
-                                ws[f'{get_column_letter(subject_col)}{data_row}'].font = data_font
-                                ws[f'{get_column_letter(subject_col)}{data_row}'].alignment = center_alignment
-                                subject_col += 1
-            
-            data_row += 1
-        
-        # Apply borders to all cells with data
-        thin_border = Border(
-            left=Side(style='thin'),
-            right=Side(style='thin'),
-            top=Side(style='thin'),
-            bottom=Side(style='thin')
-        )
-        
-        for row in ws.iter_rows(min_row=4, max_row=data_row-1, min_col=1, max_col=current_col-1):
-            for cell in row:
-                cell.border = thin_border
-        
-        # Auto-adjust column widths
-        for col in range(1, current_col):
-            column_letter = get_column_letter(col)
-            max_length = 0
-            for row in range(1, data_row):
-                cell_value = ws[f'{column_letter}{row}'].value
-                if cell_value:
-                    max_length = max(max_length, len(str(cell_value)))
-            
-            # Set minimum and maximum widths
-            adjusted_width = min(max(max_length + 2, 10), 25)
-            ws.column_dimensions[column_letter].width = adjusted_width
-        
-        # Save the workbook
-        wb.save(filepath)
-        return filepath
-    
-    def save_to_excel(self, df, filename):
-        """Save DataFrame to Excel file with formatting (legacy method)"""
-        if df.empty:
-            return None
-        
-        filepath = os.path.join('temp', filename)
-        os.makedirs('temp', exist_ok=True)
-        
-        with pd.ExcelWriter(filepath, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='Results', index=False)
-            
-            # Get the workbook and worksheet
-            workbook = writer.book
-            worksheet = writer.sheets['Results']
-            
-            # Auto-adjust column widths
-            for column in worksheet.columns:
-                max_length = 0
-                column_letter = column[0].column_letter
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = min(max_length + 2, 50)
-                worksheet.column_dimensions[column_letter].width = adjusted_width
-        
-        return filepath
-    
-    def save_to_csv(self, df, filename):
-        """Save DataFrame to CSV file"""
-        if df.empty:
-            return None
-        
-        filepath = os.path.join('temp', filename)
-        os.makedirs('temp', exist_ok=True)
-        
-        df.to_csv(filepath, index=False)
-        return filepath
+# Parsed results shared by scrape jobs and the publication watcher
+RESULT_CACHE = ResultCache()
+# Every parsed result, indexed for /query
+WAREHOUSE = ResultWarehouse()
+# SGPA, CGPA and subject rank lists kept sorted as results arrive, for /rankings
+RANK_INDEX = RankIndex(WAREHOUSE)
+# Finished batches frozen into memory-mapped column files for /cohorts
+SNAPSHOTS = SnapshotStore()
+# Paged views of finished jobs rebuilt from the result cache, for /jobs/<id>/preview
+PREVIEWS = PreviewStore(RESULT_CACHE)
+
+# BEU_WATCH_PUBLICATIONS=1 pre-scrapes new exams into the cache as soon as they appear on the homepage;
+# every worker starts one, but only the worker holding its lease in the job store polls the portal.
+# When app.py is run directly, workbook render processes re-run this module as __mp_main__: no watcher there
+PUBLICATION_WATCHER = None if __name__ == '__mp_main__' else watcher_from_env(
+    RESULT_CACHE, BRANCH_CODES, WAREHOUSE, RANK_INDEX, JOBS, worker_id()
+)
+if PUBLICATION_WATCHER:
+    PUBLICATION_WATCHER.start()
+
+def scrape_request_data():
+    """Job spec from a JSON body, or from a multipart form with a "spec" JSON field and a registration CSV"""
+    if request.files or request.form:
+        data = json.loads(request.form.get('spec') or '{}')
+        upload = request.files.get('registration_file')
+        if upload:
+            data['registration_numbers'] = read_registration_csv(upload)
+    else:
+        data = request.get_json(silent=True) or {}
+    if data.get('continuation'):
+        # Resuming a job that hit its deadline; other keys in the body (e.g. a new deadline) override the original spec
+        data = resume_spec(data.pop('continuation'), data)
+    return data
 
 @app.route('/')
 def login():
@@ -417,165 +111,600 @@ def scrape_results():
     if 'logged_in' not in session:
         return jsonify({'error': 'Not authenticated'}), 401
     
+    try:
+        data = scrape_request_data()
+    except ValueError:
+        return jsonify({'error': 'Invalid job spec'}), 400
+    job = JOBS.create(data)
+    timeline = PhaseTimeline()
+    
+    if data.get('profile'):
+        # Opt-in profiling: run the whole job under cProfile and keep the profile next to the job
+        profiler = JobProfiler()
+        with profiler.profiling():
+            payload, status = run_scrape_job(data, job['id'], timeline, profiler)
+        job_dir = JOBS.job_dir(job['id'])
+        if profiler.save(job_dir):
+            JOBS.add_artifact(job['id'], 'profile.prof', os.path.join(job_dir, 'profile.prof'))
+            JOBS.add_artifact(job['id'], 'profile.txt', os.path.join(job_dir, 'profile.txt'))
+        JOBS.add_artifact(job['id'], 'timeline.json', timeline.save(os.path.join(job_dir, 'timeline.json')))
+    else:
+        payload, status = run_scrape_job(data, job['id'], timeline)
+    
+    JOBS.update(
+        job['id'],
+        status=('partial' if payload.get('partial') else 'completed') if status == 200 else 'failed',
+        progress=100,
+        message=payload.get('message') or payload.get('error'),
+        result=payload
+    )
+    payload['job_id'] = job['id']
+    payload['job_url'] = url_for('job_status', job_id=job['id'])
+    return jsonify(payload), status
+
+def run_scrape_job(data, job_id, timeline=None, profiler=None):
+    """Scrape and export one job, returning (response payload, HTTP status)"""
     scraper = None
     try:
-        data = request.json
-        admission_year = int(data.get('admission_year'))
-        branch = data.get('branch')
         selected_semesters = data.get('semesters', [])
-        start_reg = data.get('start_reg')
-        end_reg = data.get('end_reg')
         publication_dates = data.get('publication_dates')
         export_format = data.get('format', 'excel')
-        
-        # Get branch code
-        branch_code = BRANCH_CODES.get(branch)
-        if not branch_code:
-            return jsonify({'error': 'Invalid branch selected'}), 400
+        if export_format.lower() == 'preview' and not data.get('use_cache', True):
+            return {'error': 'A preview is read back from the result cache; leave use_cache on'}, 400
         
         # Initialize scraper
         scraper = BEUResultScraper()
+        scraper.timeline = timeline
+        scraper.profiler = profiler
+        if data.get('use_cache', True):
+            scraper.cache = RESULT_CACHE
+        scraper.warehouse = WAREHOUSE
+        scraper.rank_index = RANK_INDEX
+        if data.get('deadline_seconds'):
+            scraper.deadline = time.monotonic() + float(data['deadline_seconds'])
         processor = ResultProcessor()
         
-        # Generate registration numbers
-        reg_numbers = scraper.generate_registration_numbers(
-            admission_year, branch_code, start_reg, end_reg
-        )
-        
-        # Calculate expected passout year if not provided
-        if data.get('passout_year'):
-            passout_year = int(data.get('passout_year'))
-        else:
-            # Calculate passout year (admission year + 4 for B.Tech)
-            passout_year = admission_year + 4
-        
-        print(f"DEBUG: Admission Year: {admission_year}, Passout Year: {passout_year}")
-        print(f"DEBUG: Selected Semesters: {selected_semesters}")
+        groups, passout_year, error = registration_groups(scraper, data)
+        if error:
+            return error
         
         # Get ALL available result links first (no filtering)
         available_links = scraper.get_available_result_links()
         
-        print(f"DEBUG: Found {len(available_links)} total B.Tech result links:")
-        for i, link in enumerate(available_links):
-            print(f"  {i+1}. {link['text']}")
-            print(f"     Semester: {link['semester']}, Year: {link['year']}")
-            print(f"     Batch: {link['batch_session']}")
-            print(f"     Batch Admission Year: {link.get('batch_admission_year', 'None')}")
-            print(f"     Published: {link['published_date']}")
-            print(f"     Special: {link['is_special']}")
-            print()
-        
-        # Filter links using both admission year and passout year logic
-        semester_links = []
-        for semester in selected_semesters:
-            print(f"DEBUG: Looking for Semester {semester}...")
-            
-            # Find all links for this semester
-            semester_candidates = [link for link in available_links if link['semester'] == semester]
-            print(f"  Found {len(semester_candidates)} links for semester {semester}")
-            
-            # Try different matching strategies
-            matching_links = []
-            
-            # Strategy 1: Match by batch admission year
-            for link in semester_candidates:
-                if link.get('batch_admission_year') == admission_year:
-                    matching_links.append(link)
-                    print(f"  ✓ Matched by admission year: {link['text']} (Batch: {link['batch_session']})")
-            
-            # Strategy 2: If no matches, try matching by expected batch format
-            if not matching_links:
-                expected_batch = f"{admission_year}-{str(passout_year)[-2:]}"  # e.g., "2021-25"
-                for link in semester_candidates:
-                    if link['batch_session'] == expected_batch:
-                        matching_links.append(link)
-                        print(f"  ✓ Matched by batch format: {link['text']} (Batch: {link['batch_session']})")
-            
-            # Strategy 3: If still no matches, try partial matching
-            if not matching_links:
-                for link in semester_candidates:
-                    if str(admission_year) in link['batch_session'] or str(passout_year) in link['batch_session']:
-                        matching_links.append(link)
-                        print(f"  ✓ Matched by partial year: {link['text']} (Batch: {link['batch_session']})")
-            
-            if matching_links:
-                # Use the most recent published result
-                try:
-                    semester_link = max(matching_links, key=lambda x: datetime.strptime(x['published_date'], '%d-%m-%Y') if x['published_date'] else datetime.min)
-                except:
-                    semester_link = matching_links[0]
-                
-                semester_links.append(semester_link)
-                print(f"  → Selected: {semester_link['text']} (Batch: {semester_link['batch_session']})")
-            else:
-                print(f"  ✗ No matches found for semester {semester}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Found %d total B.Tech result links:", len(available_links))
+            for i, link in enumerate(available_links):
+                logger.debug("  %d. %s (Semester: %s, Year: %s, Batch: %s, Batch Admission Year: %s, Published: %s, Special: %s)",
+                             i + 1, link['text'], link['semester'], link['year'], link['batch_session'],
+                             link.get('batch_admission_year'), link['published_date'], link['is_special'])
         
-        if not semester_links:
-            # Provide comprehensive error information
-            available_info = {}
-            for link in available_links:
-                sem = link['semester']
-                if sem not in available_info:
-                    available_info[sem] = []
-                available_info[sem].append(f"{link['batch_session']} ({link['published_date']})")
-            
-            error_msg = f"No matching semester results found.\n"
-            error_msg += f"Requested: Admission {admission_year}, Passout {passout_year}, Semesters {selected_semesters}\n"
-            error_msg += f"Available semesters and batches:\n"
-            for sem, batches in sorted(available_info.items()):
-                error_msg += f"  Semester {sem}: {', '.join(batches)}\n"
-            
-            return jsonify({'error': error_msg}), 404
+        plans, error = plan_semesters(available_links, groups, passout_year, selected_semesters)
+        if error:
+            return error
+        if scraper.cache:
+            # What the job covers, so /jobs/<id>/preview and /jobs/<id>/export can rebuild it from the cache
+            save_sources(JOBS.job_dir(job_id), job_sources(plans))
         
         # Scrape results for all semesters with homepage return between each
-        all_results = scraper.scrape_multiple_semesters(semester_links, reg_numbers, admission_year)
+        exports = []
+        all_results = []
+        for plan_index, (group_year, group_branch, reg_numbers, semester_links) in enumerate(plans):
+            def update_progress(progress, message, plan_index=plan_index):
+                overall = (plan_index + progress / 100) / len(plans) * 100
+                JOBS.update(job_id, progress=round(overall, 1), message=message)
+            
+            group_results = scraper.scrape_multiple_semesters(semester_links, reg_numbers, group_year, update_progress)
+            all_results.extend(group_results)
+            # Excel layouts are per batch and branch; CSV rows and the multi-sheet workbook are exported together below
+            # A preview job exports nothing until the operator asks for a file
+            if group_results and export_format.lower() not in ('csv', 'workbook', 'preview'):
+                exports.append(export_results(processor, group_results, 'excel', group_branch, group_year, selected_semesters, timeline))
         
         if all_results:
-            # Create file
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            if export_format.lower() in ('csv', 'workbook'):
+                branch_code = plans[0][1] if len(plans) == 1 else 'multi'
+                exports.append(export_results(
+                    processor, all_results, export_format.lower(), branch_code, None, selected_semesters, timeline
+                ))
             
-            if export_format.lower() == 'csv':
-                filename = f'results_{branch_code}_{timestamp}.csv'
-                # Convert to DataFrame for CSV
-                df = processor.convert_to_dataframe(all_results)
-                filepath = processor.save_to_csv(df, filename)
-            else:
-                filename = f'results_{branch_code}_{timestamp}.xlsx'
-                # Use new formatted Excel method
-                filepath = processor.create_formatted_excel(all_results, filename, branch_code, admission_year, selected_semesters)
-            
-            if filepath and os.path.exists(filepath):
-                return jsonify({
-                    'success': True,
-                    'message': f'Successfully scraped {len(all_results)} results',
-                    'download_url': f'/download/{filename}',
-                    'total_results': len(all_results),
-                    'successful_results': len([r for r in all_results if not r.get('error')]),
-                    'failed_results': len([r for r in all_results if r.get('error')])
+            downloads = []
+            for filename, filepath in exports:
+                if not (filepath and os.path.exists(filepath)):
+                    return {'error': 'Failed to create output file'}, 500
+                JOBS.add_artifact(job_id, filename, filepath)
+                downloads.append(f'/download/{filename}')
+            payload = {
+                'success': True,
+                'message': f'Successfully scraped {len(all_results)} results',
+                'download_url': downloads[0] if downloads else None,
+                'download_urls': downloads,
+                'preview_url': f'/jobs/{job_id}/preview' if scraper.cache else None,
+                'total_results': len(all_results),
+                'successful_results': len([r for r in all_results if not r.get('error')]),
+                # Students left unfinished at the deadline are not failures: the continuation token fetches them
+                'failed_results': len([r for r in all_results if r.get('error') and not r.get('unfinished')]),
+                # Confirmed "no record" pages are final; transient failures survived the deferred retry pass
+                'no_record_results': len([r for r in all_results if r.get('no_record')]),
+                'unresolved_failures': len(scraper.dead_letters),
+                'dead_letters': scraper.dead_letters,
+                'fetch_stats': scraper.fetch_stats()
+            }
+            unfinished = len([r for r in all_results if r.get('unfinished')])
+            if unfinished:
+                # Deadline reached: the export holds what finished, the token fetches the rest later
+                payload.update({
+                    'partial': True,
+                    'message': f'Deadline reached: exported {len(all_results) - unfinished} results, '
+                               f'{unfinished} not fetched yet',
+                    'unfinished_results': unfinished,
+                    'continuation_token': continuation_token(data)
                 })
-            else:
-                return jsonify({'error': 'Failed to create output file'}), 500
+            return payload, 200
         else:
-            return jsonify({'error': 'No results found for the specified criteria'}), 404
+            return {'error': 'No results found for the specified criteria'}, 404
             
     except Exception as e:
-        return jsonify({'error': f'An error occurred: {str(e)}'}), 500
+        logger.exception("Scrape request failed")
+        return {'error': f'An error occurred: {str(e)}'}, 500
     finally:
         # Always close the scraper driver
         if scraper:
             scraper.close_driver()
 
+@app.route('/refresh_results', methods=['POST'])
+def refresh_results():
+    if 'logged_in' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    data = request.json or {}
+    job = JOBS.create(dict(data, kind='refresh'))
+    payload, status = run_refresh_job(data, job['id'])
+    JOBS.update(
+        job['id'],
+        status='completed' if status == 200 else 'failed',
+        progress=100,
+        message=payload.get('message') or payload.get('error'),
+        result=payload
+    )
+    payload['job_id'] = job['id']
+    payload['job_url'] = url_for('job_status', job_id=job['id'])
+    return jsonify(payload), status
+
+def run_refresh_job(data, job_id):
+    """Re-fetch a batch after a revaluation and export only the records whose result page changed"""
+    scraper = None
+    try:
+        admission_year = int(data.get('admission_year'))
+        selected_semesters = data.get('semesters', [])
+        export_format = data.get('format', 'excel')
+        branch_code = resolve_branch_code(data.get('branch'))
+        if not branch_code:
+            return {'error': 'Invalid branch selected'}, 400
+        passout_year = int(data.get('passout_year') or admission_year + 4)
+        
+        scraper = BEUResultScraper()
+        scraper.cache = RESULT_CACHE
+        scraper.warehouse = WAREHOUSE
+        scraper.rank_index = RANK_INDEX
+        reg_numbers = scraper.generate_registration_numbers(
+            admission_year, branch_code, data.get('start_reg'), data.get('end_reg')
+        )
+        available_links = scraper.get_available_result_links()
+        semester_links = select_semester_links(available_links, admission_year, passout_year, selected_semesters)
+        if not semester_links:
+            error_msg = no_matching_semesters_error(available_links, admission_year, passout_year, selected_semesters)
+            return {'error': error_msg}, 404
+        
+        def update_progress(progress, message):
+            JOBS.update(job_id, progress=round(progress, 1), message=message)
+        
+        # Pages whose content hash matches the cached copy are neither parsed nor exported
+        changed_results = []
+        report = []
+        for semester_link in semester_links:
+            results, changes = scraper.refresh_semester_results(semester_link, reg_numbers, update_progress)
+            changed_results.extend(changes['changed'] + changes['new'])
+            report.append({
+                'semester': semester_link['semester'],
+                'exam': semester_link['text'],
+                'published_date': semester_link['published_date'],
+                'changed': [result['registration_number'] for result in changes['changed']],
+                'new': [result['registration_number'] for result in changes['new']],
+                'unchanged': changes['unchanged'],
+                'failed': changes['failed']
+            })
+        
+        payload = {
+            'success': True,
+            'message': f'{len(changed_results)} changed or new records',
+            'semesters': report,
+            'changed_results': len(changed_results),
+            'fetch_stats': scraper.fetch_stats()
+        }
+        if not changed_results:
+            return payload, 200
+        
+        filename, filepath = export_results(
+            ResultProcessor(), changed_results, 'csv' if export_format.lower() == 'csv' else 'excel',
+            branch_code, admission_year, selected_semesters, prefix='changes'
+        )
+        if filepath and os.path.exists(filepath):
+            JOBS.add_artifact(job_id, filename, filepath)
+            payload['download_url'] = f'/download/{filename}'
+        return payload, 200
+        
+    except Exception as e:
+        logger.exception("Refresh request failed")
+        return {'error': f'An error occurred: {str(e)}'}, 500
+    finally:
+        if scraper:
+            scraper.close_driver()
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    if 'logged_in' not in session:
+        return redirect(url_for('login'))
+    
+    job = JOBS.get(job_id)
+    if not job:
+        return "Job not found", 404
+    return render_template('job_status.html', job=job)
+
+@app.route('/jobs/<job_id>/status')
+def job_status_json(job_id):
+    if 'logged_in' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    job = JOBS.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    job['artifacts'] = sorted(job['artifacts'])
+    return jsonify(job)
+
+@app.route('/jobs/<job_id>/artifacts/<name>')
+def download_job_artifact(job_id, name):
+    if 'logged_in' not in session:
+        return redirect(url_for('login'))
+    
+    job = JOBS.get(job_id)
+    filepath = job['artifacts'].get(name) if job else None
+    if filepath and os.path.exists(filepath):
+        return send_file(filepath, as_attachment=True, download_name=name)
+    else:
+        return "File not found", 404
+
+@app.route('/jobs/<job_id>/preview')
+def job_preview(job_id):
+    """One page of a finished job's results, sorted, filtered and projected server-side"""
+    if 'logged_in' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+
+    job = JOBS.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    preview = PREVIEWS.get(job_id, JOBS.job_dir(job_id))
+    if preview is None:
+        return jsonify({'error': 'This job was run without the result cache and has no preview'}), 404
+    columns = request.args.get('columns')
+    try:
+        page = preview.page(
+            offset=request.args.get('offset', 0),
+            limit=request.args.get('limit', 100),
+            sort=request.args.get('sort'),
+            descending=request.args.get('order', 'asc').lower() == 'desc',
+            filters=request.args,
+            columns=columns.split(',') if columns else None
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    page['job_id'] = job_id
+    return jsonify(page)
+
+@app.route('/jobs/<job_id>/export', methods=['POST'])
+def export_job(job_id):
+    """Build the Excel, CSV or workbook export of a previewed job from its cached results"""
+    if 'logged_in' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+
+    job = JOBS.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    export_format = ((request.get_json(silent=True) or {}).get('format') or 'excel').lower()
+    if export_format not in ('excel', 'csv', 'workbook'):
+        return jsonify({'error': "format must be 'excel', 'csv' or 'workbook'"}), 400
+    preview = PREVIEWS.get(job_id, JOBS.job_dir(job_id))
+    if preview is None:
+        return jsonify({'error': 'This job was run without the result cache and has no preview'}), 404
+    groups = [(key, results) for key, results in preview.groups.items() if results]
+    if not groups:
+        return jsonify({'error': 'No cached results for this job'}), 404
+
+    processor = ResultProcessor()
+    selected_semesters = job['spec'].get('semesters', [])
+    if export_format == 'excel':
+        exports = [
+            export_results(processor, results, 'excel', branch_code, admission_year, selected_semesters)
+            for (admission_year, branch_code), results in groups
+        ]
+    else:
+        branch_code = groups[0][0][1] if len(groups) == 1 else 'multi'
+        all_results = [result for _, results in groups for result in results]
+        exports = [export_results(processor, all_results, export_format, branch_code, None, selected_semesters)]
+    downloads = []
+    for filename, filepath in exports:
+        if not (filepath and os.path.exists(filepath)):
+            return jsonify({'error': 'Failed to create output file'}), 500
+        JOBS.add_artifact(job_id, filename, filepath)
+        downloads.append(f'/download/{filename}')
+    return jsonify({'success': True, 'download_url': downloads[0], 'download_urls': downloads})
+
 @app.route('/download/<filename>')
 def download_file(filename):
     if 'logged_in' not in session:
         return redirect(url_for('login'))
     
-    filepath = os.path.join('temp', filename)
+    # The job store knows where any worker wrote the file; fall back to this worker's temp/
+    filepath = JOBS.find_artifact(filename) or os.path.join('temp', filename)
     if os.path.exists(filepath):
         return send_file(filepath, as_attachment=True, download_name=filename)
     else:
         return "File not found", 404
 
+@app.route('/metrics')
+def metrics():
+    """Prometheus text-format export of scraper and export metrics"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+# Homepage exam links reused by single-student lookups for this many seconds
+HOMEPAGE_LINKS_TTL = 300
+_homepage_links = {'links': None, 'fetched_at': 0.0}
+_homepage_links_lock = threading.Lock()
+
+def cached_result_links(scraper):
+    """Homepage exam links, refetched at most every HOMEPAGE_LINKS_TTL seconds"""
+    with _homepage_links_lock:
+        if _homepage_links['links'] and time.time() - _homepage_links['fetched_at'] < HOMEPAGE_LINKS_TTL:
+            CACHE_HITS.inc(cache='homepage')
+            return _homepage_links['links']
+    CACHE_MISSES.inc(cache='homepage')
+    links = [dict(link, element=None) for link in scraper.get_available_result_links()]
+    if links:
+        with _homepage_links_lock:
+            _homepage_links.update(links=links, fetched_at=time.time())
+    return links
+
+def cached_semester_result(semester_link, registration_number):
+    """A student's record for one semester when every attempt at it is cached, merged like a scrape job, else None"""
+    found = []
+    for attempt in semester_link.get('attempts') or [semester_link]:
+        cached = RESULT_CACHE.get_many(attempt, [registration_number]).get(registration_number)
+        if not cached:
+            return None
+        found.append((attempt, cached))
+    return found[0][1] if len(found) == 1 else merge_attempts(found)
+
+@app.route('/api/student/<registration_number>')
+def student_lookup(registration_number):
+    """All published semesters of one student as JSON, from the result cache with fetch-on-miss"""
+    if 'logged_in' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    parts = split_registration_number(registration_number)
+    if not parts:
+        return jsonify({'error': 'Registration number must be 11 digits (YYBBBCCCNNN)'}), 400
+    admission_year, branch_code, college_code = parts
+    
+    started_at = time.perf_counter()
+    scraper = BEUResultScraper()
+    try:
+        available_links = cached_result_links(scraper)
+    finally:
+        scraper.close_driver()
+    published_semesters = sorted({
+        link['semester'] for link in available_links if link.get('batch_admission_year') == admission_year
+    })
+    semester_links = select_semester_links(available_links, admission_year, admission_year + 4, published_semesters)
+    
+    semesters = {}
+    missing_links = []
+    for semester_link in semester_links:
+        cached = cached_semester_result(semester_link, registration_number)
+        if cached:
+            semesters[semester_link['semester']] = (semester_link, cached, 'cache')
+        else:
+            missing_links.append(semester_link)
+    
+    def fetch_semester(semester_link):
+        # One scraper per semester so each can resolve its exam page independently
+        semester_scraper = BEUResultScraper(initial_concurrency=1, max_concurrency=1)
+        semester_scraper.cache = RESULT_CACHE
+        semester_scraper.warehouse = WAREHOUSE
+        semester_scraper.rank_index = RANK_INDEX
+        try:
+            # Same path as a scrape job, so a semester with special attempts is fetched, merged and stored as one record
+            results = semester_scraper.scrape_multiple_semesters([semester_link], [registration_number])
+        finally:
+            semester_scraper.close_driver()
+        return semester_link, results[0] if results else None
+    
+    if missing_links:
+        with ThreadPoolExecutor(max_workers=len(missing_links)) as executor:
+            for semester_link, result in executor.map(fetch_semester, missing_links):
+                if result:
+                    semesters[semester_link['semester']] = (semester_link, result, 'portal')
+    
+    records = []
+    name = ''
+    for semester in sorted(semesters):
+        semester_link, result, source = semesters[semester]
+        name = name or result.get('name', '')
+        record = {key: value for key, value in result.items() if key not in ('registration_number', 'content_hash')}
+        record.update(
+            semester=semester,
+            exam=semester_link['text'],
+            batch_session=semester_link['batch_session'],
+            published_date=semester_link['published_date'],
+            source=source
+        )
+        records.append(record)
+    
+    elapsed = time.perf_counter() - started_at
+    STUDENT_LOOKUP_SECONDS.observe(elapsed, source='portal' if missing_links else 'cache')
+    return jsonify({
+        'registration_number': registration_number,
+        'name': name,
+        'admission_year': admission_year,
+        'branch_code': branch_code,
+        'college_code': college_code,
+        'semesters': records,
+        'fetched_semesters': [semester_link['semester'] for semester_link in missing_links],
+        'elapsed_ms': round(elapsed * 1000, 2)
+    })
+
+@app.route('/query')
+def query_results():
+    """Filtered slices of the local results warehouse, e.g. /query?view=backlogs&subject=105202"""
+    if 'logged_in' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    filters = request.args.to_dict()
+    view = filters.pop('view', 'students')
+    # Branches may be given by name as on the dashboard, or by code
+    if filters.get('branch') in BRANCH_CODES:
+        filters['branch'] = BRANCH_CODES[filters['branch']]
+    views = {
+        'students': WAREHOUSE.students,
+        'backlogs': WAREHOUSE.backlogs,
+        'toppers': WAREHOUSE.toppers
+    }
+    if view not in views:
+        return jsonify({'error': f"Unknown view '{view}', expected one of {sorted(views)}"}), 400
+    
+    started_at = time.perf_counter()
+    try:
+        rows = views[view](**filters)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid query: {e}'}), 400
+    return jsonify({
+        'view': view,
+        'count': len(rows),
+        'rows': rows,
+        'elapsed_ms': round((time.perf_counter() - started_at) * 1000, 2)
+    })
+
+def ranking_board(args, registration_number=None):
+    """Board key from ?by=sgpa|cgpa|subject, taking branch and batch from the registration number when given"""
+    by = args.get('by', 'sgpa')
+    branch = args.get('branch')
+    admission_year = args.get('admission_year')
+    if registration_number:
+        parts = split_registration_number(registration_number)
+        if not parts:
+            raise ValueError('Invalid registration number format')
+        admission_year, branch, _ = parts
+    # Branches may be given by name as on the dashboard, or by code
+    branch = BRANCH_CODES.get(branch, branch)
+    return board_key(by, branch, admission_year, args.get('semester'), args.get('subject'))
+
+@app.route('/rankings')
+def rankings():
+    """Top n of one rank list from the in-memory index, e.g. /rankings?by=sgpa&branch=105&admission_year=2023&semester=3"""
+    if 'logged_in' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+
+    started_at = time.perf_counter()
+    try:
+        key = ranking_board(request.args)
+        rows = RANK_INDEX.top(key, request.args.get('n', 10))
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid query: {e}'}), 400
+    return jsonify({
+        'board': list(key),
+        'count': len(rows),
+        'rows': rows,
+        'elapsed_ms': round((time.perf_counter() - started_at) * 1000, 2)
+    })
+
+@app.route('/rankings/<registration_number>')
+def student_ranking(registration_number):
+    """One student's rank in their batch (?by=sgpa&semester=N or ?by=cgpa) or in a subject (?by=subject&subject=CODE)"""
+    if 'logged_in' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+
+    started_at = time.perf_counter()
+    try:
+        key = ranking_board(request.args, registration_number)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid query: {e}'}), 400
+    ranking = RANK_INDEX.rank(key, registration_number)
+    if ranking is None:
+        return jsonify({'error': f'{registration_number} is not ranked on this board', 'board': list(key)}), 404
+    return jsonify(dict(
+        ranking,
+        board=list(key),
+        elapsed_ms=round((time.perf_counter() - started_at) * 1000, 2)
+    ))
+
+@app.route('/snapshots', methods=['GET', 'POST'])
+def snapshots():
+    """List frozen batches, or freeze one from the warehouse with POST {"branch": ..., "admission_year": ...}"""
+    if 'logged_in' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+
+    if request.method == 'GET':
+        return jsonify({'snapshots': SNAPSHOTS.list()})
+    data = request.get_json(silent=True) or {}
+    branch_code = resolve_branch_code(data.get('branch'))
+    if not branch_code:
+        return jsonify({'error': 'Invalid branch selected'}), 400
+    try:
+        admission_year = int(data.get('admission_year'))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'admission_year is required'}), 400
+    started_at = time.perf_counter()
+    manifest = SNAPSHOTS.freeze(WAREHOUSE, branch_code, admission_year)
+    return jsonify(dict(manifest, elapsed_ms=round((time.perf_counter() - started_at) * 1000, 2)))
+
+@app.route('/cohorts')
+def cohorts():
+    """Cross-batch analytics over frozen snapshots, e.g. /cohorts?view=sgpa_trend&branch=105&admission_years=2021,2022,2023"""
+    if 'logged_in' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+
+    filters = request.args.to_dict()
+    view = filters.pop('view', 'sgpa_trend')
+    if view not in COHORT_VIEWS:
+        return jsonify({'error': f"Unknown view '{view}', expected one of {sorted(COHORT_VIEWS)}"}), 400
+    branch_code = resolve_branch_code(filters.pop('branch', None))
+    if not branch_code:
+        return jsonify({'error': 'Invalid branch selected'}), 400
+    years = filters.pop('admission_years', '')
+
+    started_at = time.perf_counter()
+    try:
+        admission_years = [int(year) for year in years.split(',') if year.strip()]
+        rows = COHORT_VIEWS[view](SNAPSHOTS, branch_code, admission_years, **filters)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid query: {e}'}), 400
+    return jsonify({
+        'view': view,
+        'branch_code': branch_code,
+        'count': len(rows),
+        'rows': rows,
+        'elapsed_ms': round((time.perf_counter() - started_at) * 1000, 2)
+    })
+
+@app.route('/watcher/status')
+def watcher_status():
+    if 'logged_in' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    return jsonify({
+        'enabled': PUBLICATION_WATCHER is not None,
+        'watcher': PUBLICATION_WATCHER.status if PUBLICATION_WATCHER else None,
+        'cache': RESULT_CACHE.stats()
+    })
+
 @app.route('/logout')
 def logout():
     session.clear()
@@ -0,0 +1,255 @@
+"""Offline microbenchmarks for the result parser and the exporters.
+
+Synthetic inputs are generated from the debug_page_*.html fixtures in the
+repository root, so no network access is needed.
+
+    python benchmarks/bench_hot_paths.py                      # run and compare with baseline.json
+    python benchmarks/bench_hot_paths.py --check              # exit 1 on regressions (CI)
+    python benchmarks/bench_hot_paths.py --save-baseline      # record a new baseline
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_ROOT)
+
+DEFAULT_SIZES = [100, 1000, 10000]
+# Inputs this large are timed once regardless of --repeat to keep a full run to a few minutes
+SINGLE_RUN_SIZE = 10000
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, 'results.json')
+
+
+def load_fixture_pages():
+    """Return (registration_number, page_source) for every student result fixture"""
+    pages = []
+    for path in sorted(glob.glob(os.path.join(REPO_ROOT, 'debug_page_*.html'))):
+        registration = os.path.basename(path)[len('debug_page_'):-len('.html')]
+        # Only student result pages are named after an 11-digit registration number
+        if len(registration) != 11:
+            continue
+        with open(path, encoding='utf-8') as f:
+            pages.append((registration, f.read()))
+    if not pages:
+        raise SystemExit('No debug_page_<registration>.html fixtures found in the repository root')
+    return pages
+
+
+def synthetic_pages(fixture_pages, size):
+    """Result pages for `size` distinct students, cycling through the fixtures"""
+    pages = []
+    for i in range(size):
+        fixture_reg, source = fixture_pages[i % len(fixture_pages)]
+        registration = f"{fixture_reg[:8]}{(i % 999) + 1:03d}"
+        pages.append((registration, source.replace(fixture_reg, registration)))
+    return pages
+
+
+def synthetic_results(template_results, size, seed=42):
+    """Parsed result records for `size` distinct students with jittered marks"""
+    rng = random.Random(seed)
+    results = []
+    for i in range(size):
+        template = template_results[i % len(template_results)]
+        record = dict(template)
+        record['registration_number'] = f"23105{(i // 999) % 1000:03d}{(i % 999) + 1:03d}"
+        record['name'] = f"STUDENT {i + 1}"
+        record['subjects'] = {
+            name: {'marks': str(rng.randint(30, 100)), 'grade': rng.choice(['A+', 'A', 'B', 'C', 'D', 'P', 'F'])}
+            for name in template.get('subjects', {})
+        }
+        record['sgpa'] = f"{rng.uniform(4, 10):.2f}"
+        record['cgpa'] = f"{rng.uniform(4, 10):.2f}"
+        record['error'] = None
+        results.append(record)
+    return results
+
+
+def time_call(func, repeat):
+    """Run func `repeat` times and return the wall times in seconds"""
+    timings = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started_at)
+    return timings
+
+
+def summarize(benchmark, size, timings):
+    median = statistics.median(timings)
+    return {
+        'benchmark': benchmark,
+        'size': size,
+        'repeat': len(timings),
+        'min_seconds': round(min(timings), 6),
+        'median_seconds': round(median, 6),
+        'mean_seconds': round(statistics.mean(timings), 6),
+        'per_item_us': round(median / size * 1e6, 2)
+    }
+
+
+def run_benchmarks(sizes, parser_sizes, repeat, only=None):
+    from scraper import BEUResultScraper
+    from processor import ResultProcessor
+
+    scraper = BEUResultScraper()
+    processor = ResultProcessor()
+    fixture_pages = load_fixture_pages()
+    template_results = [scraper.extract_student_result(reg, source) for reg, source in fixture_pages]
+    for record in template_results:
+        record['semester'] = 2
+        record['year'] = 2024
+
+    results = []
+
+    def selected(name):
+        return not only or name in only
+
+    def record(name, size, func):
+        runs = 1 if size >= SINGLE_RUN_SIZE else repeat
+        timings = time_call(func, runs)
+        summary = summarize(name, size, timings)
+        results.append(summary)
+        print(f"  {name:<24} n={size:<6} median={summary['median_seconds']:.4f}s "
+              f"({summary['per_item_us']:.1f} us/student)")
+
+    if selected('extract_student_result'):
+        for size in parser_sizes:
+            pages = synthetic_pages(fixture_pages, size)
+            record('extract_student_result', size,
+                   lambda: [scraper.extract_student_result(reg, source) for reg, source in pages])
+
+    if selected('stream_result_page'):
+        from result_page import ResultPageParser
+        from scraper import PAGE_CHUNK_SIZE
+
+        def stream_parse(reg, source):
+            # Fed the way read_result_page feeds a download, stopping once the parser is done
+            parser = ResultPageParser()
+            for offset in range(0, len(source), PAGE_CHUNK_SIZE):
+                parser.feed(source[offset:offset + PAGE_CHUNK_SIZE])
+                if parser.done:
+                    break
+            return parser.result(reg)
+
+        for size in parser_sizes:
+            pages = synthetic_pages(fixture_pages, size)
+            record('stream_result_page', size, lambda: [stream_parse(reg, source) for reg, source in pages])
+
+    for size in sizes:
+        records = synthetic_results(template_results, size)
+        df = processor.convert_to_dataframe(records)
+
+        if selected('convert_to_dataframe'):
+            record('convert_to_dataframe', size, lambda: processor.convert_to_dataframe(records))
+        if selected('create_formatted_excel'):
+            record('create_formatted_excel', size,
+                   lambda: processor.create_formatted_excel(records, 'bench.xlsx', '105', 2023, [2]))
+        if selected('save_to_excel'):
+            record('save_to_excel', size, lambda: processor.save_to_excel(df, 'bench_legacy.xlsx'))
+        if selected('save_to_csv'):
+            record('save_to_csv', size, lambda: processor.save_to_csv(df, 'bench.csv'))
+
+    return results
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """Print a comparison table and return the entries slower than baseline by more than tolerance"""
+    baseline_index = {(r['benchmark'], r['size']): r for r in baseline.get('results', [])}
+    regressions = []
+    print(f"\n{'benchmark':<24} {'size':>6} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for result in results:
+        reference = baseline_index.get((result['benchmark'], result['size']))
+        if not reference:
+            print(f"{result['benchmark']:<24} {result['size']:>6} {'-':>10} {result['median_seconds']:>10.4f} {'new':>7}")
+            continue
+        ratio = result['median_seconds'] / reference['median_seconds'] if reference['median_seconds'] else 1.0
+        result['baseline_median_seconds'] = reference['median_seconds']
+        result['ratio'] = round(ratio, 3)
+        flag = ''
+        if ratio > 1 + tolerance:
+            flag = '  REGRESSION'
+            regressions.append(result)
+        print(f"{result['benchmark']:<24} {result['size']:>6} {reference['median_seconds']:>10.4f} "
+              f"{result['median_seconds']:>10.4f} {ratio:>6.2f}x{flag}")
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the result parser and exporters')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='Student counts for the exporter benchmarks')
+    parser.add_argument('--parser-sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='Student counts for the parser benchmark')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per benchmark (median is reported)')
+    parser.add_argument('--only', nargs='+', help='Run only these benchmarks')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='Where to write the JSON results')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline JSON to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='Write the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed slowdown vs baseline before flagging a regression (0.25 = 25%%)')
+    parser.add_argument('--check', action='store_true', help='Exit with status 1 when a regression is found')
+    args = parser.parse_args(argv)
+
+    # Exporters write into ./temp, so run them in a scratch directory
+    workdir = tempfile.mkdtemp(prefix='beu-bench-')
+    previous_cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        print(f"Running benchmarks (repeat={args.repeat})")
+        results = run_benchmarks(args.sizes, args.parser_sizes, args.repeat, args.only)
+    finally:
+        os.chdir(previous_cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'meta': {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'git_commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': args.repeat
+        },
+        'results': results
+    }
+
+    regressions = []
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare_with_baseline(results, json.load(f), args.tolerance)
+        report['regressions'] = [f"{r['benchmark']}@{r['size']}" for r in regressions]
+
+    output = args.baseline if args.save_baseline else args.output
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) slower than baseline by more than {args.tolerance:.0%}")
+        if args.check:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
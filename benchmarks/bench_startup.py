@@ -0,0 +1,117 @@
+"""Cold-start and import-time budget check for the app, the CLI and the scraper.
+
+Every measurement runs in a fresh interpreter, so nothing is shared between
+runs. It also checks that importing a module does not drag in the heavy
+dependencies (pandas, bs4, selenium, ...), which must load only when a
+scrape or an export first needs them.
+
+    python benchmarks/bench_startup.py                   # report import and cold-start times
+    python benchmarks/bench_startup.py --check           # exit 1 when a budget is exceeded (CI)
+    python benchmarks/bench_startup.py --repo ../old     # measure another checkout, e.g. a git worktree
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+
+# Import-time budgets in milliseconds, generous enough for a busy CI runner
+IMPORT_BUDGETS_MS = {
+    'app': 350,
+    'cli': 50,
+    'scraper': 150,
+    'processor': 60,
+    'watcher': 150,
+}
+HEAVY_MODULES = ('pandas', 'numpy', 'openpyxl', 'bs4', 'lxml', 'selenium', 'webdriver_manager')
+
+# Runs inside the child interpreter; the app also serves its first request so template loading counts too
+PROBE = '''
+import json, sys, time
+started_at = time.perf_counter()
+import {module}
+imported_at = time.perf_counter()
+if {module!r} == 'app':
+    with app.app.test_client() as client:
+        client.get('/')
+print(json.dumps({{
+    'import_seconds': imported_at - started_at,
+    'first_request_seconds': time.perf_counter() - imported_at,
+    'heavy_modules': sorted(name for name in {heavy!r} if name in sys.modules),
+}}))
+'''
+
+
+def measure(module, repo, runs):
+    """Median import time, first-request time and process wall time of `runs` fresh interpreters"""
+    samples = []
+    with tempfile.TemporaryDirectory() as workdir:
+        # Modules that open the result cache or session store at import time write into the scratch dir
+        env = dict(os.environ, PYTHONPATH=repo, BEU_DATA_DIR=os.path.join(workdir, 'data'),
+                   BEU_WATCH_PUBLICATIONS='0')
+        for _ in range(runs):
+            started_at = time.perf_counter()
+            output = subprocess.run(
+                [sys.executable, '-c', PROBE.format(module=module, heavy=HEAVY_MODULES)],
+                cwd=workdir, env=env, capture_output=True, text=True, check=True
+            ).stdout
+            wall_seconds = time.perf_counter() - started_at
+            sample = json.loads(output.strip().splitlines()[-1])
+            sample['wall_seconds'] = wall_seconds
+            samples.append(sample)
+    return {
+        'module': module,
+        'runs': runs,
+        'import_ms': round(statistics.median(s['import_seconds'] for s in samples) * 1000, 1),
+        'first_request_ms': round(statistics.median(s['first_request_seconds'] for s in samples) * 1000, 1),
+        'cold_start_ms': round(statistics.median(s['wall_seconds'] for s in samples) * 1000, 1),
+        'heavy_modules': samples[-1]['heavy_modules'],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repo', default=REPO_ROOT, help='Checkout to measure (default: this repository)')
+    parser.add_argument('--modules', nargs='+', default=list(IMPORT_BUDGETS_MS), help='Modules to import')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters per module')
+    parser.add_argument('--output', help='Also write the measurements to this JSON file')
+    parser.add_argument('--check', action='store_true',
+                        help='Exit with status 1 when a budget is exceeded or a heavy module is imported')
+    args = parser.parse_args(argv)
+
+    repo = os.path.abspath(args.repo)
+    print(f"Measuring {repo} ({args.runs} runs per module)")
+    print(f"\n{'module':<10} {'import':>9} {'budget':>8} {'1st req':>9} {'cold start':>11}  heavy imports")
+    results, failures = [], []
+    for module in args.modules:
+        result = measure(module, repo, args.runs)
+        results.append(result)
+        budget = IMPORT_BUDGETS_MS.get(module)
+        over_budget = budget is not None and result['import_ms'] > budget
+        if over_budget or result['heavy_modules']:
+            failures.append(result)
+        first_request = f"{result['first_request_ms']:.1f}ms" if module == 'app' else '-'
+        print(f"{module:<10} {result['import_ms']:>7.1f}ms {budget or '-':>6}ms {first_request:>9} "
+              f"{result['cold_start_ms']:>9.1f}ms  {', '.join(result['heavy_modules']) or '-'}"
+              f"{'  OVER BUDGET' if over_budget else ''}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'repo': repo, 'python': sys.version.split()[0], 'results': results}, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if failures:
+        print(f"\n{len(failures)} module(s) over their import budget or importing heavy dependencies")
+        if args.check:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,315 @@
+"""Headless batch entry point: run scrape jobs without Flask and stream every record as NDJSON.
+
+    python cli.py --admission-year 2023 --branch 105 --semesters 1 2 --start 1 --end 60
+    python cli.py --registration-file class.csv --semesters 3 --export csv
+    python cli.py --spec nightly.json > results.ndjson
+    python cli.py --spec university.json --enqueue      # split into shards on the shared queue
+    python cli.py --work                                # lease and scrape shards (run on every node)
+
+A spec file holds one job object, a JSON list of them or one object per line,
+with the same keys as the /scrape_results body. Each finished student record
+is written to stdout as {"type": "result", "job": N, ...}, followed by one
+{"type": "job", ...} summary line per job. Logs go to stderr.
+
+Exit codes: 0 every record parsed (or confirmed "no record"), 1 a job failed,
+2 invalid arguments or job spec, 3 some records could not be fetched or parsed
+(or --deadline cut the job short; resume it with --continuation TOKEN).
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_PARTIAL = 3
+
+logger = logging.getLogger('cli')
+
+
+class NDJSONWriter:
+    """Writes one JSON document per line, safe to call from scraper worker threads"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            self.stream.write(line + '\n')
+            self.stream.flush()
+
+
+def load_specs(path):
+    """Job specs from a JSON object, a JSON list or NDJSON"""
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    try:
+        parsed = json.loads(text)
+        specs = parsed if isinstance(parsed, list) else [parsed]
+    except ValueError:
+        specs = [json.loads(line) for line in text.splitlines() if line.strip()]
+    if not all(isinstance(spec, dict) for spec in specs):
+        raise ValueError('every job spec must be a JSON object')
+    return specs
+
+
+def spec_from_args(args):
+    spec = {
+        'admission_year': args.admission_year,
+        'branch': args.branch,
+        'semesters': args.semesters,
+        'start_reg': args.start,
+        'end_reg': args.end,
+        'passout_year': args.passout_year
+    }
+    if args.registration_numbers:
+        spec['registration_numbers'] = args.registration_numbers
+    if args.registration_file:
+        spec['registration_file'] = args.registration_file
+    return {key: value for key, value in spec.items() if value is not None}
+
+
+def run_job(index, spec, args, writer):
+    """Run one job spec, streaming its records, and return (summary, exit code)"""
+    from scraper import BEUResultScraper
+    from processor import (
+        ResultProcessor, read_registration_csv, registration_groups, plan_semesters, export_results, continuation_token
+    )
+    from result_cache import ResultCache
+    from warehouse import ResultWarehouse
+
+    started_at = time.perf_counter()
+    summary = {'type': 'job', 'job': index, 'status': 'failed', 'total': 0, 'ok': 0, 'no_record': 0, 'failed': 0,
+               'unfinished': 0, 'exports': []}
+    counts_lock = threading.Lock()
+
+    def on_result(result):
+        record = {key: value for key, value in result.items() if key != 'content_hash'}
+        writer.write(dict(record, type='result', job=index))
+        if not result.get('error'):
+            outcome = 'ok'
+        else:
+            outcome = 'no_record' if result.get('no_record') else 'unfinished' if result.get('unfinished') else 'failed'
+        with counts_lock:
+            summary['total'] += 1
+            summary[outcome] += 1
+
+    def finish(exit_code, error=None):
+        if error:
+            summary['error'] = error
+        summary['elapsed_seconds'] = round(time.perf_counter() - started_at, 3)
+        writer.write(summary)
+        return summary, exit_code
+
+    spec = dict(spec)
+    if spec.get('registration_file'):
+        try:
+            with open(spec.pop('registration_file'), 'rb') as upload:
+                spec['registration_numbers'] = read_registration_csv(upload)
+        except OSError as e:
+            return finish(EXIT_USAGE, f'Cannot read registration file: {e}')
+    export_format = spec.get('format', args.export)
+    selected_semesters = spec.get('semesters') or []
+
+    scraper = BEUResultScraper(initial_concurrency=args.concurrency, max_concurrency=args.max_concurrency)
+    if spec.get('use_cache', True) and not args.no_cache:
+        scraper.cache = ResultCache()
+    scraper.warehouse = ResultWarehouse()
+    scraper.on_result = on_result
+    if spec.get('deadline_seconds'):
+        scraper.deadline = time.monotonic() + float(spec['deadline_seconds'])
+    try:
+        try:
+            groups, passout_year, error = registration_groups(scraper, spec)
+        except (TypeError, ValueError) as e:
+            return finish(EXIT_USAGE, f'Invalid job spec: {e}')
+        if error:
+            summary['rejected'] = error[0].get('rejected', [])
+            return finish(EXIT_USAGE, error[0]['error'])
+
+        available_links = scraper.get_available_result_links()
+        plans, error = plan_semesters(available_links, groups, passout_year, selected_semesters)
+        if error:
+            summary['rejected'] = error[0].get('rejected', [])
+            return finish(EXIT_USAGE if error[1] == 400 else EXIT_FAILED, error[0]['error'])
+
+        processor = ResultProcessor()
+        all_results = []
+        for group_year, group_branch, reg_numbers, semester_links in plans:
+            group_results = scraper.scrape_multiple_semesters(semester_links, reg_numbers, group_year)
+            all_results.extend(group_results)
+            if group_results and export_format == 'excel':
+                summary['exports'].append(export_results(
+                    processor, group_results, 'excel', group_branch, group_year, selected_semesters
+                )[1])
+        if all_results and export_format in ('csv', 'workbook'):
+            branch_code = plans[0][1] if len(plans) == 1 else 'multi'
+            summary['exports'].append(
+                export_results(processor, all_results, export_format, branch_code, None, selected_semesters)[1]
+            )
+
+        summary['fetch_stats'] = scraper.fetch_stats()
+        summary['dead_letters'] = scraper.dead_letters
+        if not all_results:
+            return finish(EXIT_FAILED, 'No results found for the specified criteria')
+        if summary['unfinished']:
+            summary['continuation_token'] = continuation_token(spec)
+        partial = summary['failed'] or summary['unfinished']
+        summary['status'] = 'partial' if partial else 'completed'
+        return finish(EXIT_PARTIAL if partial else EXIT_OK)
+    except Exception as e:
+        logger.exception("Job %d failed", index)
+        return finish(EXIT_FAILED, str(e))
+    finally:
+        scraper.close_driver()
+
+
+def enqueue_job(index, spec, args, writer):
+    """Plan one job spec and put its shards on the shared queue instead of scraping it here"""
+    from scraper import BEUResultScraper
+    from processor import read_registration_csv, registration_groups, plan_semesters
+    from shards import ShardQueue, plan_shards
+    from jobs import JOBS
+
+    summary = {'type': 'enqueued', 'job': index}
+    spec = dict(spec)
+    scraper = BEUResultScraper()
+    try:
+        if spec.get('registration_file'):
+            with open(spec.pop('registration_file'), 'rb') as upload:
+                spec['registration_numbers'] = read_registration_csv(upload)
+        groups, passout_year, error = registration_groups(scraper, spec)
+        if not error:
+            plans, error = plan_semesters(scraper.get_available_result_links(), groups, passout_year,
+                                          spec.get('semesters') or [])
+    except (OSError, TypeError, ValueError) as e:
+        error = ({'error': f'Invalid job spec: {e}'}, 400)
+    finally:
+        scraper.close_driver()
+    if error:
+        summary['error'] = error[0]['error']
+        writer.write(summary)
+        return summary, EXIT_USAGE if error[1] == 400 else EXIT_FAILED
+
+    spec.setdefault('format', args.export)
+    job = JOBS.create(dict(spec, kind='sharded'))
+    summary['job_id'] = job['id']
+    summary['shards'] = ShardQueue().enqueue(job['id'], spec, plan_shards(plans, args.shard_size))
+    writer.write(summary)
+    return summary, EXIT_OK
+
+
+def run_worker(args, writer):
+    """Lease shards from the shared queue until it is empty (or forever with --follow), streaming their records"""
+    from scraper import BEUResultScraper
+    from result_cache import ResultCache
+    from warehouse import ResultWarehouse
+    from shards import ShardQueue, ShardWorker
+
+    started_at = time.perf_counter()
+    scraper = BEUResultScraper(initial_concurrency=args.concurrency, max_concurrency=args.max_concurrency)
+    if not args.no_cache:
+        scraper.cache = ResultCache()
+    scraper.warehouse = ResultWarehouse()
+    scraper.on_result = lambda result: writer.write(
+        dict({key: value for key, value in result.items() if key != 'content_hash'}, type='result')
+    )
+    worker = ShardWorker(ShardQueue(), scraper, lease_seconds=args.lease_seconds)
+    try:
+        completed = worker.run(follow=args.follow)
+    except KeyboardInterrupt:
+        completed = None
+    finally:
+        scraper.close_driver()
+    writer.write({
+        'type': 'worker',
+        'worker': worker.worker,
+        'shards': completed,
+        'fetch_stats': scraper.fetch_stats(),
+        'elapsed_seconds': round(time.perf_counter() - started_at, 3)
+    })
+    return EXIT_OK
+
+
+def combine_exit_codes(codes):
+    """A spec error outranks a failed job, which outranks partial failures"""
+    for code in (EXIT_USAGE, EXIT_FAILED, EXIT_PARTIAL):
+        if code in codes:
+            return code
+    return EXIT_OK
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description='Scrape BEU results headlessly and stream records as NDJSON')
+    parser.add_argument('--spec', help='JSON/NDJSON file with one or more job specs (same keys as /scrape_results)')
+    parser.add_argument('--admission-year', type=int)
+    parser.add_argument('--branch', help='Branch code (e.g. 105) or dashboard branch name')
+    parser.add_argument('--semesters', type=int, nargs='+')
+    parser.add_argument('--start', type=int, help='First roll number of the range')
+    parser.add_argument('--end', type=int, help='Last roll number of the range')
+    parser.add_argument('--passout-year', type=int)
+    parser.add_argument('--registration-numbers', nargs='+', help='Explicit registration numbers instead of a range')
+    parser.add_argument('--registration-file', help='CSV of registration numbers instead of a range')
+    parser.add_argument('--export', choices=['none', 'excel', 'csv', 'workbook'], default='none',
+                        help='Also write an export file to temp/ (a spec "format" key overrides this)')
+    parser.add_argument('--deadline', type=float, help='Stop fetching after this many seconds and export what finished')
+    parser.add_argument('--continuation', help='Resume a job from the continuation_token of a deadline-bounded run')
+    parser.add_argument('--no-cache', action='store_true', help='Fetch every page instead of answering from the result cache')
+    parser.add_argument('--enqueue', action='store_true',
+                        help='Split the job(s) into shards on the shared queue (BEU_SHARD_QUEUE) instead of scraping')
+    parser.add_argument('--shard-size', type=int, default=50, help='Registration numbers per shard with --enqueue')
+    parser.add_argument('--work', action='store_true', help='Lease and scrape shards from the shared queue until it is empty')
+    parser.add_argument('--follow', action='store_true', help='With --work, keep polling for new shards instead of exiting')
+    parser.add_argument('--lease-seconds', type=float, default=60,
+                        help='Shard lease length; a worker silent for this long loses its shard to another')
+    parser.add_argument('--concurrency', type=int, default=4, help='Initial concurrent page fetches')
+    parser.add_argument('--max-concurrency', type=int, default=32)
+    parser.add_argument('--log-level', default=os.environ.get('BEU_LOG_LEVEL', 'WARNING'))
+    return parser
+
+
+def main(argv=None, stdout=None):
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    logging.basicConfig(stream=sys.stderr, level=args.log_level.upper(),
+                        format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    writer = NDJSONWriter(stdout or sys.stdout)
+    if args.work:
+        return run_worker(args, writer)
+
+    if args.spec:
+        try:
+            specs = load_specs(args.spec)
+        except (OSError, ValueError) as e:
+            parser.error(f'cannot load --spec: {e}')
+    elif args.continuation:
+        from processor import resume_spec
+        try:
+            specs = [resume_spec(args.continuation)]
+        except ValueError as e:
+            parser.error(str(e))
+    else:
+        if not args.semesters:
+            parser.error('--semesters is required without --spec')
+        if not (args.registration_numbers or args.registration_file) and None in (args.admission_year, args.branch, args.start, args.end):
+            parser.error('give --admission-year, --branch, --start and --end, or a registration list')
+        specs = [spec_from_args(args)]
+
+    if args.deadline:
+        specs = [dict(spec, deadline_seconds=args.deadline) for spec in specs]
+    if args.enqueue:
+        exit_codes = [enqueue_job(index, spec, args, writer)[1] for index, spec in enumerate(specs)]
+    else:
+        exit_codes = [run_job(index, spec, args, writer)[1] for index, spec in enumerate(specs)]
+    return combine_exit_codes(exit_codes)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
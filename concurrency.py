@@ -0,0 +1,117 @@
+import threading
+import time
+from collections import deque
+
+
+class AIMDLimiter:
+    """Adaptive limit on in-flight requests (additive increase, multiplicative decrease)"""
+
+    # Outcomes that mean the server is overloaded and we should back off
+    OVERLOAD_OUTCOMES = ('timeout', 'server_error', 'throttled')
+
+    def __init__(self, initial_limit=4, min_limit=1, max_limit=32, increase_step=1,
+                 decrease_factor=0.5, latency_target=3.0, error_threshold=0.05, sample_size=50):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.latency_target = latency_target
+        self.error_threshold = error_threshold
+
+        self.limit = float(max(min_limit, min(initial_limit, max_limit)))
+        self.in_flight = 0
+        self.peak_limit = self.limit
+        self.increases = 0
+        self.decreases = 0
+        self.completed = 0
+        self.outcome_counts = {}
+
+        # Recent (latency, outcome) samples used for the p95 / error-rate health check
+        self._samples = deque(maxlen=sample_size)
+        # Successful completions since the last adjustment (one "round" == current limit)
+        self._round_successes = 0
+        # Ignore further decreases until requests started after the last cut complete
+        self._last_decrease_at = 0.0
+        self._condition = threading.Condition()
+
+    @property
+    def window(self):
+        """Current number of requests allowed in flight"""
+        return int(self.limit)
+
+    def acquire(self):
+        """Block until a request slot is free and return the start timestamp"""
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+        return time.monotonic()
+
+    def release(self, started_at, outcome='ok'):
+        """Free a request slot and adjust the limit based on how the request went"""
+        latency = time.monotonic() - started_at
+        with self._condition:
+            self.in_flight -= 1
+            self.completed += 1
+            self.outcome_counts[outcome] = self.outcome_counts.get(outcome, 0) + 1
+            self._samples.append((latency, outcome))
+
+            if outcome in self.OVERLOAD_OUTCOMES:
+                self._on_overload(started_at)
+            elif outcome == 'ok':
+                self._round_successes += 1
+                if self._round_successes >= int(self.limit) and self._is_healthy():
+                    self._round_successes = 0
+                    if self.limit < self.max_limit:
+                        self.limit = min(self.max_limit, self.limit + self.increase_step)
+                        self.peak_limit = max(self.peak_limit, self.limit)
+                        self.increases += 1
+
+            self._condition.notify_all()
+        return latency
+
+    def _on_overload(self, started_at):
+        """Cut the limit once per round of requests when the server signals overload"""
+        self._round_successes = 0
+        if started_at < self._last_decrease_at:
+            # This request was already in flight when we last backed off
+            return
+        new_limit = max(self.min_limit, self.limit * self.decrease_factor)
+        if new_limit < self.limit:
+            self.limit = new_limit
+            self.decreases += 1
+        self._last_decrease_at = time.monotonic()
+
+    def _is_healthy(self):
+        """Check recent p95 latency and error rate against their targets"""
+        if not self._samples:
+            return True
+        p95 = self._percentile(95)
+        errors = len([s for s in self._samples if s[1] != 'ok'])
+        return p95 <= self.latency_target and (errors / len(self._samples)) <= self.error_threshold
+
+    def _percentile(self, pct):
+        latencies = sorted(s[0] for s in self._samples)
+        if not latencies:
+            return 0.0
+        index = min(len(latencies) - 1, int(round(pct / 100.0 * (len(latencies) - 1))))
+        return latencies[index]
+
+    def snapshot(self):
+        """Return the current window and recent health figures for progress/metrics output"""
+        with self._condition:
+            samples = len(self._samples)
+            errors = len([s for s in self._samples if s[1] != 'ok'])
+            return {
+                'window': int(self.limit),
+                'in_flight': self.in_flight,
+                'peak_window': int(self.peak_limit),
+                'min_window': self.min_limit,
+                'max_window': self.max_limit,
+                'p95_latency': round(self._percentile(95), 3),
+                'error_rate': round(errors / samples, 3) if samples else 0.0,
+                'increases': self.increases,
+                'decreases': self.decreases,
+                'completed': self.completed,
+                'outcomes': dict(self.outcome_counts)
+            }
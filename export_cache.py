@@ -0,0 +1,134 @@
+import os
+import json
+import shutil
+import hashlib
+import logging
+import threading
+import time
+from metrics import CACHE_HITS, CACHE_MISSES
+
+logger = logging.getLogger(__name__)
+
+EXPORT_DIR = os.path.join('temp', 'exports')
+# Exports written before the cache existed sit directly in temp/ and are only evicted by age or size
+LEGACY_EXPORT_DIR = 'temp'
+EXPORT_EXTENSIONS = ('.xlsx', '.csv')
+
+# Bump whenever an exporter's output changes so artifacts built by the old layout are not served
+EXPORT_LAYOUT_VERSION = 2
+
+
+def export_key(export_format, params, results):
+    """SHA-256 of the export format, its parameters and every result it is built from"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps(
+        {'format': export_format, 'params': params, 'layout': EXPORT_LAYOUT_VERSION},
+        sort_keys=True, default=str
+    ).encode('utf-8'))
+    for result in results:
+        digest.update(json.dumps(result, sort_keys=True, default=str).encode('utf-8'))
+        digest.update(b'\n')
+    return digest.hexdigest()
+
+
+class ExportCache:
+    """Content-addressed export files with LRU eviction by total size and age"""
+
+    def __init__(self, directory=EXPORT_DIR, max_bytes=512 * 1024 * 1024, max_age_seconds=72 * 3600,
+                 legacy_directory=LEGACY_EXPORT_DIR):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.legacy_directory = legacy_directory
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def _key_lock(self, key):
+        # Two identical requests in one worker build the file once; across workers the rename below keeps it atomic
+        with self._locks_lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def path(self, key, extension):
+        return os.path.join(self.directory, key + extension)
+
+    def get(self, key, extension):
+        """Path of a cached export, marking it as recently used, or None"""
+        filepath = self.path(key, extension)
+        try:
+            # mtime doubles as the LRU clock; atime is unreliable on noatime mounts
+            os.utime(filepath)
+        except FileNotFoundError:
+            CACHE_MISSES.inc(cache='exports')
+            return None
+        CACHE_HITS.inc(cache='exports')
+        return filepath
+
+    def get_or_create(self, key, extension, build):
+        """Return the cached export for key, calling build() -> filepath to create it on a miss"""
+        with self._key_lock(key):
+            filepath = self.get(key, extension)
+            if filepath:
+                return filepath
+            built_path = build()
+            if not built_path:
+                return None
+            os.makedirs(self.directory, exist_ok=True)
+            filepath = self.path(key, extension)
+            shutil.move(built_path, filepath)
+        self.evict()
+        return filepath
+
+    def _entries(self):
+        entries = []
+        candidates = []
+        if os.path.isdir(self.directory):
+            candidates.extend(os.path.join(self.directory, name) for name in os.listdir(self.directory))
+        if self.legacy_directory and os.path.isdir(self.legacy_directory):
+            candidates.extend(
+                os.path.join(self.legacy_directory, name) for name in os.listdir(self.legacy_directory)
+                if name.endswith(EXPORT_EXTENSIONS)
+            )
+        for filepath in candidates:
+            try:
+                stat = os.stat(filepath)
+            except FileNotFoundError:
+                continue
+            if os.path.isfile(filepath):
+                entries.append((stat.st_mtime, stat.st_size, filepath))
+        return entries
+
+    def evict(self):
+        """Delete exports past the age cap, then least recently used ones until under the size cap"""
+        entries = sorted(self._entries())
+        cutoff = time.time() - self.max_age_seconds
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for mtime, size, filepath in entries:
+            if mtime >= cutoff and total <= self.max_bytes:
+                break
+            try:
+                os.remove(filepath)
+                removed += 1
+            except FileNotFoundError:
+                # Another worker evicted it first
+                pass
+            total -= size
+        if removed:
+            logger.info("Evicted %d export file(s), %.1f MB left", removed, total / 1024 / 1024)
+        return removed
+
+    def stats(self):
+        entries = self._entries()
+        return {'files': len(entries), 'bytes': sum(size for _, size, _ in entries)}
+
+
+def export_cache_from_env():
+    """Build the export cache from BEU_EXPORT_CACHE_MB and BEU_EXPORT_MAX_AGE_HOURS"""
+    return ExportCache(
+        directory=os.environ.get('BEU_EXPORT_DIR', EXPORT_DIR),
+        max_bytes=int(float(os.environ.get('BEU_EXPORT_CACHE_MB', 512)) * 1024 * 1024),
+        max_age_seconds=float(os.environ.get('BEU_EXPORT_MAX_AGE_HOURS', 72)) * 3600
+    )
+
+
+EXPORT_CACHE = export_cache_from_env()
@@ -0,0 +1,152 @@
+import os
+import json
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from result_cache import DATA_DIR, journal_mode
+
+JOBS_DIR = os.path.join('temp', 'jobs')
+DEFAULT_JOB_STORE_PATH = os.environ.get('BEU_JOB_STORE', os.path.join(DATA_DIR, 'jobs.sqlite3'))
+
+# Job fields kept as plain columns; spec and result are stored as JSON
+JOB_COLUMNS = ('status', 'progress', 'message', 'created_at', 'updated_at', 'worker')
+
+
+def worker_id():
+    """host:pid of the process running a job, shown on the job page"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobRegistry:
+    """Scrape jobs (state, progress and stored artifacts) in a SQLite file shared by every worker process"""
+
+    def __init__(self, path=DEFAULT_JOB_STORE_PATH, jobs_dir=JOBS_DIR):
+        self.path = path
+        self.jobs_dir = jobs_dir
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(f"PRAGMA journal_mode={journal_mode('BEU_JOB_STORE')}")
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS jobs ('
+                ' id TEXT PRIMARY KEY,'
+                ' status TEXT NOT NULL,'
+                ' progress REAL NOT NULL DEFAULT 0,'
+                ' message TEXT,'
+                ' spec_json TEXT,'
+                ' result_json TEXT,'
+                ' worker TEXT,'
+                ' created_at TEXT NOT NULL,'
+                ' updated_at TEXT NOT NULL)'
+            )
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS artifacts ('
+                ' job_id TEXT NOT NULL,'
+                ' name TEXT NOT NULL,'
+                ' path TEXT NOT NULL,'
+                ' created_at TEXT NOT NULL,'
+                ' PRIMARY KEY (job_id, name))'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS artifacts_by_name ON artifacts (name, created_at)')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS leases ('
+                ' name TEXT PRIMARY KEY,'
+                ' owner TEXT NOT NULL,'
+                ' expires_at REAL NOT NULL)'
+            )
+
+    def _connect(self):
+        # One connection per thread; sqlite3 connections must not cross threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            # Progress updates are frequent and only need to survive a process crash, not a power loss
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def create(self, spec):
+        """Register a new job for the given request spec and return it"""
+        job_id = uuid.uuid4().hex[:16]
+        now = datetime.now().isoformat(timespec='seconds')
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT INTO jobs (id, status, progress, message, spec_json, worker, created_at, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (job_id, 'running', 0, 'Starting', json.dumps(spec, default=str), worker_id(), now, now)
+            )
+        return self.get(job_id)
+
+    def get(self, job_id):
+        conn = self._connect()
+        row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = {column: row[column] for column in JOB_COLUMNS}
+        job['id'] = row['id']
+        job['spec'] = json.loads(row['spec_json']) if row['spec_json'] else {}
+        job['result'] = json.loads(row['result_json']) if row['result_json'] else None
+        job['artifacts'] = {
+            artifact['name']: artifact['path']
+            for artifact in conn.execute('SELECT name, path FROM artifacts WHERE job_id = ?', (job_id,))
+        }
+        return job
+
+    def update(self, job_id, **fields):
+        assignments, params = [], []
+        for name, value in fields.items():
+            if name == 'result':
+                assignments.append('result_json = ?')
+                params.append(json.dumps(value, default=str))
+            elif name in JOB_COLUMNS:
+                assignments.append(f"{name} = ?")
+                params.append(value)
+            else:
+                raise ValueError(f"Unknown job field: {name}")
+        assignments.append('updated_at = ?')
+        params.append(datetime.now().isoformat(timespec='seconds'))
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {', '.join(assignments)} WHERE id = ?", params + [job_id])
+
+    def add_artifact(self, job_id, name, filepath):
+        """Attach a file (export, profile, timeline) to the job"""
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO artifacts (job_id, name, path, created_at) VALUES (?, ?, ?, ?)',
+                (job_id, name, os.path.abspath(filepath), datetime.now().isoformat(timespec='seconds'))
+            )
+
+    def claim_lease(self, name, owner, seconds):
+        """Take or renew a named lease shared by every worker process; True while `owner` holds it"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT INTO leases (name, owner, expires_at) VALUES (?, ?, ?) '
+                'ON CONFLICT (name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at '
+                'WHERE leases.owner = excluded.owner OR leases.expires_at < ?',
+                (name, owner, now + seconds, now)
+            )
+            row = conn.execute('SELECT owner FROM leases WHERE name = ?', (name,)).fetchone()
+        return row['owner'] == owner
+
+    def find_artifact(self, name):
+        """Path of the newest artifact with this file name, whichever worker produced it"""
+        row = self._connect().execute(
+            'SELECT path FROM artifacts WHERE name = ? ORDER BY created_at DESC LIMIT 1', (name,)
+        ).fetchone()
+        return row['path'] if row else None
+
+    def job_dir(self, job_id):
+        """Directory where a job's profile and timeline are stored"""
+        directory = os.path.join(self.jobs_dir, job_id)
+        os.makedirs(directory, exist_ok=True)
+        return directory
+
+
+JOBS = JobRegistry()
@@ -0,0 +1,388 @@
+"""Local stand-in for results.beup.ac.in used for end-to-end load testing.
+
+Serves the homepage exam table that BEUResultScraper.get_available_result_links
+parses, the ASP.NET postback/search round-trip, and result pages generated from
+the debug_page_*.html fixtures for any registration number.
+
+    python loadtest/mock_portal.py --port 8085 --latency 0.2 --error-rate 0.02 --throttle-rps 50
+    BEU_BASE_URL=http://127.0.0.1:8085/ python app.py
+"""
+import argparse
+import base64
+import glob
+import hashlib
+import os
+import random
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+
+from flask import Flask, Response, redirect, request
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ROMAN = ['I', 'II', 'III', 'IV', 'V', 'VI', 'VII', 'VIII']
+ORDINAL = {1: 'st', 2: 'nd', 3: 'rd'}
+GRADE_POINTS = [(90, 'A+', 10), (80, 'A', 9), (70, 'B', 8), (60, 'C', 7), (50, 'D', 6), (35, 'P', 5), (0, 'F', 0)]
+FIRST_NAMES = ['ANKIT', 'PRIYA', 'RAHUL', 'SNEHA', 'AMAN', 'KHUSHI', 'ROHIT', 'NEHA', 'VIKASH', 'ANJALI']
+LAST_NAMES = ['KUMAR', 'SINGH', 'KUMARI', 'RAJ', 'GUPTA', 'SHARMA', 'PRASAD', 'YADAV']
+
+SUBJECT_ROW = re.compile(
+    r'(<tr align="left">\s*<td align="center">)([^<]+)(</td><td align="left">)([^<]+)'
+    r'(</td><td align="center">)[^<]*(</td><td align="center">)[^<]*(</td><td align="center">)[^<]*'
+    r'(</td><td align="center">)[^<]*(</td>)'
+)
+
+
+def ordinal(number):
+    return f"{number}{ORDINAL.get(number, 'th')}"
+
+
+class MockPortalConfig:
+    """Knobs for the simulated server behaviour"""
+
+    def __init__(self, latency=0.1, latency_jitter=0.05, error_rate=0.0, throttle_rps=0.0,
+                 capacity=0, no_record_rate=0.1, batches=(2021, 2022, 2023, 2024), seed=1, etag=False,
+                 special_rate=0.0):
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.throttle_rps = throttle_rps
+        self.capacity = capacity
+        self.no_record_rate = no_record_rate
+        self.batches = tuple(batches)
+        self.seed = seed
+        self.etag = etag
+        self.special_rate = special_rate
+
+
+class MockPortal:
+    """State of the mock portal: exam list, page templates and load counters"""
+
+    def __init__(self, config):
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.exams = self._build_exams()
+        self.template_page, self.template_reg = self._load_template()
+        self.published_at = datetime.now()
+        self.in_flight = 0
+        self.request_count = 0
+        self._window_started_at = time.monotonic()
+        self._window_count = 0
+        self._lock = threading.Lock()
+
+    def _build_exams(self):
+        """One regular exam per (batch, semester) that has already been held, each followed by a special exam when enabled"""
+        exams = {}
+        current_year = datetime.now().year
+        for batch in self.config.batches:
+            for semester in range(1, 9):
+                exam_year = batch + (semester - 1) // 2
+                if exam_year >= current_year:
+                    continue
+                exam = self._exam(batch, semester, f"{(semester * 3) % 28 + 1:02d}-{semester % 12 + 1:02d}-{exam_year + 1}")
+                exams[exam['key']] = exam
+                if self.config.special_rate:
+                    special = self._exam(batch, semester, f"{(semester * 3) % 28 + 1:02d}-{semester % 12 + 1:02d}-{exam_year + 2}",
+                                         special=True)
+                    exams[special['key']] = special
+        return exams
+
+    def _exam(self, batch, semester, published_date, special=False):
+        exam_year = batch + (semester - 1) // 2
+        return {
+            'key': f"BTech{ordinal(semester)}Sem{exam_year}_B{batch}" + ('_Special' if special else ''),
+            'semester': semester,
+            'exam_year': exam_year,
+            'batch': batch,
+            'batch_session': f"{batch}-{str(batch + 4)[-2:]}",
+            'published_date': published_date,
+            'title': f"B.Tech. {semester}<sup>{ORDINAL.get(semester, 'th')}</sup> Semester "
+                     f"{'Special ' if special else ''}Examination, {exam_year}",
+            'is_special': special,
+            'revaluations': []
+        }
+
+    def publish(self, batch, semester, published_date=None, revaluation_rate=0.0):
+        """Add an exam row, or re-date an existing one as a (revaluation) re-publication would"""
+        exam = self._exam(batch, semester, published_date or datetime.now().strftime('%d-%m-%Y'))
+        with self._lock:
+            previous = self.exams.get(exam['key'])
+            if previous:
+                exam['revaluations'] = previous['revaluations'] + ([revaluation_rate] if revaluation_rate else [])
+            self.exams[exam['key']] = exam
+        return exam
+
+    def revision(self, exam, registration):
+        """Latest revaluation round that changed this student's marks (0 = original result)"""
+        revision = 0
+        for round_number, rate in enumerate(exam['revaluations'], 1):
+            digest = int(hashlib.sha256(f"{self.config.seed}:{exam['key']}:{registration}:{round_number}".encode()).hexdigest(), 16)
+            if (digest % 10000) / 10000.0 < rate:
+                revision = round_number
+        return revision
+
+    def _load_template(self):
+        """Use the first student result fixture as the page skeleton"""
+        for path in sorted(glob.glob(os.path.join(REPO_ROOT, 'debug_page_*.html'))):
+            registration = os.path.basename(path)[len('debug_page_'):-len('.html')]
+            if len(registration) == 11:
+                with open(path, encoding='utf-8') as f:
+                    return f.read(), registration
+        raise SystemExit('No debug_page_<registration>.html fixture found to model result pages on')
+
+    # Load simulation -----------------------------------------------------
+
+    def begin_request(self):
+        """Return an error response (status, headers) if this request should fail, else None"""
+        with self._lock:
+            self.request_count += 1
+            self.in_flight += 1
+            now = time.monotonic()
+            if now - self._window_started_at >= 1.0:
+                self._window_started_at = now
+                self._window_count = 0
+            self._window_count += 1
+            over_rate = self.config.throttle_rps and self._window_count > self.config.throttle_rps
+            over_capacity = self.config.capacity and self.in_flight > self.config.capacity
+            in_flight = self.in_flight
+
+        if over_rate:
+            return 429, {'Retry-After': '1'}
+        if over_capacity:
+            return 503, {}
+        if self.config.error_rate and self.random.random() < self.config.error_rate:
+            return 500, {}
+
+        delay = max(0.0, self.random.gauss(self.config.latency, self.config.latency_jitter))
+        if self.config.capacity:
+            # Latency climbs as the server approaches capacity
+            delay *= 1 + in_flight / self.config.capacity
+        time.sleep(delay)
+        return None
+
+    def end_request(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    # Pages ---------------------------------------------------------------
+
+    def _hidden_fields(self, size=2000):
+        viewstate = base64.b64encode(self.random.randbytes(size)).decode()
+        validation = base64.b64encode(self.random.randbytes(96)).decode()
+        return (
+            '<div class="aspNetHidden">\n'
+            '<input type="hidden" name="__EVENTTARGET" id="__EVENTTARGET" value="">\n'
+            '<input type="hidden" name="__EVENTARGUMENT" id="__EVENTARGUMENT" value="">\n'
+            f'<input type="hidden" name="__VIEWSTATE" id="__VIEWSTATE" value="{viewstate}">\n'
+            f'<input type="hidden" name="__EVENTVALIDATION" id="__EVENTVALIDATION" value="{validation}">\n'
+            '</div>\n'
+        )
+
+    def homepage(self):
+        rows = []
+        for exam in sorted(list(self.exams.values()), key=lambda e: e['published_date'][-4:] + e['published_date'][3:5], reverse=True):
+            target = f"ctl00$ContentPlaceHolder1$LinkButton_{exam['key']}"
+            rows.append(
+                '    <tr>\n'
+                '        <td style="text-align: left; font-weight:bold;">\n'
+                f'            <a id="ContentPlaceHolder1_LinkButton_{exam["key"]}" '
+                f'href="javascript:__doPostBack(\'{target}\',\'\')">{exam["title"]}</a></td>\n'
+                f'        <td style="text-align: center">\n            {exam["batch_session"]}</td>\n'
+                f'        <td>\n            {exam["published_date"]}</td>\n'
+                '    </tr>\n'
+            )
+        return (
+            '<html><head><title>.:BEU, Patna - Results official website:.</title></head>\n'
+            '<body id="top">\n<form method="post" action="./Default.aspx" id="form1">\n'
+            + self._hidden_fields(64) +
+            '<table class="style1" align="center" border="1">\n<tbody>'
+            '<tr style="background-color:Olive;color:#eaee64;">\n'
+            '<td class="style3">Examinations Name</td><td class="style3">Batch/ Session</td>'
+            '<td class="style3">Published Date </td></tr>\n'
+            '<tr><td colspan="3" style="background-color:Silver;" class="style2"><strong>M.Tech.</strong></td></tr>\n'
+            '<tr><td><a href="javascript:__doPostBack(\'ctl00$ContentPlaceHolder1$LinkButton_MTech1stSem_2023\',\'\')">'
+            'M.Tech. 1<sup>st</sup> Semester Examination, 2023</a></td><td>2023-25</td><td>20-01-2025</td></tr>\n'
+            '<tr><td colspan="3" style="background-color:Silver;" class="style2"><strong>B.Tech.</strong></td></tr>\n'
+            + ''.join(rows) +
+            '</tbody></table>\n</form>\n</body></html>\n'
+        )
+
+    def search_page(self, exam):
+        return (
+            f'<html><head><title>{exam["title"]}</title></head>\n<body id="top">\n'
+            f'<form method="post" action="./{exam["key"]}Results.aspx" id="form1">\n'
+            + self._hidden_fields(256) +
+            f'<span style="color:#FF3300;">{exam["title"]}</span>\n'
+            '<table><tr><td>Registration No:</td><td>'
+            '<input name="ctl00$ContentPlaceHolder1$TextBox_RegNo" type="text" maxlength="11" '
+            'id="ContentPlaceHolder1_TextBox_RegNo"></td></tr>\n'
+            '<tr><td colspan="2"><input type="submit" name="ctl00$ContentPlaceHolder1$Button1" '
+            'value="Show Result" id="ContentPlaceHolder1_Button1"></td></tr></table>\n'
+            '</form>\n</body></html>\n'
+        )
+
+    def has_record(self, registration, exam=None):
+        digest = int(hashlib.sha256(f"{self.config.seed}:{registration}".encode()).hexdigest(), 16)
+        if (digest % 10000) / 10000.0 < self.config.no_record_rate:
+            return False
+        if exam and exam['is_special']:
+            # Only the students who re-appeared have a page in a special exam
+            digest = int(hashlib.sha256(f"{self.config.seed}:{exam['key']}:{registration}".encode()).hexdigest(), 16)
+            return (digest % 10000) / 10000.0 < self.config.special_rate
+        return True
+
+    def no_record_page(self, exam):
+        return (
+            f'<html><head><title>{exam["title"]}</title></head>\n<body id="top">\n'
+            f'<form method="post" action="./{exam["key"]}Results.aspx" id="form1">\n'
+            + self._hidden_fields(256) +
+            '<span id="ContentPlaceHolder1_Label_Msg" style="color:Red;font-weight:700">No Record Found !!!</span>\n'
+            '</form>\n</body></html>\n'
+        )
+
+    def result_page(self, exam, registration):
+        """Fixture page rewritten for this student and exam with deterministic marks"""
+        revision = self.revision(exam, registration)
+        rng = random.Random(f"{self.config.seed}:{exam['key']}:{registration}" + (f":r{revision}" if revision else ''))
+        page = self.template_page.replace(self.template_reg, registration)
+
+        # The name depends on the student only, so it stays the same across exams and revaluations
+        name_rng = random.Random(f"{self.config.seed}:{registration}")
+        name = f"{name_rng.choice(FIRST_NAMES)} {name_rng.choice(LAST_NAMES)}"
+        page = re.sub(r'(StudentNameLabel_0"[^>]*>)[^<]*', lambda m: m.group(1) + name, page)
+
+        grade_points = []
+
+        def subject_marks(match):
+            ese, ia = rng.randint(10, 70), rng.randint(8, 30)
+            total = ese + ia
+            grade, points = next((g, p) for bound, g, p in GRADE_POINTS if total >= bound)
+            grade_points.append(points)
+            return (f"{match.group(1)}{match.group(2)}{match.group(3)}{match.group(4)}{match.group(5)}{ese}"
+                    f"{match.group(6)}{ia}{match.group(7)}{total}{match.group(8)}{grade}{match.group(9)}")
+
+        page = SUBJECT_ROW.sub(subject_marks, page)
+        sgpa = sum(grade_points) / len(grade_points) if grade_points else 0.0
+        page = re.sub(r'(GROSSTHEORYTOTALLabel_0"[^>]*>)[^<]*', lambda m: m.group(1) + f"{sgpa:.2f}", page)
+
+        history = [f"{rng.uniform(5, 9.5):.2f}" if i < exam['semester'] - 1 else 'NA' for i in range(8)]
+        history[exam['semester'] - 1] = f"{sgpa:.2f}"
+        taken = [float(v) for v in history if v != 'NA']
+        cgpa = sum(taken) / len(taken)
+        history_row = ''.join(f"<td>{value}</td>" for value in history) + f"<td>{cgpa:.2f}</td>"
+        page = re.sub(r'(id="ContentPlaceHolder1_GridView3".*?</tr><tr align="center">\s*)(.*?)(\s*</tr>)',
+                      lambda m: m.group(1) + history_row + m.group(3), page, count=1, flags=re.S)
+
+        page = re.sub(r'(Exam_Name_0"[^>]*>)B\.Tech[^<]*<sup>[^<]*</sup>[^<]*', lambda m: m.group(1) + exam['title'], page)
+        page = re.sub(r'(DataList2_Exam_Name_0">)[^<]*', lambda m: m.group(1) + ROMAN[exam['semester'] - 1], page)
+        page = re.sub(r'(Publish Date :</strong>)[^<]*', lambda m: m.group(1) + exam['published_date'], page)
+        return page
+
+
+def create_app(config):
+    portal = MockPortal(config)
+    app = Flask(__name__)
+    app.config['PORTAL'] = portal
+
+    @app.before_request
+    def simulate_load():
+        failure = portal.begin_request()
+        request.environ['mock_portal.counted'] = True
+        if failure:
+            status, headers = failure
+            return Response(f"Simulated {status}", status=status, headers=headers)
+
+    @app.teardown_request
+    def finish_request(exc):
+        if request.environ.get('mock_portal.counted'):
+            portal.end_request()
+
+    @app.route('/', methods=['GET', 'POST'])
+    @app.route('/Default.aspx', methods=['GET', 'POST'])
+    def homepage():
+        if request.method == 'POST':
+            target = request.form.get('__EVENTTARGET', '')
+            key = target.rsplit('LinkButton_', 1)[-1]
+            if key not in portal.exams:
+                return Response('Unknown exam', status=404)
+            return redirect(f"/{key}Results.aspx")
+        response = Response(portal.homepage(), mimetype='text/html')
+        if portal.config.etag:
+            # Tag the exam list rather than the body, whose __VIEWSTATE changes on every request
+            exam_state = sorted((exam['key'], exam['published_date']) for exam in list(portal.exams.values()))
+            response.set_etag(hashlib.md5(repr(exam_state).encode()).hexdigest())
+            response = response.make_conditional(request)
+        return response
+
+    @app.route('/<key>Results.aspx', methods=['GET', 'POST'])
+    def search(key):
+        exam = portal.exams.get(key)
+        if not exam:
+            return Response('Unknown exam', status=404)
+        if request.method == 'POST':
+            registration = request.form.get('ctl00$ContentPlaceHolder1$TextBox_RegNo', '').strip()
+            return redirect(f"/Results{key}Pub.aspx?Sem={ROMAN[exam['semester'] - 1]}&RegNo={registration}")
+        return Response(portal.search_page(exam), mimetype='text/html')
+
+    @app.route('/Results<key>Pub.aspx')
+    def result(key):
+        exam = portal.exams.get(key)
+        registration = request.args.get('RegNo', '')
+        if not exam:
+            return Response('Unknown exam', status=404)
+        if not re.match(r'^\d{11}$', registration) or not portal.has_record(registration, exam):
+            return Response(portal.no_record_page(exam), mimetype='text/html')
+        return Response(portal.result_page(exam, registration), mimetype='text/html')
+
+    @app.route('/__mock/stats')
+    def stats():
+        return {'requests': portal.request_count, 'in_flight': portal.in_flight}
+
+    @app.route('/__mock/publish', methods=['POST'])
+    def publish():
+        spec = request.get_json(force=True)
+        exam = portal.publish(int(spec['batch']), int(spec['semester']), spec.get('published_date'),
+                              float(spec.get('revaluation_rate', 0.0)))
+        return {'key': exam['key'], 'published_date': exam['published_date'], 'revaluations': len(exam['revaluations'])}
+
+    return app
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description='Mock BEU results portal for load testing')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8085)
+    parser.add_argument('--latency', type=float, default=0.1, help='Mean response latency in seconds')
+    parser.add_argument('--latency-jitter', type=float, default=0.05, help='Std-dev of the latency in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with 500')
+    parser.add_argument('--throttle-rps', type=float, default=0.0, help='Answer 429 above this many requests/second (0 = off)')
+    parser.add_argument('--capacity', type=int, default=0, help='Answer 503 above this many concurrent requests (0 = off)')
+    parser.add_argument('--no-record-rate', type=float, default=0.1, help='Fraction of registration numbers with no result')
+    parser.add_argument('--batches', type=int, nargs='+', default=[2021, 2022, 2023, 2024], help='Admission years with published exams')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--etag', action='store_true', help='Send ETags and answer conditional homepage GETs with 304')
+    parser.add_argument('--special-rate', type=float, default=0.0,
+                        help='Publish a special exam after every regular one, re-taken by this fraction of students')
+    return parser
+
+
+def config_from_args(args):
+    return MockPortalConfig(
+        latency=args.latency, latency_jitter=args.latency_jitter, error_rate=args.error_rate,
+        throttle_rps=args.throttle_rps, capacity=args.capacity, no_record_rate=args.no_record_rate,
+        batches=args.batches, seed=args.seed, etag=args.etag, special_rate=args.special_rate
+    )
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    app = create_app(config_from_args(args))
+    print(f"Mock BEU portal on http://{args.host}:{args.port}/", file=sys.stderr)
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
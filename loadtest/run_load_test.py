@@ -0,0 +1,186 @@
+"""End-to-end load test: drive /scrape_results against the mock BEU portal.
+
+Starts loadtest/mock_portal.py in a subprocess, points the app at it through
+BEU_BASE_URL and runs one or more concurrent scrape jobs through the Flask
+test client. Reports throughput, job and page-fetch latency percentiles and
+the peak RSS of the app process.
+
+    python loadtest/run_load_test.py --students 200 --semesters 1 2 3 --jobs 2 --latency 0.2
+"""
+import argparse
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+LOADTEST_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(LOADTEST_DIR)
+sys.path.insert(0, REPO_ROOT)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, if the platform can tell us"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is KB on Linux and bytes on macOS
+        return round(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024, 1)
+    except ImportError:
+        try:
+            import psutil
+            info = psutil.Process().memory_info()
+            return round(getattr(info, 'peak_wset', info.rss) / (1024 * 1024), 1)
+        except ImportError:
+            return None
+
+
+def percentiles(values):
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def pick(pct):
+        return round(ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))], 3)
+
+    return {'p50': pick(50), 'p90': pick(90), 'p95': pick(95), 'p99': pick(99), 'max': round(ordered[-1], 3)}
+
+
+def start_mock_portal(args, port):
+    command = [
+        sys.executable, os.path.join(LOADTEST_DIR, 'mock_portal.py'),
+        '--port', str(port),
+        '--latency', str(args.latency),
+        '--latency-jitter', str(args.latency_jitter),
+        '--error-rate', str(args.error_rate),
+        '--throttle-rps', str(args.throttle_rps),
+        '--capacity', str(args.capacity),
+        '--no-record-rate', str(args.no_record_rate),
+        '--batches', str(args.admission_year)
+    ]
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    stats_url = f"http://127.0.0.1:{port}/__mock/stats"
+    for _ in range(100):
+        try:
+            if requests.get(stats_url, timeout=1).ok:
+                return process
+        except requests.RequestException:
+            pass
+        time.sleep(0.1)
+    process.kill()
+    raise SystemExit('Mock portal did not start')
+
+
+def run_load_test(args):
+    port = free_port()
+    mock = start_mock_portal(args, port)
+    workdir = tempfile.mkdtemp(prefix='beu-loadtest-')
+    previous_cwd = os.getcwd()
+    os.environ['BEU_BASE_URL'] = f"http://127.0.0.1:{port}/"
+    os.environ.setdefault('BEU_LOG_LEVEL', 'WARNING')
+    os.chdir(workdir)
+    try:
+        import app as webapp
+        from metrics import PAGE_FETCH_SECONDS, PARSE_SECONDS
+
+        branch_name = next(name for name, code in webapp.BRANCH_CODES.items() if code == args.branch_code)
+        job_latencies = []
+        responses = []
+        lock = threading.Lock()
+
+        def run_job(job_index):
+            client = webapp.app.test_client()
+            client.post('/authenticate', data={'username': webapp.VALID_USERNAME, 'password': webapp.VALID_PASSWORD})
+            payload = {
+                'admission_year': args.admission_year,
+                'branch': branch_name,
+                'semesters': args.semesters,
+                'start_reg': 1,
+                'end_reg': args.students,
+                'format': args.format,
+                'use_cache': args.use_cache
+            }
+            started_at = time.perf_counter()
+            response = client.post('/scrape_results', json=payload)
+            elapsed = time.perf_counter() - started_at
+            with lock:
+                job_latencies.append(elapsed)
+                responses.append((response.status_code, response.get_json()))
+
+        started_at = time.perf_counter()
+        threads = [threading.Thread(target=run_job, args=(i,)) for i in range(args.jobs)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall_seconds = time.perf_counter() - started_at
+
+        records = sum((body or {}).get('total_results', 0) for _, body in responses)
+        pages = PAGE_FETCH_SECONDS.count(outcome='ok')
+        mock_stats = requests.get(f"http://127.0.0.1:{port}/__mock/stats", timeout=5).json()
+        return {
+            'config': vars(args),
+            'wall_seconds': round(wall_seconds, 3),
+            'jobs': len(responses),
+            'failed_jobs': len([status for status, _ in responses if status != 200]),
+            'records': records,
+            'throughput_records_per_second': round(records / wall_seconds, 2) if wall_seconds else None,
+            'pages_fetched': pages,
+            'server_requests': mock_stats['requests'],
+            'job_latency_seconds': percentiles(job_latencies),
+            'page_fetch_latency_seconds': {
+                f"p{int(q * 100)}": round(PAGE_FETCH_SECONDS.quantile(q) or 0, 3) for q in (0.5, 0.9, 0.95, 0.99)
+            },
+            'parse_seconds_p50': round(PARSE_SECONDS.quantile(0.5) or 0, 4),
+            'fetch_stats': [(body or {}).get('fetch_stats') for _, body in responses],
+            'errors': [(body or {}).get('error') for status, body in responses if status != 200],
+            'peak_rss_mb': peak_rss_mb()
+        }
+    finally:
+        os.chdir(previous_cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+        mock.terminate()
+        mock.wait(timeout=10)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test /scrape_results against the mock BEU portal')
+    parser.add_argument('--students', type=int, default=100, help='Registration numbers per job (1..N)')
+    parser.add_argument('--semesters', type=int, nargs='+', default=[1, 2])
+    parser.add_argument('--jobs', type=int, default=1, help='Concurrent /scrape_results jobs')
+    parser.add_argument('--admission-year', type=int, default=2023)
+    parser.add_argument('--branch-code', default='105')
+    parser.add_argument('--format', choices=['excel', 'csv'], default='excel')
+    parser.add_argument('--latency', type=float, default=0.1)
+    parser.add_argument('--latency-jitter', type=float, default=0.05)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--throttle-rps', type=float, default=0.0)
+    parser.add_argument('--capacity', type=int, default=0)
+    parser.add_argument('--no-record-rate', type=float, default=0.1)
+    parser.add_argument('--use-cache', action='store_true',
+                        help='Let jobs answer from the result cache (off by default so every page is fetched)')
+    parser.add_argument('--output', help='Also write the report as JSON to this path')
+    args = parser.parse_args(argv)
+
+    report = run_load_test(args)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    return 1 if report['failed_jobs'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,216 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+def _escape_label(value):
+    """Escape a label value for the Prometheus text format"""
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+class _Metric:
+    """Base for a labelled metric family that renders in Prometheus text format"""
+    metric_type = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _format_labels(self, key, extra=None):
+        pairs = list(zip(self.labelnames, key))
+        if extra:
+            pairs.extend(extra)
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{name}="{_escape_label(value)}"' for name, value in pairs) + '}'
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        with self._lock:
+            lines.extend(self._render_samples())
+        return lines
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    """Monotonically increasing count, e.g. retries or errors by category"""
+    metric_type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _render_samples(self):
+        return [f"{self.name}{self._format_labels(key)} {value}" for key, value in sorted(self._values.items())]
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, e.g. the current concurrency window"""
+    metric_type = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _render_samples(self):
+        return [f"{self.name}{self._format_labels(key)} {value}" for key, value in sorted(self._values.items())]
+
+
+class Histogram(_Metric):
+    """Distribution of observed values (latencies in seconds) in cumulative buckets"""
+    metric_type = 'histogram'
+
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+                self._values[key] = state
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['counts'][i] += 1
+            state['sum'] += value
+            state['count'] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall time of the enclosed block"""
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started_at, **labels)
+
+    def count(self, **labels):
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return state['count'] if state else 0
+
+    def quantile(self, q):
+        """Estimate the q-quantile across all label sets (like PromQL histogram_quantile)"""
+        with self._lock:
+            counts = [0] * len(self.buckets)
+            total = 0
+            for state in self._values.values():
+                counts = [a + b for a, b in zip(counts, state['counts'])]
+                total += state['count']
+        if not total:
+            return None
+        rank = q * total
+        lower_bound, lower_count = 0.0, 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            if bucket_count >= rank:
+                if bucket_count == lower_count:
+                    return bound
+                return lower_bound + (bound - lower_bound) * (rank - lower_count) / (bucket_count - lower_count)
+            lower_bound, lower_count = bound, bucket_count
+        # Beyond the largest finite bucket
+        return self.buckets[-1]
+
+    def _render_samples(self):
+        lines = []
+        for key, state in sorted(self._values.items()):
+            for bound, bucket_count in zip(self.buckets, state['counts']):
+                lines.append(f"{self.name}_bucket{self._format_labels(key, [('le', repr(float(bound)))])} {bucket_count}")
+            lines.append(f"{self.name}_bucket{self._format_labels(key, [('le', '+Inf')])} {state['count']}")
+            lines.append(f"{self.name}_sum{self._format_labels(key)} {state['sum']}")
+            lines.append(f"{self.name}_count{self._format_labels(key)} {state['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics exported together on /metrics"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=Histogram.DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        """Render every metric in the Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        for metric in self._metrics:
+            metric.reset()
+
+
+REGISTRY = MetricsRegistry()
+
+HOMEPAGE_FETCH_SECONDS = REGISTRY.histogram(
+    'beu_homepage_fetch_seconds', 'Time to fetch and parse the results homepage exam table')
+LINK_RESOLUTION_SECONDS = REGISTRY.histogram(
+    'beu_link_resolution_seconds', 'Time to resolve a semester exam link to its result page URL')
+PAGE_FETCH_SECONDS = REGISTRY.histogram(
+    'beu_page_fetch_seconds', 'Latency of individual result page fetches', ['outcome'])
+PARSE_SECONDS = REGISTRY.histogram(
+    'beu_parse_seconds', 'Time to parse one student result page',
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0))
+EXPORT_SECONDS = REGISTRY.histogram(
+    'beu_export_seconds', 'Time to build an export file', ['format'])
+CACHE_HITS = REGISTRY.counter(
+    'beu_cache_hits_total', 'Lookups answered from a local cache', ['cache'])
+CACHE_MISSES = REGISTRY.counter(
+    'beu_cache_misses_total', 'Lookups that had to go to the network', ['cache'])
+FETCH_RETRIES = REGISTRY.counter(
+    'beu_fetch_retries_total', 'Result page fetches retried after a transient failure')
+ERRORS = REGISTRY.counter(
+    'beu_errors_total', 'Errors by category', ['category'])
+STUDENTS_SCRAPED = REGISTRY.counter(
+    'beu_students_scraped_total', 'Student result pages processed', ['status'])
+DEAD_LETTERS = REGISTRY.counter(
+    'beu_dead_letters_total', 'Students moved to the deferred retry pass and how they ended', ['outcome'])
+CONCURRENCY_WINDOW = REGISTRY.gauge(
+    'beu_concurrency_window', 'Current adaptive limit on in-flight result page fetches')
+REQUESTS_IN_FLIGHT = REGISTRY.gauge(
+    'beu_requests_in_flight', 'Result page fetches currently in flight')
+WATCHER_POLLS = REGISTRY.counter(
+    'beu_watcher_polls_total', 'Homepage polls by the publication watcher', ['result'])
+PREWARM_STUDENTS = REGISTRY.counter(
+    'beu_prewarm_students_total', 'Student results pre-scraped into the result cache')
+SHARD_LEASES = REGISTRY.counter(
+    'beu_shard_leases_total', 'Shard queue leases and how they ended', ['outcome'])
+STUDENT_LOOKUP_SECONDS = REGISTRY.histogram(
+    'beu_student_lookup_seconds', 'Latency of /api/student lookups', ['source'])
@@ -0,0 +1,211 @@
+"""Paged, sortable preview of a finished job, read back from the result cache.
+
+When a job runs with the result cache, it records which exam pages and
+registration numbers it covered (its "sources") next to the job. The preview
+rebuilds the job's records from the cache on first request and keeps them in
+memory for a few jobs, so paging, sorting and filtering never touch the
+portal or build a spreadsheet.
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+from warehouse import BACKLOG_GRADES
+
+SOURCES_FILENAME = 'preview_sources.json'
+
+PREVIEW_COLUMNS = (
+    'registration_number', 'name', 'branch_code', 'admission_year', 'semester', 'year', 'sgpa', 'cgpa', 'result',
+    'backlogs', 'error'
+)
+NUMERIC_COLUMNS = ('admission_year', 'semester', 'year', 'sgpa', 'cgpa', 'backlogs')
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Fields of an exam link that identify its rows in the result cache (see result_cache.exam_key)
+EXAM_FIELDS = ('text', 'batch_session', 'published_date', 'semester', 'year', 'is_special')
+
+
+def job_sources(plans):
+    """JSON-able record of the exam pages (with special attempts) and registration numbers of planned groups"""
+    return [
+        {
+            'admission_year': admission_year,
+            'branch_code': branch_code,
+            'registration_numbers': reg_numbers,
+            'exams': [
+                [{field: exam.get(field) for field in EXAM_FIELDS} for exam in semester_link.get('attempts') or [semester_link]]
+                for semester_link in semester_links
+            ]
+        }
+        for admission_year, branch_code, reg_numbers, semester_links in plans
+    ]
+
+
+def save_sources(job_dir, sources):
+    path = os.path.join(job_dir, SOURCES_FILENAME)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(sources, f)
+    return path
+
+
+def load_sources(job_dir):
+    """A job's sources, or None when it was not run with the result cache"""
+    try:
+        with open(os.path.join(job_dir, SOURCES_FILENAME), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def preview_row(result, admission_year, branch_code):
+    subjects = result.get('subjects') or {}
+    return {
+        'registration_number': result.get('registration_number'),
+        'name': result.get('name') or '',
+        'branch_code': branch_code,
+        'admission_year': admission_year,
+        'semester': result.get('semester'),
+        'year': result.get('year'),
+        'sgpa': _number(result.get('sgpa')),
+        'cgpa': _number(result.get('cgpa')),
+        'result': result.get('result') or '',
+        'backlogs': sum(
+            1 for details in subjects.values()
+            if isinstance(details, dict) and (details.get('grade') or '').strip().upper() in BACKLOG_GRADES
+        ),
+        'error': result.get('error') or ''
+    }
+
+
+def load_job_results(cache, sources):
+    """(rows, groups) rebuilt from the cache; groups holds the full records per (admission year, branch) for exports"""
+    from scraper import merge_attempts
+
+    rows = []
+    groups = OrderedDict()
+    for source in sources:
+        reg_numbers = source['registration_numbers']
+        group = groups.setdefault((source['admission_year'], source['branch_code']), [])
+        for attempts in source['exams']:
+            cached = [cache.get_many(exam, reg_numbers) for exam in attempts]
+            for reg_number in reg_numbers:
+                found = [(exam, results[reg_number]) for exam, results in zip(attempts, cached) if reg_number in results]
+                if not found:
+                    continue
+                result = found[0][1] if len(attempts) == 1 else merge_attempts(found)
+                group.append(result)
+                rows.append(preview_row(result, source['admission_year'], source['branch_code']))
+    return rows, groups
+
+
+def _matches(row, filters):
+    query = (filters.get('q') or '').strip().lower()
+    if query and query not in row['registration_number'] and query not in row['name'].lower():
+        return False
+    if filters.get('semester') not in (None, '') and str(row['semester']) != str(filters['semester']):
+        return False
+    if filters.get('result') and row['result'].upper() != filters['result'].upper():
+        return False
+    if filters.get('min_sgpa') not in (None, '') and (row['sgpa'] is None or row['sgpa'] < float(filters['min_sgpa'])):
+        return False
+    if filters.get('max_sgpa') not in (None, '') and (row['sgpa'] is None or row['sgpa'] > float(filters['max_sgpa'])):
+        return False
+    if filters.get('backlogs') in ('1', 'true', 'yes') and not row['backlogs']:
+        return False
+    if filters.get('errors') == 'only' and not row['error']:
+        return False
+    if filters.get('errors') == 'exclude' and row['error']:
+        return False
+    return True
+
+
+class JobPreview:
+    """One job's preview rows with its sorted and filtered views memoised, so scrolling costs a slice"""
+
+    FILTERS = ('q', 'semester', 'result', 'min_sgpa', 'max_sgpa', 'backlogs', 'errors')
+
+    def __init__(self, rows, groups, max_views=16):
+        self.rows = rows
+        self.groups = groups
+        self.max_views = max_views
+        self._views = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _view(self, sort, descending, filters):
+        key = (sort, descending, tuple(filters.get(name) for name in self.FILTERS))
+        with self._lock:
+            view = self._views.get(key)
+            if view is not None:
+                self._views.move_to_end(key)
+                return view
+        view = [row for row in self.rows if _matches(row, filters)] if any(filters.values()) else list(self.rows)
+        if sort:
+            if sort in NUMERIC_COLUMNS:
+                # Blank values sort last in either direction
+                present = [row for row in view if row[sort] is not None]
+                missing = [row for row in view if row[sort] is None]
+                present.sort(key=lambda row: row[sort], reverse=descending)
+                view = present + missing
+            else:
+                view.sort(key=lambda row: str(row[sort] or '').lower(), reverse=descending)
+        with self._lock:
+            self._views[key] = view
+            while len(self._views) > self.max_views:
+                self._views.popitem(last=False)
+        return view
+
+    def page(self, offset=0, limit=DEFAULT_PAGE_SIZE, sort=None, descending=False, filters=None, columns=None):
+        """One page of rows as lists in `columns` order, plus the total and filtered counts"""
+        columns = list(columns or PREVIEW_COLUMNS)
+        unknown = [column for column in columns if column not in PREVIEW_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown columns {unknown}, expected some of {list(PREVIEW_COLUMNS)}")
+        if sort and sort not in PREVIEW_COLUMNS:
+            raise ValueError(f"Cannot sort by '{sort}'")
+        offset = max(int(offset), 0)
+        limit = min(max(int(limit), 0), MAX_PAGE_SIZE)
+        filters = {name: (filters or {}).get(name) for name in self.FILTERS}
+        view = self._view(sort, descending, filters)
+        return {
+            'total': len(self.rows),
+            'matched': len(view),
+            'offset': offset,
+            'limit': limit,
+            'columns': columns,
+            'rows': [[row[column] for column in columns] for row in view[offset:offset + limit]]
+        }
+
+
+class PreviewStore:
+    """Previews of the most recently viewed jobs, rebuilt from the result cache on first use"""
+
+    def __init__(self, cache, max_jobs=8):
+        self.cache = cache
+        self.max_jobs = max_jobs
+        self._previews = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, job_id, job_dir):
+        """A job's preview, or None when the job recorded no sources"""
+        with self._lock:
+            preview = self._previews.get(job_id)
+            if preview is not None:
+                self._previews.move_to_end(job_id)
+                return preview
+        sources = load_sources(job_dir)
+        if sources is None:
+            return None
+        preview = JobPreview(*load_job_results(self.cache, sources))
+        with self._lock:
+            self._previews[job_id] = preview
+            while len(self._previews) > self.max_jobs:
+                self._previews.popitem(last=False)
+        return preview
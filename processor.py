@@ -0,0 +1,818 @@
+import os
+import io
+import csv
+import json
+import base64
+import binascii
+import time
+import logging
+from datetime import datetime
+from metrics import EXPORT_SECONDS
+from export_cache import EXPORT_CACHE, export_key
+from warehouse import split_registration_number
+from workbook import (
+    Sheet, write_workbook, workers_from_env, STYLE_TITLE, STYLE_SUBTITLE, STYLE_HEADER, STYLE_SEMESTER,
+    STYLE_SUBHEADER, STYLE_SUBJECT_HEADER, STYLE_DATA, STYLE_DATA_LEFT
+)
+
+logger = logging.getLogger(__name__)
+
+# Branch codes mapping
+BRANCH_CODES = {
+    'Electronics Engineering (VLSI)': '159',
+    'Computer Science & Engineering (CSE)': '105',
+    'Electrical & Electronics Engineering (EEE)': '110',
+    'Civil Engineering': '101',
+    'Mining Engineering': '113',
+    'Mechanical Engineering': '102'
+}
+
+# College code (constant)
+COLLEGE_CODE = '124'
+
+# College code to name mapping
+COLLEGE_NAMES = {
+    '124': 'Sher Shah Engineering College'
+}
+
+# Workbook exports smaller than this are rendered in-process; worker start-up would cost more than it saves
+WORKBOOK_PARALLEL_MIN_RESULTS = 2000
+
+# Branch code to full name mapping
+BRANCH_FULL_NAMES = {
+    '159': 'Electronics Engineering (VLSI)',
+    '105': 'Computer Science & Engineering (CSE)',
+    '110': 'Electrical & Electronics Engineering (EEE)',
+    '101': 'Civil Engineering',
+    '113': 'Mining Engineering',
+    '102': 'Mechanical Engineering'
+}
+
+def subject_entries(subjects):
+    """Yield ((code, name), header label, marks) for a result's subjects in dict or list form"""
+    if isinstance(subjects, dict):
+        items = subjects.items()
+    elif isinstance(subjects, list):
+        items = ((subject.get('name', '') if isinstance(subject, dict) else str(subject), subject) for subject in subjects)
+    else:
+        return
+    for subject_name, subject_data in items:
+        if isinstance(subject_data, dict):
+            code = subject_data.get('code') or None
+            name = subject_data.get('name') or subject_name
+            marks = subject_data.get('marks', '')
+        else:
+            code, name, marks = None, subject_name, subject_data
+        # Code and name together identify a paper even when two electives share a name
+        label = f"{name} ({code})" if code and code != name else name
+        yield (code, name), label, marks
+
+
+def aggregate_students(results, selected_semesters):
+    """Group results by student and semester, indexing each semester's subject columns in the same pass"""
+    student_data = {}
+    subject_columns = {semester: {} for semester in selected_semesters}
+    subject_labels = {semester: [] for semester in selected_semesters}
+    
+    for result in results:
+        reg_num = result.get('registration_number', '')
+        semester = result.get('semester', 0)
+        
+        if reg_num not in student_data:
+            student_data[reg_num] = {
+                'name': result.get('name', result.get('student_name', '')),
+                'semesters': {}
+            }
+        
+        student_data[reg_num]['semesters'][semester] = result
+        
+        # Columns follow first appearance; later students only add the papers not seen yet
+        if semester in subject_columns and result.get('subjects'):
+            columns = subject_columns[semester]
+            for key, label, _ in subject_entries(result['subjects']):
+                if key not in columns:
+                    columns[key] = len(columns)
+                    subject_labels[semester].append(label)
+    return student_data, subject_columns, subject_labels
+
+
+def _sheet_header(sheet, subtitle, last_col):
+    """College title and subtitle rows shared by every workbook sheet"""
+    college_name = COLLEGE_NAMES.get(COLLEGE_CODE, f"College Code {COLLEGE_CODE}")
+    sheet.set(1, 1, f"{COLLEGE_CODE} - {college_name}", STYLE_TITLE)
+    sheet.merge(1, 1, 1, last_col)
+    sheet.set(2, 1, subtitle, STYLE_SUBTITLE)
+    sheet.merge(2, 1, 2, last_col)
+    sheet.row_heights[3] = 10
+
+
+def branch_sheet(results, branch_code, admission_year, selected_semesters):
+    """One batch of one branch in the multi-semester layout of create_formatted_excel"""
+    sheet = Sheet()
+    student_data, subject_columns, subject_labels = aggregate_students(results, selected_semesters)
+    
+    sheet.set(4, 1, "Registration No.", STYLE_HEADER)
+    sheet.set(4, 2, "Name of Student", STYLE_HEADER)
+    sheet.set(5, 1, '', STYLE_HEADER)
+    sheet.set(5, 2, '', STYLE_HEADER)
+    semester_start_cols = {}
+    current_col = 3
+    for semester in sorted(selected_semesters):
+        semester_start_cols[semester] = current_col
+        cols_needed = 2 + len(subject_labels[semester])
+        sheet.set(4, current_col, f"SEMESTER {semester}", STYLE_SEMESTER)
+        for col in range(current_col + 1, current_col + cols_needed):
+            sheet.set(4, col, '', STYLE_SEMESTER)
+        sheet.merge(4, current_col, 4, current_col + cols_needed - 1)
+        sheet.set(5, current_col, "SGPA", STYLE_SUBHEADER)
+        sheet.set(5, current_col + 1, "CGPA", STYLE_SUBHEADER)
+        for offset, label in enumerate(subject_labels[semester]):
+            sheet.set(5, current_col + 2 + offset, label, STYLE_SUBJECT_HEADER)
+        current_col += cols_needed
+    last_col = current_col - 1
+    
+    branch_name = BRANCH_FULL_NAMES.get(branch_code, f"Branch Code {branch_code}")
+    _sheet_header(sheet, f"{branch_name} Multi-Semester Results {admission_year}", max(last_col, 2))
+    
+    data_row = 6
+    for reg_num in sorted(student_data):
+        student = student_data[reg_num]
+        # Every cell of the table is written so the whole grid gets borders, as in the single-sheet export
+        for col in range(3, last_col + 1):
+            sheet.set(data_row, col, '', STYLE_DATA)
+        sheet.set(data_row, 1, reg_num, STYLE_DATA)
+        sheet.set(data_row, 2, student['name'], STYLE_DATA_LEFT)
+        for semester, result in student['semesters'].items():
+            if semester not in semester_start_cols:
+                continue
+            start_col = semester_start_cols[semester]
+            sheet.set(data_row, start_col, 'NOT FETCHED' if result.get('unfinished') else result.get('sgpa', ''), STYLE_DATA)
+            sheet.set(data_row, start_col + 1, result.get('cgpa', ''), STYLE_DATA)
+            if result.get('subjects'):
+                columns = subject_columns[semester]
+                for key, _, marks in subject_entries(result['subjects']):
+                    sheet.set(data_row, start_col + 2 + columns[key], marks, STYLE_DATA)
+        data_row += 1
+    
+    sheet.fit_columns()
+    sheet.freeze = (6, 3)
+    return sheet
+
+
+def semester_sheet(results, semester):
+    """One semester across every branch: SGPA, CGPA, result and marks per student"""
+    sheet = Sheet()
+    columns, labels = {}, []
+    rows = []
+    for result in results:
+        parts = split_registration_number(result.get('registration_number'))
+        rows.append((parts[1] if parts else '', result.get('registration_number', ''), result))
+        for key, label, _ in subject_entries(result.get('subjects') or {}):
+            if key not in columns:
+                columns[key] = len(columns)
+                labels.append(label)
+    
+    headers = ["Registration No.", "Name of Student", "Branch", "SGPA", "CGPA", "Result"] + labels
+    last_col = len(headers)
+    _sheet_header(sheet, f"Semester {semester} Results, All Branches", last_col)
+    for col, header in enumerate(headers, 1):
+        sheet.set(4, col, header, STYLE_HEADER if col <= 6 else STYLE_SUBJECT_HEADER)
+    
+    data_row = 5
+    for branch_code, reg_num, result in sorted(rows, key=lambda row: (row[0], row[1])):
+        for col in range(3, last_col + 1):
+            sheet.set(data_row, col, '', STYLE_DATA)
+        sheet.set(data_row, 1, reg_num, STYLE_DATA)
+        sheet.set(data_row, 2, result.get('name', ''), STYLE_DATA_LEFT)
+        sheet.set(data_row, 3, branch_code, STYLE_DATA)
+        if result.get('unfinished'):
+            sheet.set(data_row, 4, 'NOT FETCHED', STYLE_DATA)
+        elif result.get('error'):
+            sheet.set(data_row, 6, 'NO RECORD' if result.get('no_record') else 'ERROR', STYLE_DATA)
+        else:
+            sheet.set(data_row, 4, result.get('sgpa', ''), STYLE_DATA)
+            sheet.set(data_row, 5, result.get('cgpa', ''), STYLE_DATA)
+            sheet.set(data_row, 6, result.get('result', ''), STYLE_DATA)
+            for key, _, marks in subject_entries(result.get('subjects') or {}):
+                sheet.set(data_row, 7 + columns[key], marks, STYLE_DATA)
+        data_row += 1
+    
+    sheet.fit_columns()
+    sheet.freeze = (5, 3)
+    return sheet
+
+
+def summary_sheet(groups):
+    """Pass/fail counts and SGPA figures per branch, batch and semester from {(branch, year, semester): results}"""
+    sheet = Sheet()
+    headers = ["Branch", "Admission Year", "Semester", "Students", "Passed", "Failed", "No Record",
+               "Not Fetched / Errors", "Average SGPA", "Highest SGPA"]
+    _sheet_header(sheet, "Result Summary", len(headers))
+    for col, header in enumerate(headers, 1):
+        sheet.set(4, col, header, STYLE_HEADER)
+    
+    data_row = 5
+    for (branch_code, admission_year, semester), results in sorted(groups.items(), key=lambda item: tuple(map(str, item[0]))):
+        parsed = [result for result in results if not result.get('error')]
+        sgpas = []
+        for result in parsed:
+            try:
+                sgpas.append(float(result.get('sgpa')))
+            except (TypeError, ValueError):
+                pass
+        no_record = len([result for result in results if result.get('no_record')])
+        values = [
+            BRANCH_FULL_NAMES.get(branch_code, f"Branch Code {branch_code}"), admission_year, semester, len(parsed),
+            len([result for result in parsed if result.get('result') == 'PASS']),
+            len([result for result in parsed if result.get('result') == 'FAIL']),
+            no_record, len(results) - len(parsed) - no_record,
+            round(sum(sgpas) / len(sgpas), 2) if sgpas else '', max(sgpas) if sgpas else ''
+        ]
+        for col, value in enumerate(values, 1):
+            sheet.set(data_row, col, value, STYLE_DATA_LEFT if col == 1 else STYLE_DATA)
+        data_row += 1
+    
+    sheet.fit_columns(maximum=40)
+    sheet.freeze = (5, 1)
+    return sheet
+
+
+class ResultProcessor:
+    def __init__(self):
+        pass
+        
+    def get_available_semesters(self, admission_year):
+        """Get available semesters based on admission year and current date"""
+        current_year = datetime.now().year
+        current_month = datetime.now().month
+        
+        # Calculate how many semesters should be available
+        years_passed = current_year - admission_year
+        
+        # Assuming 2 semesters per year, and considering current month
+        if current_month >= 7:  # After July, odd semester results are usually out
+            available_semesters = (years_passed * 2) + 1
+        else:  # Before July, even semester results from previous year
+            available_semesters = years_passed * 2
+        
+        # Cap at 8 semesters maximum
+        available_semesters = min(available_semesters, 8)
+        
+        return list(range(1, available_semesters + 1))
+    
+    def convert_to_dataframe(self, results_data):
+        """Convert scraped results to pandas DataFrame"""
+        df_data = []
+        
+        for result in results_data:
+            if result.get('error'):
+                # Add error entries
+                row = {
+                    'Registration Number': result['registration_number'],
+                    'Name': 'ERROR',
+                    'Semester': result.get('semester', ''),
+                    'Year': result.get('year', ''),
+                    'Error': result['error'],
+                    'SGPA': '',
+                    'CGPA': '',
+                    'Result': ''
+                }
+                df_data.append(row)
+            else:
+                # Add successful results
+                row = {
+                    'Registration Number': result['registration_number'],
+                    'Name': result.get('name', ''),
+                    'Semester': result.get('semester', ''),
+                    'Year': result.get('year', ''),
+                    'SGPA': result.get('sgpa', ''),
+                    'CGPA': result.get('cgpa', ''),
+                    'Result': result.get('result', ''),
+                    'Error': ''
+                }
+                df_data.append(row)
+        
+        # Create DataFrame
+        import pandas as pd
+        df = pd.DataFrame(df_data)
+        
+        # Sort by registration number and semester
+        if not df.empty and 'Registration Number' in df.columns and 'Semester' in df.columns:
+            df = df.sort_values(['Registration Number', 'Semester'])
+        
+        return df
+    
+    def create_formatted_excel(self, results, filename, branch_code, admission_year, selected_semesters, timeline=None):
+        """Create formatted Excel file with college header and multi-semester layout"""
+        if not results:
+            return None
+        
+        filepath = os.path.join('temp', filename)
+        os.makedirs('temp', exist_ok=True)
+        
+        # Import required libraries for Excel formatting
+        from openpyxl import Workbook
+        from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+        from openpyxl.utils import get_column_letter
+        
+        # Create workbook and worksheet
+        wb = Workbook()
+        ws = wb.active
+        ws.title = "Results"
+        
+        # Get college and branch names
+        college_name = COLLEGE_NAMES.get(COLLEGE_CODE, f"College Code {COLLEGE_CODE}")
+        branch_name = BRANCH_FULL_NAMES.get(branch_code, f"Branch Code {branch_code}")
+        
+        # Header styles
+        header_font = Font(name='Arial', size=14, bold=True)
+        subheader_font = Font(name='Arial', size=12, bold=True)
+        column_header_font = Font(name='Arial', size=10, bold=True)
+        data_font = Font(name='Arial', size=9)
+        
+        header_fill = PatternFill(start_color='366092', end_color='366092', fill_type='solid')
+        subheader_fill = PatternFill(start_color='D9E2F3', end_color='D9E2F3', fill_type='solid')
+        semester_fill = PatternFill(start_color='E2EFDA', end_color='E2EFDA', fill_type='solid')
+        
+        center_alignment = Alignment(horizontal='center', vertical='center')
+        
+        # Row 1: College Header
+        ws.merge_cells('A1:Z1')  # Merge across many columns
+        ws['A1'] = f"{COLLEGE_CODE} - {college_name}"
+        ws['A1'].font = header_font
+        ws['A1'].fill = header_fill
+        ws['A1'].alignment = center_alignment
+        ws['A1'].font = Font(name='Arial', size=14, bold=True, color='FFFFFF')
+        
+        # Row 2: Course and Result Type
+        ws.merge_cells('A2:Z2')
+        ws['A2'] = f"{branch_name} Multi-Semester Results {admission_year}"
+        ws['A2'].font = subheader_font
+        ws['A2'].fill = subheader_fill
+        ws['A2'].alignment = center_alignment
+        
+        # Row 3: Empty row for spacing
+        ws.row_dimensions[3].height = 10
+        
+        # Row 4: Column headers
+        current_row = 4
+        
+        # Column A: Registration No.
+        ws['A4'] = "Registration No."
+        ws['A4'].font = column_header_font
+        ws['A4'].alignment = center_alignment
+        
+        # Column B: Name of Student
+        ws['B4'] = "Name of Student"
+        ws['B4'].font = column_header_font
+        ws['B4'].alignment = center_alignment
+        
+        # Starting from Column C: Semester headers
+        current_col = 3  # Column C
+        semester_start_cols = {}
+        
+        # Organize results by registration number and semester
+        aggregation_started_at = time.perf_counter()
+        student_data, subject_columns, subject_labels = aggregate_students(results, selected_semesters)
+        
+        export_started_at = time.perf_counter()
+        if timeline:
+            timeline.record('aggregation', None, aggregation_started_at, export_started_at)
+        
+        # Create semester headers and sub-columns
+        for semester in sorted(selected_semesters):
+            semester_start_cols[semester] = current_col
+            semester_subjects = subject_labels[semester]
+            
+            # Calculate columns needed for this semester (SGPA + CGPA + subjects)
+            cols_needed = 2 + len(semester_subjects)  # SGPA, CGPA, + subjects
+            
+            # Merge cells for semester header
+            start_col_letter = get_column_letter(current_col)
+            end_col_letter = get_column_letter(current_col + cols_needed - 1)
+            ws.merge_cells(f'{start_col_letter}4:{end_col_letter}4')
+            
+            semester_cell = ws[f'{start_col_letter}4']
+            semester_cell.value = f"SEMESTER {semester}"
+            semester_cell.font = column_header_font
+            semester_cell.fill = semester_fill
+            semester_cell.alignment = center_alignment
+            
+            # Sub-headers for this semester (Row 5)
+            sub_col = current_col
+            
+            # SGPA column
+            ws[f'{get_column_letter(sub_col)}5'] = "SGPA"
+            ws[f'{get_column_letter(sub_col)}5'].font = Font(name='Arial', size=9, bold=True)
+            ws[f'{get_column_letter(sub_col)}5'].alignment = center_alignment
+            sub_col += 1
+            
+            # CGPA column
+            ws[f'{get_column_letter(sub_col)}5'] = "CGPA"
+            ws[f'{get_column_letter(sub_col)}5'].font = Font(name='Arial', size=9, bold=True)
+            ws[f'{get_column_letter(sub_col)}5'].alignment = center_alignment
+            sub_col += 1
+            
+            # Subject columns
+            for subject in semester_subjects:
+                ws[f'{get_column_letter(sub_col)}5'] = subject
+                ws[f'{get_column_letter(sub_col)}5'].font = Font(name='Arial', size=8, bold=True)
+                ws[f'{get_column_letter(sub_col)}5'].alignment = center_alignment
+                sub_col += 1
+            
+            current_col += cols_needed
+        
+        # Fill data rows starting from row 6
+        data_row = 6
+        for reg_num in sorted(student_data.keys()):
+            student = student_data[reg_num]
+            
+            # Column A: Registration Number
+            ws[f'A{data_row}'] = reg_num
+            ws[f'A{data_row}'].font = data_font
+            ws[f'A{data_row}'].alignment = center_alignment
+            
+            # Column B: Student Name
+            ws[f'B{data_row}'] = student['name']
+            ws[f'B{data_row}'].font = data_font
+            
+            # Fill semester data
+            for semester in sorted(selected_semesters):
+                if semester in student['semesters']:
+                    result = student['semesters'][semester]
+                    start_col = semester_start_cols[semester]
+                    
+                    # SGPA, or a marker for students a deadline-bounded job did not reach
+                    ws[f'{get_column_letter(start_col)}{data_row}'] = 'NOT FETCHED' if result.get('unfinished') else result.get('sgpa', '')
+                    ws[f'{get_column_letter(start_col)}{data_row}'].font = data_font
+                    ws[f'{get_column_letter(start_col)}{data_row}'].alignment = center_alignment
+                    
+                    # CGPA
+                    ws[f'{get_column_letter(start_col + 1)}{data_row}'] = result.get('cgpa', '')
+                    ws[f'{get_column_letter(start_col + 1)}{data_row}'].font = data_font
+                    ws[f'{get_column_letter(start_col + 1)}{data_row}'].alignment = center_alignment
+                    
+                    # Subject marks, each under its own header whatever order the student's page lists them in
+                    if result.get('subjects'):
+                        columns = subject_columns[semester]
+                        for key, _, marks in subject_entries(result['subjects']):
+                            cell = ws.cell(row=data_row, column=start_col + 2 + columns[key], value=marks)
+                            cell.font = data_font
+                            cell.alignment = center_alignment
+            
+            data_row += 1
+        
+        # Apply borders to all cells with data
+        thin_border = Border(
+            left=Side(style='thin'),
+            right=Side(style='thin'),
+            top=Side(style='thin'),
+            bottom=Side(style='thin')
+        )
+        
+        for row in ws.iter_rows(min_row=4, max_row=data_row-1, min_col=1, max_col=current_col-1):
+            for cell in row:
+                cell.border = thin_border
+        
+        # Auto-adjust column widths
+        for col in range(1, current_col):
+            column_letter = get_column_letter(col)
+            max_length = 0
+            for row in range(1, data_row):
+                cell_value = ws[f'{column_letter}{row}'].value
+                if cell_value:
+                    max_length = max(max_length, len(str(cell_value)))
+            
+            # Set minimum and maximum widths
+            adjusted_width = min(max(max_length + 2, 10), 25)
+            ws.column_dimensions[column_letter].width = adjusted_width
+        
+        # Save the workbook
+        wb.save(filepath)
+        if timeline:
+            timeline.record('export', None, export_started_at, time.perf_counter())
+        return filepath
+    
+    def create_multi_sheet_workbook(self, results, filename, selected_semesters, timeline=None, workers=None):
+        """Workbook with a summary sheet plus one sheet per branch batch and per semester, rendered in parallel"""
+        if not results:
+            return None
+        
+        filepath = os.path.join('temp', filename)
+        os.makedirs('temp', exist_ok=True)
+        
+        aggregation_started_at = time.perf_counter()
+        branches, semesters, summary = {}, {}, {}
+        for result in results:
+            parts = split_registration_number(result.get('registration_number'))
+            admission_year, branch_code = (parts[0], parts[1]) if parts else ('', 'unknown')
+            semester = result.get('semester', 0)
+            branches.setdefault((branch_code, admission_year), []).append(result)
+            semesters.setdefault(semester, []).append(result)
+            summary.setdefault((branch_code, admission_year, semester), []).append(result)
+        
+        # Parts are (sheet title, layout function, its arguments, relative size)
+        parts = [('Summary', summary_sheet, (summary,), len(summary))]
+        for (branch_code, admission_year), branch_results in sorted(branches.items(), key=lambda item: tuple(map(str, item[0]))):
+            branch_semesters = sorted(set(selected_semesters) | {result.get('semester', 0) for result in branch_results})
+            parts.append((f"{branch_code} - {admission_year}", branch_sheet,
+                          (branch_results, branch_code, admission_year, branch_semesters), len(branch_results)))
+        for semester, semester_results in sorted(semesters.items(), key=lambda item: str(item[0])):
+            parts.append((f"Semester {semester}", semester_sheet, (semester_results, semester), len(semester_results)))
+        
+        export_started_at = time.perf_counter()
+        if timeline:
+            timeline.record('aggregation', None, aggregation_started_at, export_started_at)
+        
+        workers = workers or workers_from_env()
+        if len(results) < WORKBOOK_PARALLEL_MIN_RESULTS:
+            workers = 1
+        write_workbook(filepath, parts, workers)
+        if timeline:
+            timeline.record('export', None, export_started_at, time.perf_counter())
+        return filepath
+    
+    def save_to_excel(self, df, filename):
+        """Save DataFrame to Excel file with formatting (legacy method)"""
+        if df.empty:
+            return None
+        
+        filepath = os.path.join('temp', filename)
+        os.makedirs('temp', exist_ok=True)
+        
+        import pandas as pd
+        with pd.ExcelWriter(filepath, engine='openpyxl') as writer:
+            df.to_excel(writer, sheet_name='Results', index=False)
+            
+            # Get the workbook and worksheet
+            workbook = writer.book
+            worksheet = writer.sheets['Results']
+            
+            # Auto-adjust column widths
+            for column in worksheet.columns:
+                max_length = 0
+                column_letter = column[0].column_letter
+                for cell in column:
+                    try:
+                        if len(str(cell.value)) > max_length:
+                            max_length = len(str(cell.value))
+                    except:
+                        pass
+                adjusted_width = min(max_length + 2, 50)
+                worksheet.column_dimensions[column_letter].width = adjusted_width
+        
+        return filepath
+    
+    def save_to_csv(self, df, filename):
+        """Save DataFrame to CSV file"""
+        if df.empty:
+            return None
+        
+        filepath = os.path.join('temp', filename)
+        os.makedirs('temp', exist_ok=True)
+        
+        df.to_csv(filepath, index=False)
+        return filepath
+
+def group_registration_numbers(registration_numbers):
+    """Group explicit registration numbers by (admission year, branch, college), rejecting ones that match no target"""
+    groups = {}
+    rejected = []
+    seen = set()
+    branch_codes = set(BRANCH_CODES.values())
+    for value in registration_numbers:
+        reg_number = str(value).strip()
+        if not reg_number or reg_number in seen:
+            continue
+        seen.add(reg_number)
+        parts = split_registration_number(reg_number)
+        if not parts:
+            reason = 'Not an 11-digit registration number (YYBBBCCCNNN)'
+        elif parts[1] not in branch_codes:
+            reason = f'Unknown branch code {parts[1]}'
+        elif parts[2] not in COLLEGE_NAMES:
+            reason = f'Unknown college code {parts[2]}'
+        else:
+            groups.setdefault(parts, []).append(reg_number)
+            continue
+        rejected.append({'registration_number': reg_number, 'reason': reason})
+    return groups, rejected
+
+def read_registration_csv(upload):
+    """Registration numbers from an uploaded CSV: the column headed like "Registration"/"Roll", else the first"""
+    text = upload.read().decode('utf-8-sig', errors='replace')
+    rows = [row for row in csv.reader(io.StringIO(text)) if any(cell.strip() for cell in row)]
+    column = 0
+    if rows:
+        header = [cell.strip().lower() for cell in rows[0]]
+        header_columns = [i for i, cell in enumerate(header) if 'reg' in cell or 'roll' in cell]
+        if header_columns:
+            column = header_columns[0]
+            rows = rows[1:]
+    return [row[column].strip() for row in rows if len(row) > column and row[column].strip()]
+
+def published_on(link):
+    """Publication date of an exam link, for ordering; undated or malformed links sort first"""
+    try:
+        return datetime.strptime(link['published_date'], '%d-%m-%Y')
+    except (KeyError, TypeError, ValueError):
+        return datetime.min
+
+def select_semester_links(available_links, admission_year, passout_year, selected_semesters):
+    """Pick the most recently published regular exam link for each requested semester
+
+    When special/arrear exams of the same semester are also published, the returned link carries an
+    "attempts" list of every matching exam (regular first, then by publication date) so the scraper can
+    fetch them together and merge each student's attempts into one record.
+    """
+    # Filter links using both admission year and passout year logic
+    semester_links = []
+    for semester in selected_semesters:
+        # Find all links for this semester
+        semester_candidates = [link for link in available_links if link['semester'] == semester]
+        logger.debug("Found %d links for semester %s", len(semester_candidates), semester)
+            
+        # Try different matching strategies
+        matching_links = []
+            
+        # Strategy 1: Match by batch admission year
+        for link in semester_candidates:
+            if link.get('batch_admission_year') == admission_year:
+                matching_links.append(link)
+                logger.debug("Matched by admission year: %s (Batch: %s)", link['text'], link['batch_session'])
+            
+        # Strategy 2: If no matches, try matching by expected batch format
+        if not matching_links:
+            expected_batch = f"{admission_year}-{str(passout_year)[-2:]}"  # e.g., "2021-25"
+            for link in semester_candidates:
+                if link['batch_session'] == expected_batch:
+                    matching_links.append(link)
+                    logger.debug("Matched by batch format: %s (Batch: %s)", link['text'], link['batch_session'])
+            
+        # Strategy 3: If still no matches, try partial matching
+        if not matching_links:
+            for link in semester_candidates:
+                if str(admission_year) in link['batch_session'] or str(passout_year) in link['batch_session']:
+                    matching_links.append(link)
+                    logger.debug("Matched by partial year: %s (Batch: %s)", link['text'], link['batch_session'])
+            
+        if matching_links:
+            # Use the most recent published regular result; a later special exam only holds its re-appearing students
+            regular_links = [link for link in matching_links if not link.get('is_special')]
+            semester_link = max(regular_links or matching_links, key=published_on)
+            # Arrear rows carry no batch, so any held after this batch's regular exam may hold its students
+            special_links = [
+                link for link in semester_candidates
+                if link.get('is_special') and link is not semester_link and (
+                    link in matching_links or (not link.get('batch_admission_year') and link['year'] >= semester_link['year'])
+                )
+            ]
+            if special_links:
+                attempts = [semester_link] + sorted(special_links, key=published_on)
+                semester_link = dict(semester_link, attempts=attempts)
+                logger.info("Semester %s: merging %d special/arrear exams into the regular result", semester, len(special_links))
+                
+            semester_links.append(semester_link)
+            logger.info("Semester %s: selected %s (Batch: %s)", semester, semester_link['text'], semester_link['batch_session'])
+        else:
+            logger.warning("No matches found for semester %s", semester)
+    
+    return semester_links
+
+def no_matching_semesters_error(available_links, admission_year, passout_year, selected_semesters):
+    """Explain which semesters and batches are published when none match the request"""
+    # Provide comprehensive error information
+    available_info = {}
+    for link in available_links:
+        sem = link['semester']
+        if sem not in available_info:
+            available_info[sem] = []
+        available_info[sem].append(f"{link['batch_session']} ({link['published_date']})")
+            
+    error_msg = f"No matching semester results found.\n"
+    error_msg += f"Requested: Admission {admission_year}, Passout {passout_year}, Semesters {selected_semesters}\n"
+    error_msg += f"Available semesters and batches:\n"
+    for sem, batches in sorted(available_info.items()):
+        error_msg += f"  Semester {sem}: {', '.join(batches)}\n"
+    return error_msg
+
+def resolve_branch_code(branch):
+    """Branch code for a dashboard branch name or a bare code"""
+    if branch in BRANCH_CODES:
+        return BRANCH_CODES[branch]
+    return branch if branch in BRANCH_FULL_NAMES else None
+
+def registration_groups(scraper, data):
+    """Registration numbers of a job spec grouped by (admission year, branch, college)
+
+    Returns (groups, passout_year, error); error is a (payload, status) pair when the spec cannot run.
+    """
+    if data.get('registration_numbers'):
+        # Explicit list (JSON array or uploaded CSV), batched per (admission year, branch, college)
+        groups, rejected = group_registration_numbers(data['registration_numbers'])
+        if rejected:
+            return None, None, ({'error': f'{len(rejected)} registration numbers match no branch or college', 'rejected': rejected}, 400)
+        return groups, None, None
+    
+    admission_year = int(data.get('admission_year'))
+    
+    # Get branch code
+    branch_code = resolve_branch_code(data.get('branch'))
+    if not branch_code:
+        return None, None, ({'error': 'Invalid branch selected'}, 400)
+    
+    # Generate registration numbers
+    reg_numbers = scraper.generate_registration_numbers(
+        admission_year, branch_code, data.get('start_reg'), data.get('end_reg')
+    )
+    # Calculate passout year (admission year + 4 for B.Tech) if not provided
+    passout_year = int(data.get('passout_year') or admission_year + 4)
+    return {(admission_year, branch_code, COLLEGE_CODE): reg_numbers}, passout_year, None
+
+def plan_semesters(available_links, groups, passout_year, selected_semesters):
+    """Match every registration group to its semester links before any student page is fetched
+
+    Returns (plans, error) with one (admission year, branch code, registration numbers, semester links) plan per group.
+    """
+    plans = []
+    rejected = []
+    for (group_year, group_branch, group_college), reg_numbers in groups.items():
+        group_passout_year = passout_year or group_year + 4
+        logger.info("Admission Year: %s, Passout Year: %s, Branch: %s, Students: %d, Semesters: %s",
+                    group_year, group_passout_year, group_branch, len(reg_numbers), selected_semesters)
+        semester_links = select_semester_links(available_links, group_year, group_passout_year, selected_semesters)
+        if semester_links:
+            plans.append((group_year, group_branch, reg_numbers, semester_links))
+        elif len(groups) == 1:
+            error_msg = no_matching_semesters_error(available_links, group_year, group_passout_year, selected_semesters)
+            return None, ({'error': error_msg}, 404)
+        else:
+            reason = f'No published results for admission year {group_year} in semesters {selected_semesters}'
+            rejected.extend({'registration_number': reg, 'reason': reason} for reg in reg_numbers)
+    if rejected:
+        return None, ({'error': f'{len(rejected)} registration numbers match no published exam', 'rejected': rejected}, 400)
+    return plans, None
+
+def export_results(processor, results, export_format, branch_code, admission_year, selected_semesters, timeline=None,
+                   prefix='results', cache=None):
+    """Write results to CSV, formatted Excel or a multi-sheet workbook through the export cache, returning (download filename, filepath)"""
+    cache = cache or EXPORT_CACHE
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    params = {'branch_code': branch_code, 'admission_year': admission_year, 'semesters': selected_semesters}
+    key = export_key(export_format, params, results)
+    if export_format == 'csv':
+        filename = f'{prefix}_{branch_code}_{timestamp}.csv'
+        
+        def build():
+            with EXPORT_SECONDS.time(format='csv'):
+                # Convert to DataFrame for CSV
+                aggregation_started_at = time.perf_counter()
+                df = processor.convert_to_dataframe(results)
+                if timeline:
+                    timeline.record('aggregation', None, aggregation_started_at, time.perf_counter())
+                export_started_at = time.perf_counter()
+                filepath = processor.save_to_csv(df, filename)
+                if timeline:
+                    timeline.record('export', None, export_started_at, time.perf_counter())
+            return filepath
+        
+        return filename, cache.get_or_create(key, '.csv', build)
+    
+    if export_format == 'workbook':
+        filename = f'{prefix}_{branch_code}_workbook_{timestamp}.xlsx'
+        
+        def build():
+            with EXPORT_SECONDS.time(format='workbook'):
+                return processor.create_multi_sheet_workbook(results, filename, selected_semesters, timeline)
+        
+        return filename, cache.get_or_create(key, '.xlsx', build)
+    
+    filename = f'{prefix}_{branch_code}_{admission_year}_{timestamp}.xlsx'
+    
+    def build():
+        with EXPORT_SECONDS.time(format='excel'):
+            # Use new formatted Excel method
+            return processor.create_formatted_excel(results, filename, branch_code, admission_year, selected_semesters, timeline)
+    
+    return filename, cache.get_or_create(key, '.xlsx', build)
+
+
+def continuation_token(spec):
+    """Opaque token that re-runs a job spec against the result cache, so only the unfinished students are fetched"""
+    # The deadline is left out: whoever resumes picks the next time budget
+    resumable = {key: value for key, value in spec.items() if key not in ('continuation', 'profile', 'deadline_seconds')}
+    resumable['use_cache'] = True
+    encoded = base64.urlsafe_b64encode(json.dumps(resumable, sort_keys=True).encode('utf-8'))
+    return encoded.decode('ascii').rstrip('=')
+
+
+def resume_spec(token, overrides=None):
+    """Job spec from a continuation token, updated with overrides (e.g. a new deadline); raises ValueError if malformed"""
+    try:
+        spec = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except (binascii.Error, UnicodeError, ValueError, TypeError) as e:
+        raise ValueError(f'Invalid continuation token: {e}')
+    if not isinstance(spec, dict):
+        raise ValueError('Invalid continuation token')
+    spec.update(overrides or {})
+    return spec
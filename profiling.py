@@ -0,0 +1,126 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+
+
+class PhaseTimeline:
+    """Per-semester timeline of job phases (fetch, parse, aggregation, export)"""
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self._phases = {}
+        self._lock = threading.Lock()
+
+    def record(self, phase, semester, started_at, ended_at):
+        """Add one timed span; spans of the same phase and semester are merged"""
+        key = (semester, phase)
+        with self._lock:
+            entry = self._phases.get(key)
+            if entry is None:
+                self._phases[key] = {
+                    'semester': semester,
+                    'phase': phase,
+                    'started_at': started_at,
+                    'ended_at': ended_at,
+                    'busy_seconds': ended_at - started_at,
+                    'count': 1
+                }
+            else:
+                entry['started_at'] = min(entry['started_at'], started_at)
+                entry['ended_at'] = max(entry['ended_at'], ended_at)
+                entry['busy_seconds'] += ended_at - started_at
+                entry['count'] += 1
+
+    @contextmanager
+    def phase(self, phase, semester=None):
+        """Time the enclosed block as one span of the given phase"""
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, semester, started_at, time.perf_counter())
+
+    def to_dict(self):
+        """Timeline with offsets relative to the job start, ordered by when each phase began"""
+        with self._lock:
+            entries = sorted(self._phases.values(), key=lambda e: e['started_at'])
+            phases = [{
+                'semester': e['semester'],
+                'phase': e['phase'],
+                'start_offset': round(e['started_at'] - self.origin, 4),
+                'end_offset': round(e['ended_at'] - self.origin, 4),
+                'wall_seconds': round(e['ended_at'] - e['started_at'], 4),
+                # Sum of span durations; higher than wall time when spans ran concurrently
+                'busy_seconds': round(e['busy_seconds'], 4),
+                'count': e['count']
+            } for e in entries]
+        return {
+            'total_seconds': round(time.perf_counter() - self.origin, 4),
+            'phases': phases
+        }
+
+    def save(self, filepath):
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        return filepath
+
+
+class JobProfiler:
+    """Deterministic (cProfile) profiler that also covers the scraper's worker threads"""
+
+    def __init__(self):
+        self._profiles = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _thread_profile(self):
+        profile = getattr(self._local, 'profile', None)
+        if profile is None:
+            profile = cProfile.Profile()
+            self._local.profile = profile
+            with self._lock:
+                self._profiles.append(profile)
+        return profile
+
+    @contextmanager
+    def profiling(self):
+        """Profile the enclosed block on the current thread"""
+        profile = self._thread_profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+
+    def wrap(self, func):
+        """Return func wrapped so it is profiled on whichever thread runs it"""
+        def profiled(*args, **kwargs):
+            with self.profiling():
+                return func(*args, **kwargs)
+        return profiled
+
+    def save(self, directory, top=60):
+        """Write the merged profile (.prof for snakeviz/pstats) and a text summary"""
+        with self._lock:
+            profiles = list(self._profiles)
+        if not profiles:
+            return None
+
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+
+        os.makedirs(directory, exist_ok=True)
+        profile_path = os.path.join(directory, 'profile.prof')
+        stats.dump_stats(profile_path)
+
+        summary = io.StringIO()
+        pstats.Stats(profile_path, stream=summary).sort_stats('cumulative').print_stats(top)
+        with open(os.path.join(directory, 'profile.txt'), 'w', encoding='utf-8') as f:
+            f.write(summary.getvalue())
+        return profile_path
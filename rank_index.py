@@ -0,0 +1,250 @@
+"""Rank lists kept sorted in memory as results arrive.
+
+Boards are keyed by tuples:
+    ('sgpa', branch_code, admission_year, semester)   SGPA in one semester of one batch
+    ('cgpa', branch_code, admission_year)             each student's latest CGPA in one batch
+    ('subject', subject_code)                         total marks in one paper
+
+Each board is a list of (-score, registration_number) kept in order with
+bisect, so top-N is a slice and a student's rank is one binary search;
+a new or revised result moves only that student's entries, while a large
+batch (seeding from the warehouse, a big sync) is merged in with one sort.
+A semester whose SGPA, CGPA or subject marks are gone from a revised
+result leaves the matching boards.
+
+Results stored in the warehouse by other processes (web workers, CLI and
+shard workers) reach the index too: reads first apply the warehouse rows
+written since the last sync, at most once every SYNC_INTERVAL seconds.
+"""
+import bisect
+import threading
+import time
+from warehouse import split_registration_number, SUBJECT_CODE_PATTERN
+
+BOARD_KINDS = ('sgpa', 'cgpa', 'subject')
+MAX_TOP = 1000
+SYNC_INTERVAL = 2.0
+# Rows are re-read this far behind the newest seen, so a slow writer's earlier timestamp is not skipped
+SYNC_OVERLAP = 60.0
+# Past one change per this many board entries, one sort is cheaper than moving the list on every insert
+RESORT_RATIO = 200
+
+
+def _score(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def board_key(by, branch=None, admission_year=None, semester=None, subject=None):
+    """Board tuple for query parameters; raises ValueError when a required part is missing"""
+    if by == 'sgpa':
+        if branch in (None, '') or admission_year in (None, '') or semester in (None, ''):
+            raise ValueError('SGPA rankings need branch, admission_year and semester')
+        return ('sgpa', str(branch), int(admission_year), int(semester))
+    if by == 'cgpa':
+        if branch in (None, '') or admission_year in (None, ''):
+            raise ValueError('CGPA rankings need branch and admission_year')
+        return ('cgpa', str(branch), int(admission_year))
+    if by == 'subject':
+        if not subject:
+            raise ValueError('Subject rankings need a subject code')
+        return ('subject', str(subject))
+    raise ValueError(f"Unknown ranking '{by}', expected one of {list(BOARD_KINDS)}")
+
+
+class Board:
+    """One ranked list, best first, with each student's current score"""
+
+    def __init__(self):
+        self.entries = []
+        self.scores = {}
+
+    def put(self, registration_number, score):
+        previous = self.scores.get(registration_number)
+        if previous == score:
+            return
+        if previous is not None:
+            del self.entries[bisect.bisect_left(self.entries, (-previous, registration_number))]
+        bisect.insort(self.entries, (-score, registration_number))
+        self.scores[registration_number] = score
+
+    def remove(self, registration_number):
+        score = self.scores.pop(registration_number, None)
+        if score is not None:
+            del self.entries[bisect.bisect_left(self.entries, (-score, registration_number))]
+
+    def update(self, changes):
+        """Apply {registration_number: score, or None to drop the student} in one go"""
+        changes = {key: score for key, score in changes.items() if self.scores.get(key) != score}
+        if len(changes) * RESORT_RATIO < len(self.entries):
+            for registration_number, score in changes.items():
+                if score is None:
+                    self.remove(registration_number)
+                else:
+                    self.put(registration_number, score)
+            return
+        # The kept entries are one sorted run, so the sort costs little more than merging the changes in
+        entries = [entry for entry in self.entries if entry[1] not in changes]
+        for registration_number, score in changes.items():
+            if score is None:
+                self.scores.pop(registration_number, None)
+            else:
+                self.scores[registration_number] = score
+                entries.append((-score, registration_number))
+        entries.sort()
+        self.entries = entries
+
+    def rank(self, registration_number):
+        """Competition rank (equal scores share the better rank), or None when the student is not on the board"""
+        score = self.scores.get(registration_number)
+        if score is None:
+            return None
+        # (-score,) sorts before every (-score, registration_number), so this counts the strictly better scores
+        return bisect.bisect_left(self.entries, (-score,)) + 1
+
+    def top(self, n):
+        rows = []
+        rank = 0
+        previous = None
+        for position, (negative_score, registration_number) in enumerate(self.entries[:n], 1):
+            if negative_score != previous:
+                rank, previous = position, negative_score
+            rows.append((rank, registration_number, -negative_score))
+        return rows
+
+
+class RankIndex:
+    """SGPA, CGPA and subject rank lists, seeded from the warehouse, updated per result and synced with it"""
+
+    def __init__(self, warehouse=None, sync_interval=SYNC_INTERVAL):
+        self.warehouse = warehouse
+        self.sync_interval = sync_interval
+        self._boards = {}
+        self._names = {}
+        # Semester whose CGPA is ranked for each student, so an older page never replaces a newer CGPA
+        self._cgpa_semester = {}
+        # Subject codes ranked for each (student, semester), so a revised semester drops papers it no longer has
+        self._subject_codes = {}
+        self._lock = threading.Lock()
+        self._loaded = warehouse is None
+        # Newest warehouse updated_at applied, and when the warehouse was last checked
+        self._synced_until = None
+        self._synced_at = 0.0
+
+    def _sync(self):
+        # Seeded on first use rather than at import, so starting a worker does not scan the warehouse;
+        # later calls apply only rows written since, which is a no-op for rows this process indexed itself
+        if self.warehouse is None or (self._loaded and time.monotonic() - self._synced_at < self.sync_interval):
+            return
+        since = None if self._synced_until is None else self._synced_until - SYNC_OVERLAP
+        semester_rows, subject_rows = self.warehouse.ranking_rows(since)
+        self._loaded = True
+        self._synced_at = time.monotonic()
+        subjects = {}
+        for row in subject_rows:
+            subjects.setdefault((row['registration_number'], row['semester']), {})[row['subject_code']] = row['marks']
+        changes = {}
+        for row in semester_rows:
+            self._add_semester(changes, row['registration_number'], row['branch_code'], row['admission_year'],
+                               row['semester'], row['name'], row['sgpa'], row['cgpa'],
+                               subjects.get((row['registration_number'], row['semester']), {}))
+            self._synced_until = max(self._synced_until or 0, row['updated_at'])
+        self._apply(changes)
+
+    def _apply(self, changes):
+        # changes maps board key -> {registration_number: score, or None to drop the student}
+        for key, board_changes in changes.items():
+            board = self._boards.get(key)
+            if board is None:
+                if all(score is None for score in board_changes.values()):
+                    continue
+                board = self._boards[key] = Board()
+            board.update(board_changes)
+
+    def _add_semester(self, changes, registration_number, branch_code, admission_year, semester, name, sgpa, cgpa,
+                      subjects):
+        """Queue one semester's scores into changes; a missing SGPA, CGPA or subject drops the old entry"""
+        if name:
+            self._names[registration_number] = name
+        changes.setdefault(('sgpa', branch_code, admission_year, semester), {})[registration_number] = sgpa
+        ranked = self._cgpa_semester.get(registration_number, 0)
+        if cgpa is not None and semester >= ranked:
+            self._cgpa_semester[registration_number] = semester
+            changes.setdefault(('cgpa', branch_code, admission_year), {})[registration_number] = cgpa
+        elif cgpa is None and semester == ranked:
+            # The CGPA being ranked was withdrawn
+            del self._cgpa_semester[registration_number]
+            changes.setdefault(('cgpa', branch_code, admission_year), {})[registration_number] = None
+        previous = self._subject_codes.pop((registration_number, semester), ())
+        for code in previous:
+            if code not in subjects:
+                changes.setdefault(('subject', code), {})[registration_number] = None
+        for code, marks in subjects.items():
+            changes.setdefault(('subject', code), {})[registration_number] = marks
+        if subjects:
+            self._subject_codes[(registration_number, semester)] = tuple(subjects)
+
+    def add(self, result):
+        """Index one parsed or cached result; failed and "no record" results are ignored"""
+        parts = split_registration_number(result.get('registration_number'))
+        try:
+            semester = int(result.get('semester'))
+        except (TypeError, ValueError):
+            return
+        if result.get('error') or not parts:
+            return
+        admission_year, branch_code, _ = parts
+        registration_number = result['registration_number']
+        subjects = result.get('subjects')
+        marks_by_code = {}
+        for subject_key, details in (subjects.items() if isinstance(subjects, dict) else ()):
+            if not isinstance(details, dict):
+                continue
+            code = details.get('code') or (subject_key if SUBJECT_CODE_PATTERN.match(subject_key) else None)
+            marks = _score(details.get('marks'))
+            if code and marks is not None:
+                marks_by_code[code] = marks
+        with self._lock:
+            self._sync()
+            changes = {}
+            self._add_semester(changes, registration_number, branch_code, admission_year, semester, result.get('name'),
+                               _score(result.get('sgpa')), _score(result.get('cgpa')), marks_by_code)
+            self._apply(changes)
+
+    def top(self, key, n=10):
+        """The n best students on a board (at most MAX_TOP), ties sharing a rank"""
+        with self._lock:
+            self._sync()
+            board = self._boards.get(key)
+            if board is None:
+                return []
+            return [
+                {'rank': rank, 'registration_number': registration_number,
+                 'name': self._names.get(registration_number, ''), 'score': score}
+                for rank, registration_number, score in board.top(min(max(int(n), 0), MAX_TOP))
+            ]
+
+    def rank(self, key, registration_number):
+        """Rank, score and board size for one student, or None when the student is not on the board"""
+        with self._lock:
+            self._sync()
+            board = self._boards.get(key)
+            rank = board.rank(registration_number) if board else None
+            if rank is None:
+                return None
+            return {
+                'rank': rank,
+                'registration_number': registration_number,
+                'name': self._names.get(registration_number, ''),
+                'score': board.scores[registration_number],
+                'out_of': len(board.entries)
+            }
+
+    def stats(self):
+        with self._lock:
+            counts = {kind: 0 for kind in BOARD_KINDS}
+            for key in self._boards:
+                counts[key[0]] += 1
+            return {'loaded': self._loaded, 'boards': counts, 'students': len(self._cgpa_semester)}
@@ -0,0 +1,164 @@
+import os
+import json
+import sqlite3
+import threading
+import time
+from metrics import CACHE_HITS, CACHE_MISSES
+
+DATA_DIR = os.environ.get('BEU_DATA_DIR', 'data')
+DEFAULT_CACHE_PATH = os.path.join(DATA_DIR, 'result_cache.sqlite3')
+
+
+def journal_mode(path_variable):
+    """Journal mode for a store: WAL on local disk, DELETE once `path_variable` moves it, possibly onto shared storage
+
+    WAL keeps its index in shared memory, which only processes on one host can see, so over a network
+    filesystem it loses updates or corrupts the file. The rollback journal only needs file locks.
+    """
+    return 'DELETE' if os.environ.get(path_variable) else 'WAL'
+
+
+def exam_key(semester_link):
+    """Identity of one published exam row; a re-publication gets a new key"""
+    return '|'.join([
+        semester_link.get('text', ''),
+        semester_link.get('batch_session', ''),
+        semester_link.get('published_date', '')
+    ])
+
+
+def exam_base_key(semester_link):
+    """Identity of an exam across re-publications (e.g. after revaluation)"""
+    return '|'.join([semester_link.get('text', ''), semester_link.get('batch_session', '')])
+
+
+def is_cacheable(result):
+    """Parsed results and confirmed "no record" pages are cached, transient failures are not"""
+    return not result.get('error') or bool(result.get('no_record'))
+
+
+class ResultCache:
+    """SQLite store of parsed student results keyed by (exam, registration number)"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS results ('
+                ' exam_key TEXT NOT NULL,'
+                ' registration_number TEXT NOT NULL,'
+                ' result_json TEXT NOT NULL,'
+                ' fetched_at REAL NOT NULL,'
+                ' PRIMARY KEY (exam_key, registration_number))'
+            )
+            # Columns added after the first release of the cache
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(results)')}
+            if 'exam_base' not in columns:
+                conn.execute('ALTER TABLE results ADD COLUMN exam_base TEXT')
+            if 'content_hash' not in columns:
+                conn.execute('ALTER TABLE results ADD COLUMN content_hash TEXT')
+            conn.execute(
+                'CREATE INDEX IF NOT EXISTS results_by_exam_base ON results (exam_base, registration_number, fetched_at)'
+            )
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS published_exams ('
+                ' exam_key TEXT PRIMARY KEY,'
+                ' link_json TEXT NOT NULL,'
+                ' first_seen REAL NOT NULL,'
+                ' prewarmed_at REAL)'
+            )
+
+    def _connect(self):
+        # One connection per thread; sqlite3 connections must not cross threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            self._local.conn = conn
+        return conn
+
+    def get_many(self, semester_link, registration_numbers):
+        """Return {registration_number: result} for the students already cached for this exam"""
+        key = exam_key(semester_link)
+        found = {}
+        conn = self._connect()
+        # Stay well below SQLite's bound parameter limit
+        for i in range(0, len(registration_numbers), 500):
+            chunk = registration_numbers[i:i + 500]
+            rows = conn.execute(
+                f"SELECT registration_number, result_json FROM results "
+                f"WHERE exam_key = ? AND registration_number IN ({','.join('?' * len(chunk))})",
+                [key] + list(chunk)
+            ).fetchall()
+            for registration_number, result_json in rows:
+                found[registration_number] = json.loads(result_json)
+        CACHE_HITS.inc(len(found), cache='results')
+        CACHE_MISSES.inc(len(registration_numbers) - len(found), cache='results')
+        return found
+
+    def put_many(self, semester_link, results):
+        """Store the cacheable results of one exam, returning how many were written"""
+        key = exam_key(semester_link)
+        base = exam_base_key(semester_link)
+        now = time.time()
+        rows = [
+            (key, result['registration_number'], json.dumps(result), now, base, result.get('content_hash'))
+            for result in results if is_cacheable(result)
+        ]
+        if rows:
+            with self._connect() as conn:
+                conn.executemany(
+                    'INSERT OR REPLACE INTO results '
+                    '(exam_key, registration_number, result_json, fetched_at, exam_base, content_hash) '
+                    'VALUES (?, ?, ?, ?, ?, ?)', rows
+                )
+        return len(rows)
+
+    def get_fingerprints(self, semester_link, registration_numbers):
+        """Return {registration_number: (content_hash, result)} from the latest fetch of this exam in any publication"""
+        base = exam_base_key(semester_link)
+        latest = {}
+        conn = self._connect()
+        for i in range(0, len(registration_numbers), 500):
+            chunk = registration_numbers[i:i + 500]
+            rows = conn.execute(
+                f"SELECT registration_number, content_hash, result_json FROM results "
+                f"WHERE exam_base = ? AND content_hash IS NOT NULL "
+                f"AND registration_number IN ({','.join('?' * len(chunk))}) ORDER BY fetched_at",
+                [base] + list(chunk)
+            ).fetchall()
+            # Ordered by fetch time, so the newest row for each student wins
+            for registration_number, content_hash, result_json in rows:
+                latest[registration_number] = (content_hash, result_json)
+        return {reg: (content_hash, json.loads(result_json)) for reg, (content_hash, result_json) in latest.items()}
+
+    def known_exams(self):
+        """Keys of every exam row the publication watcher has already seen"""
+        return {row[0] for row in self._connect().execute('SELECT exam_key FROM published_exams')}
+
+    def mark_exam_seen(self, semester_link):
+        link = {name: value for name, value in semester_link.items() if name != 'element'}
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR IGNORE INTO published_exams (exam_key, link_json, first_seen) VALUES (?, ?, ?)',
+                (exam_key(semester_link), json.dumps(link), time.time())
+            )
+
+    def mark_exam_prewarmed(self, semester_link):
+        with self._connect() as conn:
+            conn.execute(
+                'UPDATE published_exams SET prewarmed_at = ? WHERE exam_key = ?',
+                (time.time(), exam_key(semester_link))
+            )
+
+    def stats(self):
+        conn = self._connect()
+        return {
+            'results': conn.execute('SELECT COUNT(*) FROM results').fetchone()[0],
+            'exams': conn.execute('SELECT COUNT(DISTINCT exam_key) FROM results').fetchone()[0],
+            'published_exams': conn.execute('SELECT COUNT(*) FROM published_exams').fetchone()[0]
+        }
@@ -0,0 +1,179 @@
+"""Incremental parser for student result pages.
+
+A page is fed to ResultPageParser chunk by chunk while it downloads. Fields
+are picked out by element id as their tags close, and the parser is `done`
+as soon as the semester history table (which carries Cur. CGPA) or a
+"No Record Found" message has been read, so the remarks, the footer legend
+and whatever follows are never parsed.
+"""
+import re
+from html.parser import HTMLParser
+
+ID_PREFIX = 'ContentPlaceHolder1_'
+# <span id="ContentPlaceHolder1_..."> labels and the result fields they hold
+LABEL_FIELDS = {
+    'DataList1_RegistrationNoLabel_0': 'registration_number',
+    'DataList1_StudentNameLabel_0': 'name',
+    'DataList5_GROSSTHEORYTOTALLabel_0': 'sgpa',
+    'Label_Msg': 'message',
+}
+# Theory and practical marks tables
+SUBJECT_TABLES = ('GridView1', 'GridView2')
+# SGPA of every semester so far plus Cur. CGPA; the last table the parser needs
+HISTORY_TABLE = 'GridView3'
+NO_RECORD_MARKERS = ('no record', 'not found', 'invalid')
+
+# Where the parser stops reading; content hashes cover the same prefix so a streamed page and a full one agree
+PAGE_END_PATTERNS = [
+    re.compile(r'id="ContentPlaceHolder1_GridView3".*?</table>', re.IGNORECASE | re.DOTALL),
+    re.compile(r'id="ContentPlaceHolder1_Label_Msg"[^>]*>[^<]*(?:no record|not found|invalid)[^<]*</span>',
+               re.IGNORECASE),
+]
+
+
+def page_prefix(page_source):
+    """The part of a result page the parser reads, up to the history table or the "no record" message"""
+    ends = [match.end() for match in (pattern.search(page_source) for pattern in PAGE_END_PATTERNS) if match]
+    return page_source[:min(ends)] if ends else page_source
+
+
+def _clean(parts):
+    return ' '.join(''.join(parts).split())
+
+
+class ResultPageParser(HTMLParser):
+    """Feed-as-you-go result page parser; `done` turns True once every needed field has been read"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.labels = {}
+        self.subjects = {}
+        self.cgpa = ''
+        self.no_record = False
+        self.done = False
+        self._label = None
+        self._table = None
+        self._header = None
+        self._row = None
+        self._cell = None
+
+    def feed(self, data):
+        if not self.done:
+            super().feed(data)
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        if tag == 'span' or tag == 'table':
+            element_id = dict(attrs).get('id') or ''
+            if not element_id.startswith(ID_PREFIX):
+                return
+            element_id = element_id[len(ID_PREFIX):]
+            if tag == 'span' and element_id in LABEL_FIELDS:
+                self._label = (LABEL_FIELDS[element_id], [])
+            elif tag == 'table' and (element_id in SUBJECT_TABLES or element_id == HISTORY_TABLE):
+                self._table = element_id
+                self._header = None
+        elif self._table:
+            # html.parser does not close omitted </td> and </tr> tags, so a new one closes the open one
+            if tag == 'tr':
+                self._end_row()
+                self._row = []
+            elif (tag == 'td' or tag == 'th') and self._row is not None:
+                self._end_cell()
+                self._cell = []
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell.append(data)
+        if self._label:
+            self._label[1].append(data)
+
+    def handle_endtag(self, tag):
+        if self.done:
+            return
+        if tag == 'span' and self._label:
+            field, parts = self._label
+            self._label = None
+            self.labels[field] = _clean(parts)
+            if field == 'message' and any(marker in self.labels[field].lower() for marker in NO_RECORD_MARKERS):
+                self.no_record = True
+                self.done = True
+        elif self._table:
+            if tag == 'td' or tag == 'th':
+                self._end_cell()
+            elif tag == 'tr':
+                self._end_row()
+            elif tag == 'table':
+                self._end_row()
+                if self._table == HISTORY_TABLE:
+                    self.done = True
+                self._table = None
+
+    def _end_cell(self):
+        if self._cell is not None:
+            self._row.append(_clean(self._cell))
+            self._cell = None
+
+    def _end_row(self):
+        self._end_cell()
+        row, self._row = self._row, None
+        if not row:
+            return
+        if self._header is None:
+            self._header = [cell.lower() for cell in row]
+            return
+        if self._table == HISTORY_TABLE:
+            for column, value in zip(self._header, row):
+                if 'cgpa' in column:
+                    self.cgpa = value
+            return
+        cells = dict(zip(self._header, row))
+        code = cells.get('subject code', '')
+        name = cells.get('subject name', '')
+        if not (code or name):
+            return
+        # Keyed by code: a theory paper and its practical share a name but not a code
+        self.subjects[code or name] = {
+            'code': code,
+            'name': name,
+            'marks': cells.get('total', ''),
+            'grade': cells.get('grade', ''),
+            'credit': cells.get('credit', '')
+        }
+
+    def recognised(self):
+        """Whether anything of a result page (or its "no record" message) has been seen"""
+        return bool(self.no_record or self.subjects or self.labels.get('registration_number') or self.labels.get('name'))
+
+    def result(self, registration_number):
+        """Result dict from what has been parsed, or None when the page does not look like a result page"""
+        if not self.recognised():
+            return None
+        result = {
+            'registration_number': registration_number,
+            'name': self.labels.get('name', ''),
+            'semester': '',
+            'year': '',
+            'subjects': self.subjects,
+            'sgpa': self.labels.get('sgpa', ''),
+            'cgpa': self.cgpa,
+            'result': '',
+            'error': None
+        }
+        if self.no_record:
+            result['error'] = f"No result found for registration number {registration_number}"
+            result['no_record'] = True
+        elif result['sgpa']:
+            try:
+                result['result'] = 'PASS' if float(result['sgpa']) >= 4.0 else 'FAIL'
+            except ValueError:
+                result['result'] = 'UNKNOWN'
+        return result
+
+
+def parse_result_page(registration_number, page_source):
+    """Parse a complete page in one go; None when it is not a result page"""
+    parser = ResultPageParser()
+    parser.feed(page_source)
+    return parser.result(registration_number)
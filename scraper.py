@@ -1,18 +1,216 @@
+import os
 import requests
-from bs4 import BeautifulSoup
 import time
 import re
+import threading
 from datetime import datetime
 import json
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+from requests.adapters import HTTPAdapter
+from concurrency import AIMDLimiter
+from result_page import ResultPageParser, page_prefix, parse_result_page
+from result_cache import exam_key
+from metrics import (
+    HOMEPAGE_FETCH_SECONDS, LINK_RESOLUTION_SECONDS, PAGE_FETCH_SECONDS, PARSE_SECONDS,
+    FETCH_RETRIES, ERRORS, STUDENTS_SCRAPED, CONCURRENCY_WINDOW, REQUESTS_IN_FLIGHT, CACHE_HITS, CACHE_MISSES,
+    DEAD_LETTERS
+)
+
+logger = logging.getLogger(__name__)
+
+# Parts of a result page that change between fetches without the result changing
+VOLATILE_CONTENT_PATTERNS = [
+    # ASP.NET state fields (__VIEWSTATE, __EVENTVALIDATION, ...)
+    re.compile(r'<input[^>]*\bname="__[A-Z]+"[^>]*>', re.IGNORECASE),
+    # Script tags carry per-deployment WebResource/ScriptResource tokens
+    re.compile(r'<script\b.*?</script>', re.IGNORECASE | re.DOTALL),
+    # A revaluation re-publication moves the publish date of every page in the batch
+    re.compile(r'Publish Date :</strong>[^<]*', re.IGNORECASE),
+]
+
+
+# Resolved result URL templates per (portal, exam row), shared by every scraper in the process
+_URL_TEMPLATES = {}
+_URL_TEMPLATES_LOCK = threading.Lock()
+
+# Result pages are parsed in chunks of this size as they arrive
+PAGE_CHUNK_SIZE = 4096
+# Once the parser is done, a remainder up to this size is still read so the connection can be reused
+PAGE_DRAIN_LIMIT = 16 * 1024
+
+
+class DeadlineReached(Exception):
+    """The job deadline passed while a result page was still downloading"""
+
+
+def parse_html(markup):
+    """BeautifulSoup tree of a page; bs4 is imported on first use so importing the scraper stays cheap"""
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(markup, 'html.parser')
+
+
+def is_transient_failure(result):
+    """A failed fetch or parse worth retrying, as opposed to a confirmed "no record" page or a deadline cut-off"""
+    return bool(result.get('error')) and not result.get('no_record') and not result.get('unfinished')
+
+
+# Grade points used to pick a student's best attempt at a subject; unknown grades fall back to marks
+GRADE_POINTS = {'A+': 10, 'A': 9, 'B': 8, 'C': 7, 'D': 6, 'E': 5, 'P': 5, 'F': 0, 'AB': 0}
+
+
+def _subject_standing(details):
+    try:
+        marks = float(details.get('marks'))
+    except (TypeError, ValueError):
+        marks = -1.0
+    return GRADE_POINTS.get((details.get('grade') or '').strip().upper(), -1), marks
+
+
+def merge_attempts(attempts):
+    """One record from a student's (semester link, result) attempts at a semester, oldest first
+
+    SGPA, CGPA and the overall result come from the latest parsed attempt; each subject keeps its best
+    grade, a later attempt winning ties. A pending (deadline) attempt keeps the whole record pending.
+    """
+    for semester_link, result in attempts:
+        if result.get('unfinished'):
+            return result
+    found = [(semester_link, result) for semester_link, result in attempts if not result.get('error')]
+    if not found:
+        # A failed fetch outranks "no record" so the student is reported as a failure, not as absent
+        return next((result for _, result in attempts if not result.get('no_record')), attempts[0][1])
+
+    merged = dict(found[-1][1])
+    subjects = {}
+    for _, result in found:
+        for key, details in (result.get('subjects') or {}).items():
+            if key not in subjects or _subject_standing(details) >= _subject_standing(subjects[key]):
+                subjects[key] = details
+    merged['subjects'] = subjects
+    merged['name'] = next((result['name'] for _, result in reversed(found) if result.get('name')), '')
+    merged['attempts'] = [
+        {
+            'exam': semester_link['text'],
+            'published_date': semester_link['published_date'],
+            'is_special': bool(semester_link.get('is_special')),
+            'status': 'no_record' if result.get('no_record') else 'failed' if result.get('error') else 'ok'
+        }
+        for semester_link, result in attempts
+    ]
+    return merged
+
+
+class AttemptMerger:
+    """Collects each student's results from a semester's regular and special exams and emits one merged record"""
+
+    def __init__(self, attempts, emit):
+        self.attempts = attempts
+        self.keys = [exam_key(semester_link) for semester_link in attempts]
+        self.emit = emit
+        self._received = {}
+        self._emitted = set()
+        self._lock = threading.Lock()
+
+    def _merge(self, received):
+        return merge_attempts([
+            (semester_link, received[key]) for semester_link, key in zip(self.attempts, self.keys) if key in received
+        ])
+
+    def add(self, semester_link, result):
+        """Record one attempt; the merged record is emitted as soon as the student's last attempt arrives"""
+        registration_number = result['registration_number']
+        with self._lock:
+            received = self._received.setdefault(registration_number, {})
+            received[exam_key(semester_link)] = result
+            if len(received) < len(self.keys) or registration_number in self._emitted:
+                return
+            self._emitted.add(registration_number)
+        self.emit(self._merge(received))
+
+    def finish(self, registration_numbers, attempt_results):
+        """Merged records in registration order from each attempt's returned results; emits any not yet emitted"""
+        by_attempt = [
+            {result['registration_number']: result for result in results} for results in attempt_results
+        ]
+        merged_results = []
+        for registration_number in registration_numbers:
+            received = {
+                key: results[registration_number]
+                for key, results in zip(self.keys, by_attempt) if registration_number in results
+            }
+            if not received:
+                continue
+            merged = self._merge(received)
+            merged_results.append(merged)
+            with self._lock:
+                pending = registration_number not in self._emitted
+                self._emitted.add(registration_number)
+            if pending:
+                self.emit(merged)
+        return merged_results
+
+
+def content_hash(page_source):
+    """SHA-256 of the parsed part of a result page with volatile fields stripped, used to skip re-parsing unchanged pages"""
+    page_source = page_prefix(page_source)
+    for pattern in VOLATILE_CONTENT_PATTERNS:
+        page_source = pattern.sub('', page_source)
+    return hashlib.sha256(page_source.encode('utf-8')).hexdigest()
+
 
 class BEUResultScraper:
-    def __init__(self):
-        self.base_url = 'https://results.beup.ac.in/'
+    def __init__(self, initial_concurrency=4, max_concurrency=32, request_timeout=20, max_retries=2, base_url=None,
+                 dead_letter_retries=2, dead_letter_backoff=2.0):
+        # BEU_BASE_URL points the scraper at another portal, e.g. the mock server in loadtest/
+        self.base_url = base_url or os.environ.get('BEU_BASE_URL', 'https://results.beup.ac.in/')
+        if not self.base_url.endswith('/'):
+            self.base_url += '/'
         self.session = requests.Session()
         self.driver = None
+        # The WebDriver is one browser session, so semesters that fall back to it take turns
+        self._driver_lock = threading.Lock()
+        
+        # Concurrent fetch layer: the window adapts to what the server can sustain
+        self.limiter = AIMDLimiter(initial_limit=initial_concurrency, max_limit=max_concurrency)
+        self.request_timeout = request_timeout
+        self.max_retries = max_retries
+        # Students that failed the main pass are retried at the end, after this many rounds they stay failed
+        self.dead_letter_retries = dead_letter_retries
+        self.dead_letter_backoff = dead_letter_backoff
+        self.dead_letters = []
+        # Optional time.monotonic() deadline: past it nothing new is fetched and the remaining students are marked unfinished
+        self.deadline = None
+        adapter = HTTPAdapter(pool_connections=max_concurrency, pool_maxsize=max_concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['User-Agent'] = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+        self._homepage_source = None
+        
+        # Optional per-job instrumentation (see profiling.py)
+        self.timeline = None
+        self.profiler = None
+        
+        # Optional ResultCache (see result_cache.py) consulted before any page is fetched
+        self.cache = None
+        # Optional ResultWarehouse (see warehouse.py) that every freshly parsed result is stored in
+        self.warehouse = None
+        # Optional RankIndex (see rank_index.py) updated with every finished result, cached or fetched
+        self.rank_index = None
+        # Optional callable invoked with each finished result as soon as it is available (may run on worker threads)
+        self.on_result = None
+        # AttemptMerger per exam key while a semester's regular and special exams are scraped together
+        self._attempt_mergers = {}
         
     def setup_driver(self):
         """Setup Chrome WebDriver with appropriate options"""
+        # Selenium and webdriver-manager are only needed on the WebDriver path, so import them here
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+        from selenium.webdriver.chrome.service import Service
+        from webdriver_manager.chrome import ChromeDriverManager
         try:
             chrome_options = Options()
             chrome_options.add_argument('--headless')  # Run in background
@@ -28,22 +226,22 @@ class BEUResultScraper:
             try:
                 service = Service(ChromeDriverManager().install())
                 self.driver = webdriver.Chrome(service=service, options=chrome_options)
-                print("Chrome WebDriver initialized successfully")
+                logger.info("Chrome WebDriver initialized successfully")
                 return self.driver
             except Exception as e:
-                print(f"ChromeDriverManager failed: {e}")
+                logger.warning("ChromeDriverManager failed: %s", e)
                 
                 # Fallback: try system Chrome driver
                 try:
                     self.driver = webdriver.Chrome(options=chrome_options)
-                    print("Using system Chrome WebDriver")
+                    logger.info("Using system Chrome WebDriver")
                     return self.driver
                 except Exception as e2:
-                    print(f"System Chrome driver failed: {e2}")
+                    logger.warning("System Chrome driver failed: %s", e2)
                     raise Exception(f"Could not initialize Chrome WebDriver: {e2}")
                     
         except Exception as e:
-            print(f"WebDriver setup failed: {e}")
+            logger.warning("WebDriver setup failed: %s", e)
             raise e
     
     def close_driver(self):
@@ -54,6 +252,7 @@ class BEUResultScraper:
     
     def get_available_result_links(self, admission_year=None, publication_dates=None):
         """Get all available B.Tech result links from homepage using requests fallback"""
+        homepage_started_at = time.perf_counter()
         try:
             # Try WebDriver first, fallback to requests if it fails
             try:
@@ -63,113 +262,122 @@ class BEUResultScraper:
                 self.driver.get(self.base_url)
                 time.sleep(3)
                 page_source = self.driver.page_source
-                print("Using WebDriver to fetch page")
+                logger.info("Using WebDriver to fetch page")
             except Exception as driver_error:
-                print(f"WebDriver failed, using requests fallback: {driver_error}")
+                logger.info("WebDriver failed, using requests fallback: %s", driver_error)
                 # Fallback to requests
                 response = self.session.get(self.base_url)
                 page_source = response.text
-                print("Using requests to fetch page")
+                logger.info("Using requests to fetch page")
             
-            soup = BeautifulSoup(page_source, 'html.parser')
-            btech_links = []
-            
-            # Find all table rows
-            rows = soup.find_all('tr')
-            print(f"Found {len(rows)} table rows")
+            self._homepage_source = page_source
+            btech_links = self.parse_result_links(page_source, admission_year, publication_dates)
+            HOMEPAGE_FETCH_SECONDS.observe(time.perf_counter() - homepage_started_at)
+            return btech_links
             
-            for row in rows:
-                cells = row.find_all('td')
-                if len(cells) >= 3:
-                    exam_name = cells[0].get_text().strip()
-                    batch_session = cells[1].get_text().strip()
-                    published_date = cells[2].get_text().strip()
+        except Exception as e:
+            logger.error("Error getting result links: %s", e)
+            ERRORS.inc(category='homepage')
+            return []
+    
+    def parse_result_links(self, page_source, admission_year=None, publication_dates=None):
+        """Parse the B.Tech exam rows out of the homepage exam table"""
+        soup = parse_html(page_source)
+        btech_links = []
+        
+        # Find all table rows
+        rows = soup.find_all('tr')
+        logger.debug("Found %d table rows", len(rows))
+        
+        for row in rows:
+            cells = row.find_all('td')
+            if len(cells) >= 3:
+                exam_name = cells[0].get_text().strip()
+                batch_session = cells[1].get_text().strip()
+                published_date = cells[2].get_text().strip()
+                
+                # Check if it's a B.Tech result
+                if 'B.Tech' in exam_name and 'Semester' in exam_name:
+                    # Extract semester information
+                    semester_match = re.search(r'(\d+)(?:st|nd|rd|th)\s+Semester', exam_name)
                     
-                    # Check if it's a B.Tech result
-                    if 'B.Tech' in exam_name and 'Semester' in exam_name:
-                        # Extract semester information
-                        semester_match = re.search(r'(\d+)(?:st|nd|rd|th)\s+Semester', exam_name)
+                    if semester_match:
+                        semester = int(semester_match.group(1))
                         
-                        if semester_match:
-                            semester = int(semester_match.group(1))
-                            
-                            # Extract year from exam name
-                            year_match = re.search(r'(\d{4})', exam_name)
-                            year = int(year_match.group(1)) if year_match else 2024
-                            
-                            # Check if it's a special examination
-                            is_special = 'Special' in exam_name or '(S)' in exam_name or 'Arrear' in batch_session
+                        # Extract year from exam name
+                        year_match = re.search(r'(\d{4})', exam_name)
+                        year = int(year_match.group(1)) if year_match else 2024
+                        
+                        # Check if it's a special examination
+                        is_special = 'Special' in exam_name or '(S)' in exam_name or 'Arrear' in batch_session
+                        
+                        # Extract admission year from batch_session (e.g., "2021-25" means admission year 2021)
+                        batch_admission_year = None
+                        if '-' in batch_session and not 'Arrear' in batch_session:
+                            try:
+                                batch_start = batch_session.split('-')[0]
+                                if len(batch_start) == 4:
+                                    batch_admission_year = int(batch_start)
+                                elif len(batch_start) == 2:
+                                    # Convert 2-digit to 4-digit year (21 -> 2021)
+                                    batch_admission_year = 2000 + int(batch_start)
+                            except:
+                                pass
+                        
+                        # Filter by admission year if provided
+                        include_link = True
+                        if admission_year and batch_admission_year:
+                            include_link = (batch_admission_year == admission_year)
+                        
+                        # Filter by publication dates if provided
+                        if include_link and publication_dates and published_date:
+                            try:
+                                pub_date_obj = datetime.strptime(published_date, '%d-%m-%Y')
+                                pub_date_str = pub_date_obj.strftime('%Y-%m-%d')
+                                include_link = pub_date_str in publication_dates
+                            except:
+                                include_link = True
+                        
+                        if include_link:
+                            # Find the corresponding clickable link element (only if using WebDriver)
+                            link_element = None
+                            href = None
                             
-                            # Extract admission year from batch_session (e.g., "2021-25" means admission year 2021)
-                            batch_admission_year = None
-                            if '-' in batch_session and not 'Arrear' in batch_session:
+                            if self.driver:
                                 try:
-                                    batch_start = batch_session.split('-')[0]
-                                    if len(batch_start) == 4:
-                                        batch_admission_year = int(batch_start)
-                                    elif len(batch_start) == 2:
-                                        # Convert 2-digit to 4-digit year (21 -> 2021)
-                                        batch_admission_year = 2000 + int(batch_start)
+                                    from selenium.webdriver.common.by import By
+                                    links = self.driver.find_elements(By.TAG_NAME, "a")
+                                    for link in links:
+                                        if exam_name.strip() in link.text.strip():
+                                            link_element = link
+                                            href = link.get_attribute('href')
+                                            break
                                 except:
                                     pass
+                            else:
+                                # For requests fallback, find href from soup
+                                link_tags = soup.find_all('a')
+                                for link_tag in link_tags:
+                                    if exam_name.strip() in link_tag.get_text().strip():
+                                        href = link_tag.get('href')
+                                        if href and not href.startswith('http') and not href.startswith('javascript:'):
+                                            href = self.base_url + href.lstrip('/')
+                                        break
                             
-                            # Filter by admission year if provided
-                            include_link = True
-                            if admission_year and batch_admission_year:
-                                include_link = (batch_admission_year == admission_year)
-                            
-                            # Filter by publication dates if provided
-                            if include_link and publication_dates and published_date:
-                                try:
-                                    pub_date_obj = datetime.strptime(published_date, '%d-%m-%Y')
-                                    pub_date_str = pub_date_obj.strftime('%Y-%m-%d')
-                                    include_link = pub_date_str in publication_dates
-                                except:
-                                    include_link = True
-                            
-                            if include_link:
-                                # Find the corresponding clickable link element (only if using WebDriver)
-                                link_element = None
-                                href = None
-                                
-                                if self.driver:
-                                    try:
-                                        links = self.driver.find_elements(By.TAG_NAME, "a")
-                                        for link in links:
-                                            if exam_name.strip() in link.text.strip():
-                                                link_element = link
-                                                href = link.get_attribute('href')
-                                                break
-                                    except:
-                                        pass
-                                else:
-                                    # For requests fallback, find href from soup
-                                    link_tags = soup.find_all('a')
-                                    for link_tag in link_tags:
-                                        if exam_name.strip() in link_tag.get_text().strip():
-                                            href = link_tag.get('href')
-                                            if href and not href.startswith('http'):
-                                                href = self.base_url + href.lstrip('/')
-                                            break
-                                
-                                btech_links.append({
-                                    'text': exam_name,
-                                    'semester': semester,
-                                    'year': year,
-                                    'batch_session': batch_session,
-                                    'batch_admission_year': batch_admission_year,
-                                    'published_date': published_date,
-                                    'is_special': is_special,
-                                    'element': link_element,
-                                    'href': href
-                                })
-            
-            print(f"Found {len(btech_links)} B.Tech result links")
-            return btech_links
-            
-        except Exception as e:
-            print(f"Error getting result links: {e}")
-            return []
+                            btech_links.append({
+                                'text': exam_name,
+                                'semester': semester,
+                                'year': year,
+                                'batch_session': batch_session,
+                                'batch_admission_year': batch_admission_year,
+                                'published_date': published_date,
+                                'is_special': is_special,
+                                'element': link_element,
+                                'href': href
+                            })
+        
+        logger.info("Found %d B.Tech result links", len(btech_links))
+        return btech_links
     
     def navigate_to_semester_results(self, semester_link):
         """Navigate to specific semester results page"""
@@ -215,6 +423,9 @@ class BEUResultScraper:
                     pass
             
             if success:
+                from selenium.webdriver.common.by import By
+                from selenium.webdriver.support import expected_conditions as EC
+                from selenium.webdriver.support.ui import WebDriverWait
                 # Wait for page to load
                 WebDriverWait(self.driver, 15).until(
                     EC.presence_of_element_located((By.TAG_NAME, "body"))
@@ -224,11 +435,375 @@ class BEUResultScraper:
             
             return False
         except Exception as e:
-            print(f"Error navigating to semester results: {e}")
+            logger.error("Error navigating to semester results: %s", e)
             return False
+
+    def _form_fields(self, soup):
+        """Collect the hidden ASP.NET form fields (__VIEWSTATE etc.) from a page"""
+        fields = {}
+        for hidden in soup.find_all('input', attrs={'type': 'hidden'}):
+            if hidden.get('name'):
+                fields[hidden['name']] = hidden.get('value', '')
+        return fields
+
+    def resolve_result_url_template(self, semester_link, probe_registration):
+        """Resolve the direct result page URL for a semester, with {reg} in place of the registration number"""
+        # The template is the same for every student of an exam, so the postback round-trip is paid once
+        key = (self.base_url, semester_link.get('text'), semester_link.get('batch_session'), semester_link.get('published_date'))
+        with _URL_TEMPLATES_LOCK:
+            url_template = _URL_TEMPLATES.get(key)
+        if url_template:
+            CACHE_HITS.inc(cache='url_template')
+            return url_template
+        CACHE_MISSES.inc(cache='url_template')
+        
+        with LINK_RESOLUTION_SECONDS.time():
+            url_template = self._resolve_result_url_template(semester_link, probe_registration)
+        if url_template:
+            with _URL_TEMPLATES_LOCK:
+                _URL_TEMPLATES[key] = url_template
+        else:
+            ERRORS.inc(category='link_resolution')
+        return url_template
+
+    def _resolve_result_url_template(self, semester_link, probe_registration):
+        try:
+            href = semester_link.get('href') or ''
+
+            # Step 1: reach the semester search page
+            if '__doPostBack' in href:
+                postback_match = re.search(r"__doPostBack\('([^']+)','([^']*)'\)", href)
+                if not postback_match:
+                    return None
+                if not self._homepage_source:
+                    self._homepage_source = self.session.get(self.base_url, timeout=self.request_timeout).text
+                form_data = self._form_fields(parse_html(self._homepage_source))
+                form_data['__EVENTTARGET'] = postback_match.group(1)
+                form_data['__EVENTARGUMENT'] = postback_match.group(2)
+                search_response = self.session.post(self.base_url, data=form_data, timeout=self.request_timeout)
+            elif href.startswith('http'):
+                search_response = self.session.get(href, timeout=self.request_timeout)
+            else:
+                return None
+
+            # Step 2: submit the search form once with a probe registration number
+            search_soup = parse_html(search_response.text)
+            form = search_soup.find('form')
+            if not form:
+                return None
+
+            form_data = self._form_fields(form)
+            reg_input = None
+            for text_input in form.find_all('input', attrs={'type': 'text'}):
+                input_key = f"{text_input.get('name', '')} {text_input.get('id', '')}".lower()
+                if any(word in input_key for word in ['reg', 'roll', 'student']):
+                    reg_input = text_input
+                    break
+            if not reg_input:
+                reg_input = form.find('input', attrs={'type': 'text'})
+            if not reg_input or not reg_input.get('name'):
+                return None
+            form_data[reg_input['name']] = probe_registration
+
+            submit_button = form.find('input', attrs={'type': 'submit'})
+            if submit_button and submit_button.get('name'):
+                form_data[submit_button['name']] = submit_button.get('value', '')
+
+            action_url = urljoin(search_response.url, form.get('action') or search_response.url)
+            result_response = self.session.post(action_url, data=form_data, timeout=self.request_timeout)
+
+            # Step 3: the result page URL carries the registration number, turn it into a template
+            if probe_registration in result_response.url:
+                return result_response.url.replace(probe_registration, '{reg}')
+
+            logger.warning("Could not resolve direct result URL for %s", semester_link['text'])
+            return None
+        except Exception as e:
+            logger.error("Error resolving result URL for %s: %s", semester_link.get('text'), e)
+            return None
+
+    def time_left(self):
+        """Seconds until the job deadline, or None when the job has no deadline"""
+        if self.deadline is None:
+            return None
+        return max(self.deadline - time.monotonic(), 0.0)
+    
+    def deadline_passed(self):
+        return self.deadline is not None and time.monotonic() >= self.deadline
     
+    def _unfinished_result(self, semester_link, reg_number):
+        return {
+            'registration_number': reg_number,
+            'semester': semester_link['semester'],
+            'year': semester_link['year'],
+            'error': 'Not fetched before the deadline',
+            'unfinished': True
+        }
+    
+    def fetch_result_page(self, url, retries=None, read=None):
+        """Fetch one result page under the adaptive concurrency limit, retrying transient failures"""
+        # With a read(response) callable the body is streamed and read's return value replaces the page text
+        retries = self.max_retries if retries is None else retries
+        outcome = 'error'
+        for attempt in range(retries + 1):
+            if self.deadline_passed():
+                return 'deadline', None
+            started_at = self.limiter.acquire()
+            outcome = 'error'
+            page_source = None
+            response = None
+            try:
+                # A request never outlives the job deadline; the time left is taken once a slot is free,
+                # since waiting for one may have used it up, and read() drops a body still arriving when it hits
+                timeout = self.request_timeout
+                time_left = self.time_left()
+                if time_left is not None:
+                    timeout = min(timeout, time_left)
+                if timeout <= 0:
+                    raise DeadlineReached()
+                response = self.session.get(url, timeout=timeout, stream=read is not None)
+                if response.status_code == 429:
+                    outcome = 'throttled'
+                elif response.status_code >= 500:
+                    outcome = 'server_error'
+                elif response.status_code >= 400:
+                    outcome = 'client_error'
+                else:
+                    outcome = 'ok'
+                    page_source = read(response) if read else response.text
+            except DeadlineReached:
+                outcome = 'deadline'
+            except requests.exceptions.Timeout:
+                outcome = 'deadline' if self.deadline_passed() else 'timeout'
+            except requests.exceptions.RequestException:
+                outcome = 'error'
+            finally:
+                if response is not None:
+                    response.close()
+                latency = self.limiter.release(started_at, outcome)
+                PAGE_FETCH_SECONDS.observe(latency, outcome=outcome)
+                CONCURRENCY_WINDOW.set(self.limiter.window)
+                REQUESTS_IN_FLIGHT.set(self.limiter.in_flight)
+
+            if outcome == 'ok':
+                return outcome, page_source
+            if outcome == 'deadline':
+                return outcome, None
+            if outcome == 'client_error':
+                # Not worth retrying, the page itself is wrong
+                break
+            if attempt < retries:
+                FETCH_RETRIES.inc()
+                time.sleep(min(2 ** attempt, 10))
+
+        ERRORS.inc(category=outcome)
+        return outcome, None
+
+    def read_result_page(self, response, parse=True):
+        """Parse a streamed result page as it downloads and return (page text read, parser, seconds spent parsing)
+
+        With parse=False the page is only read (parser is None), for pages that may be unchanged re-fetches.
+        Raises DeadlineReached when the job deadline passes before the page is in.
+        """
+        parser = ResultPageParser() if parse else None
+        chunks = []
+        parse_seconds = 0.0
+        drained = 0
+        # decode_unicode yields bytes when the response names no charset
+        response.encoding = response.encoding or 'utf-8'
+        for chunk in response.iter_content(chunk_size=PAGE_CHUNK_SIZE, decode_unicode=True):
+            # Request timeouts bound each read, not the whole body, so a slow page is checked between chunks
+            if self.deadline_passed():
+                raise DeadlineReached()
+            if parser is None:
+                chunks.append(chunk)
+                continue
+            if parser.done:
+                drained += len(chunk)
+                if drained > PAGE_DRAIN_LIMIT:
+                    # Cheaper to drop the connection than to read a long tail nobody parses
+                    break
+                continue
+            chunks.append(chunk)
+            parse_started_at = time.perf_counter()
+            parser.feed(chunk)
+            parse_seconds += time.perf_counter() - parse_started_at
+        if parser is not None:
+            PARSE_SECONDS.observe(parse_seconds)
+        return ''.join(chunks), parser, parse_seconds
+
+    def fetch_stats(self):
+        """Current concurrency window and fetch health for progress/metrics output"""
+        return self.limiter.snapshot()
+
+    def _scrape_semester_concurrently(self, semester_link, url_template, registration_numbers, progress_callback=None, fingerprints=None):
+        """Fetch and parse all students of a semester concurrently through the result URL template"""
+        fingerprints = fingerprints or {}
+        total_students = len(registration_numbers)
+        completed = [0]
+        lock = threading.Lock()
+
+        semester = semester_link['semester']
+
+        def fetch_one(reg_number):
+            if self.deadline_passed():
+                return self._unfinished_result(semester_link, reg_number)
+            fingerprint = fingerprints.get(reg_number)
+            fetch_started_at = time.perf_counter()
+            # No inline backoff: a failing page is dead-lettered and retried once the main pass is done.
+            # A page fetched before is only read, so _parse_or_reuse can compare its hash before any parsing
+            outcome, page = self.fetch_result_page(
+                url_template.format(reg=reg_number), retries=0,
+                read=lambda response: self.read_result_page(response, parse=fingerprint is None)
+            )
+            fetch_ended_at = time.perf_counter()
+            # Streamed pages are parsed between chunks; that time is booked as its own parse span so the
+            # timeline still separates network time from parse time
+            parse_seconds = page[2] if page is not None else 0.0
+            if self.timeline:
+                self.timeline.record('fetch', semester, fetch_started_at, fetch_ended_at - parse_seconds)
+                if parse_seconds:
+                    self.timeline.record('parse', semester, fetch_ended_at - parse_seconds, fetch_ended_at)
+            if outcome == 'deadline':
+                return self._unfinished_result(semester_link, reg_number)
+            if page is not None:
+                page_source, parser, _ = page
+                result = self._parse_or_reuse(reg_number, page_source, fingerprint, semester, parser)
+            else:
+                result = {
+                    'registration_number': reg_number,
+                    'error': f'Could not fetch result page ({outcome})'
+                }
+            result['semester'] = semester_link['semester']
+            result['year'] = semester_link['year']
+            return result
+
+        def scrape_one(reg_number):
+            result = fetch_one(reg_number)
+            if is_transient_failure(result):
+                DEAD_LETTERS.inc(outcome='deferred')
+            else:
+                self._finish_result(result, semester_link)
+
+            if progress_callback:
+                with lock:
+                    completed[0] += 1
+                    progress = (completed[0] / total_students) * 100
+                progress_callback(progress, f"Processing student {reg_number} (concurrency window {self.limiter.window})")
+            return result
+
+        # Only the functions run on pool threads are wrapped; profiles must not nest on one thread
+        retry_one = fetch_one
+        if self.profiler:
+            scrape_one = self.profiler.wrap(scrape_one)
+            retry_one = self.profiler.wrap(fetch_one)
+
+        with ThreadPoolExecutor(max_workers=self.limiter.max_limit) as executor:
+            results = list(executor.map(scrape_one, registration_numbers))
+            return self._retry_dead_letters(semester_link, results, retry_one, executor.map, progress_callback)
+
+    def _retry_dead_letters(self, semester_link, results, fetch_one, map_function=map, progress_callback=None):
+        """Deferred retry pass: re-fetch the students that failed the main pass, backing off between rounds"""
+        pending = [i for i, result in enumerate(results) if is_transient_failure(result)]
+        attempts = 1
+        out_of_time = False
+        while pending and attempts <= self.dead_letter_retries:
+            delay = min(self.dead_letter_backoff * 2 ** (attempts - 1), 30)
+            time_left = self.time_left()
+            if time_left is not None and time_left <= delay:
+                out_of_time = True
+                break
+            logger.info("Retrying %d failed students of semester %s in %.1fs (round %d of %d)",
+                        len(pending), semester_link['semester'], delay, attempts, self.dead_letter_retries)
+            if progress_callback:
+                progress_callback(100, f"Retrying {len(pending)} failed students")
+            time.sleep(delay)
+            FETCH_RETRIES.inc(len(pending))
+            retried = list(map_function(fetch_one, [results[i]['registration_number'] for i in pending]))
+            attempts += 1
+            still_failing = []
+            for i, result in zip(pending, retried):
+                results[i] = result
+                if is_transient_failure(result):
+                    still_failing.append(i)
+                else:
+                    if not result.get('unfinished'):
+                        DEAD_LETTERS.inc(outcome='recovered')
+                    self._finish_result(result, semester_link)
+            pending = still_failing
+
+        if out_of_time:
+            # No time left for another round: these can still be fetched when the job is resumed
+            for i in pending:
+                results[i] = self._unfinished_result(semester_link, results[i]['registration_number'])
+                self._finish_result(results[i], semester_link)
+            return results
+
+        for i in pending:
+            result = results[i]
+            result['transient'] = True
+            result['attempts'] = attempts
+            DEAD_LETTERS.inc(outcome='unresolved')
+            self.dead_letters.append({
+                'registration_number': result['registration_number'],
+                'semester': result.get('semester'),
+                'error': result['error'],
+                'attempts': attempts
+            })
+            self._finish_result(result, semester_link)
+        return results
+
+    def _parse_or_reuse(self, reg_number, page_source, fingerprint, semester, parser=None):
+        """Parse a fetched page unless its content hash matches the previously parsed copy"""
+        digest = content_hash(page_source)
+        result = None
+        if fingerprint and fingerprint[0] == digest:
+            CACHE_HITS.inc(cache='content_hash')
+            result = dict(fingerprint[1])
+        else:
+            if fingerprint:
+                CACHE_MISSES.inc(cache='content_hash')
+            if parser:
+                result = parser.result(reg_number)
+        if result is None:
+            # Not streamed, or not laid out like a result page: parse the whole page
+            parse_started_at = time.perf_counter()
+            result = self.extract_student_result(reg_number, page_source)
+            self._record_phase('parse', semester, parse_started_at)
+        result['content_hash'] = digest
+        return result
+
+    def _finish_result(self, result, semester_link):
+        status = 'unfinished' if result.get('unfinished') else 'error' if result.get('error') else 'ok'
+        STUDENTS_SCRAPED.inc(status=status)
+        self._emit_result(result, semester_link)
+
+    def _emit_result(self, result, semester_link=None):
+        # One attempt of a semester that has special/arrear exams too: held back until the student's attempts are merged
+        merger = self._attempt_mergers.get(exam_key(semester_link)) if semester_link and self._attempt_mergers else None
+        if merger:
+            merger.add(semester_link, result)
+            return
+        if self.rank_index:
+            self.rank_index.add(result)
+        if self.on_result:
+            self.on_result(result)
+
+    def _append_result(self, results, result, semester_link):
+        results.append(result)
+        self._emit_result(result, semester_link)
+
+    def _record_phase(self, phase, semester, started_at):
+        """Add a span to the job timeline when one is attached"""
+        if self.timeline:
+            self.timeline.record(phase, semester, started_at, time.perf_counter())
+
     def search_student_result(self, registration_number):
         """Search for a specific student's result"""
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.common.keys import Keys
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
         try:
             # Look for registration number input field with various possible names/ids
             possible_selectors = [
@@ -294,11 +869,14 @@ class BEUResultScraper:
             
             return False
         except Exception as e:
-            print(f"Error searching for student {registration_number}: {e}")
+            logger.warning("Error searching for student %s: %s", registration_number, e)
             return False
     
-    def extract_student_result(self, registration_number):
-        """Extract student result data from the current page"""
+    def extract_student_result(self, registration_number, page_source=None):
+        """Extract student result data from the given page source or the current driver page"""
+        parse_started_at = time.perf_counter()
+        # Checked once so the parse loop pays nothing for logging when DEBUG is off
+        debug = logger.isEnabledFor(logging.DEBUG)
         try:
             result_data = {
                 'registration_number': registration_number,
@@ -312,20 +890,26 @@ class BEUResultScraper:
                 'error': None
             }
             
-            page_source = self.driver.page_source
-            soup = BeautifulSoup(page_source, 'html.parser')
+            if page_source is None:
+                page_source = self.driver.page_source
             
-            # Debug: Save page source for inspection
-            print(f"DEBUG: Extracting data for {registration_number}")
+            # Save page source to file for inspection (DEBUG logging only)
+            if debug:
+                logger.debug("Extracting data for %s", registration_number)
+                debug_filename = f"debug_page_{registration_number}.html"
+                try:
+                    with open(debug_filename, 'w', encoding='utf-8') as f:
+                        f.write(page_source)
+                    logger.debug("Saved page source to %s", debug_filename)
+                except Exception as e:
+                    logger.debug("Could not save page source: %s", e)
             
-            # Save page source to file for debugging
-            debug_filename = f"debug_page_{registration_number}.html"
-            try:
-                with open(debug_filename, 'w', encoding='utf-8') as f:
-                    f.write(page_source)
-                print(f"DEBUG: Saved page source to {debug_filename}")
-            except Exception as e:
-                print(f"DEBUG: Could not save page source: {e}")
+            # Pages in the portal's usual layout are read by element id; anything else goes through the heuristics below
+            parsed = parse_result_page(registration_number, page_source)
+            if parsed is not None:
+                PARSE_SECONDS.observe(time.perf_counter() - parse_started_at)
+                return parsed
+            soup = parse_html(page_source)
             
             # Look for student name with multiple patterns
             name_patterns = [
@@ -339,7 +923,8 @@ class BEUResultScraper:
                 name_match = re.search(pattern, page_source, re.IGNORECASE)
                 if name_match:
                     result_data['name'] = name_match.group(1).strip()
-                    print(f"DEBUG: Found name: {result_data['name']}")
+                    if debug:
+                        logger.debug("Found name: %s", result_data['name'])
                     break
             
             # Also try to find name in table cells
@@ -351,15 +936,18 @@ class BEUResultScraper:
                         name_text = next_cell.get_text().strip()
                         if name_text and len(name_text) > 2 and not name_text.isdigit():
                             result_data['name'] = name_text
-                            print(f"DEBUG: Found name in table: {result_data['name']}")
+                            if debug:
+                                logger.debug("Found name in table: %s", result_data['name'])
                             break
             
             # Look for result tables
             tables = soup.find_all('table')
-            print(f"DEBUG: Found {len(tables)} tables")
+            if debug:
+                logger.debug("Found %s tables", len(tables))
             
             for i, table in enumerate(tables):
-                print(f"DEBUG: Processing table {i+1}")
+                if debug:
+                    logger.debug("Processing table %s", i+1)
                 rows = table.find_all('tr')
                 
                 for row_idx, row in enumerate(rows):
@@ -421,9 +1009,11 @@ class BEUResultScraper:
                                     'marks': marks,
                                     'grade': grade
                                 }
-                                print(f"DEBUG: Found subject: {subject_name}, marks: {marks}, grade: {grade}")
+                                if debug:
+                                    logger.debug("Found subject: %s, marks: %s, grade: %s", subject_name, marks, grade)
             
-            print(f"DEBUG: Total subjects found: {len(result_data['subjects'])}")
+            if debug:
+                logger.debug("Total subjects found: %s", len(result_data['subjects']))
             
             # Extract SGPA from the bottom section (as shown in screenshot)
             # Look for SGPA in various formats
@@ -437,7 +1027,8 @@ class BEUResultScraper:
                 sgpa_match = re.search(pattern, page_source, re.IGNORECASE)
                 if sgpa_match:
                     result_data['sgpa'] = sgpa_match.group(1)
-                    print(f"DEBUG: Found SGPA with regex: {result_data['sgpa']}")
+                    if debug:
+                        logger.debug("Found SGPA with regex: %s", result_data['sgpa'])
                     break
             
             # Also look for SGPA in table cells (bottom right area)
@@ -454,7 +1045,8 @@ class BEUResultScraper:
                                 cell_text = row_cell.get_text().strip()
                                 if re.match(r'^[0-9]+\.[0-9]+$', cell_text):
                                     result_data['sgpa'] = cell_text
-                                    print(f"DEBUG: Found SGPA in table cell: {result_data['sgpa']}")
+                                    if debug:
+                                        logger.debug("Found SGPA in table cell: %s", result_data['sgpa'])
                                     break
                         if result_data['sgpa']:
                             break
@@ -476,7 +1068,8 @@ class BEUResultScraper:
                         header_text = header.get_text().strip()
                         if re.search(r'Cur\.?\s*CGPA|Current\s*CGPA|CGPA', header_text, re.IGNORECASE):
                             cgpa_col_index = i
-                            print(f"DEBUG: Found CGPA column at index {i}: {header_text}")
+                            if debug:
+                                logger.debug("Found CGPA column at index %s: %s", i, header_text)
                             break
                     
                     # If CGPA column found, get the value from data rows
@@ -488,7 +1081,8 @@ class BEUResultScraper:
                                 cgpa_text = cells[cgpa_col_index].get_text().strip()
                                 if re.match(r'^[0-9]+\.[0-9]+$', cgpa_text):
                                     result_data['cgpa'] = cgpa_text
-                                    print(f"DEBUG: Found CGPA in semester table: {result_data['cgpa']}")
+                                    if debug:
+                                        logger.debug("Found CGPA in semester table: %s", result_data['cgpa'])
                                     cgpa_found = True
                                     break
                         if cgpa_found:
@@ -506,7 +1100,8 @@ class BEUResultScraper:
                     cgpa_match = re.search(pattern, page_source, re.IGNORECASE)
                     if cgpa_match:
                         result_data['cgpa'] = cgpa_match.group(1)
-                        print(f"DEBUG: Found CGPA with regex: {result_data['cgpa']}")
+                        if debug:
+                            logger.debug("Found CGPA with regex: %s", result_data['cgpa'])
                         break
             
             # Look for overall result
@@ -519,7 +1114,8 @@ class BEUResultScraper:
                 result_match = re.search(pattern, page_source, re.IGNORECASE)
                 if result_match:
                     result_data['result'] = result_match.group(1).upper()
-                    print(f"DEBUG: Found result: {result_data['result']}")
+                    if debug:
+                        logger.debug("Found result: %s", result_data['result'])
                     break
             
             # If no explicit result found, determine from SGPA
@@ -538,13 +1134,18 @@ class BEUResultScraper:
                 for indicator in error_indicators:
                     if indicator in page_text:
                         result_data['error'] = f"No result found for registration number {registration_number}"
+                        result_data['no_record'] = True
                         break
             
-            print(f"DEBUG: Final result data: name={result_data['name']}, subjects={len(result_data['subjects'])}, sgpa={result_data['sgpa']}, cgpa={result_data['cgpa']}")
+            if debug:
+                logger.debug("Final result data: name=%s, subjects=%s, sgpa=%s, cgpa=%s", result_data['name'], len(result_data['subjects']), result_data['sgpa'], result_data['cgpa'])
+            PARSE_SECONDS.observe(time.perf_counter() - parse_started_at)
             return result_data
             
         except Exception as e:
-            print(f"Error extracting result for {registration_number}: {e}")
+            logger.warning("Error extracting result for %s: %s", registration_number, e)
+            ERRORS.inc(category='parse')
+            PARSE_SECONDS.observe(time.perf_counter() - parse_started_at)
             return {
                 'registration_number': registration_number,
                 'name': '',
@@ -558,123 +1159,257 @@ class BEUResultScraper:
             }
     
     def scrape_semester_results(self, semester_link, registration_numbers, progress_callback=None):
-        """Scrape results for multiple students in a semester"""
-        results = []
+        """Scrape results for multiple students in a semester, answering from the result cache where possible"""
+        cached = self.cache.get_many(semester_link, registration_numbers) if self.cache else {}
+        missing = [reg_number for reg_number in registration_numbers if reg_number not in cached]
+        if cached:
+            logger.info("Result cache: %d of %d students already cached", len(cached), len(registration_numbers))
+            for reg_number in registration_numbers:
+                if reg_number in cached:
+                    self._emit_result(cached[reg_number], semester_link)
+        
+        fetched = []
+        if missing:
+            # Pages fetched for an earlier publication of this exam let unchanged students skip the parse
+            fingerprints = self.cache.get_fingerprints(semester_link, missing) if self.cache else None
+            fetched = self._scrape_semester_from_portal(semester_link, missing, progress_callback, fingerprints)
+        if self.cache and fetched:
+            self.cache.put_many(semester_link, fetched)
+        # A merged semester is stored once its attempts are combined (see scrape_multiple_semesters)
+        if self.warehouse and fetched and exam_key(semester_link) not in self._attempt_mergers:
+            self.warehouse.store_results(semester_link, fetched)
+        if not cached:
+            return fetched
         
+        # Keep the caller's registration order
+        by_registration = dict(cached)
+        by_registration.update((result['registration_number'], result) for result in fetched)
+        return [by_registration[reg_number] for reg_number in registration_numbers if reg_number in by_registration]
+    
+    def refresh_semester_results(self, semester_link, registration_numbers, progress_callback=None):
+        """Re-fetch a semester and return (results, changes) where changes lists only records whose page changed
+
+        A semester with special/arrear attempts re-fetches every attempt; a student counts as changed when any
+        of their attempt pages changed, and the merged record is what gets stored and returned.
+        """
+        attempts = semester_link.get('attempts') or [semester_link]
+        merger = AttemptMerger(attempts, self._emit_result) if len(attempts) > 1 else None
+        if merger:
+            for exam_link in attempts:
+                self._attempt_mergers[exam_key(exam_link)] = merger
+        
+        # Per student, the status of their page on each attempt: failed, new, changed or unchanged
+        statuses = {}
+        attempt_results = []
+        try:
+            for exam_link in attempts:
+                previous = self.cache.get_fingerprints(exam_link, registration_numbers) if self.cache else {}
+                results = self._scrape_semester_from_portal(exam_link, registration_numbers, progress_callback, previous)
+                for result in results:
+                    fingerprint = previous.get(result['registration_number'])
+                    if not result.get('content_hash'):
+                        status = 'failed'
+                    elif not fingerprint:
+                        status = 'new'
+                    elif fingerprint[0] != result['content_hash']:
+                        status = 'changed'
+                    else:
+                        status = 'unchanged'
+                    statuses.setdefault(result['registration_number'], set()).add(status)
+                if self.cache:
+                    self.cache.put_many(exam_link, results)
+                attempt_results.append(results)
+        finally:
+            if merger:
+                for key in merger.keys:
+                    self._attempt_mergers.pop(key, None)
+        
+        results = merger.finish(registration_numbers, attempt_results) if merger else attempt_results[0]
+        changes = {'changed': [], 'new': [], 'unchanged': 0, 'failed': 0}
+        for result in results:
+            student_statuses = statuses.get(result['registration_number'], {'failed'})
+            # A failed attempt would merge into an incomplete record, so the student is left as it was
+            if 'failed' in student_statuses:
+                changes['failed'] += 1
+            elif 'changed' in student_statuses:
+                changes['changed'].append(result)
+            elif 'new' in student_statuses:
+                changes['new'].append(result)
+            else:
+                changes['unchanged'] += 1
+        
+        if self.warehouse:
+            self.warehouse.store_results(semester_link, changes['changed'] + changes['new'])
+        return results, changes
+    
+    def _scrape_semester_from_portal(self, semester_link, registration_numbers, progress_callback=None, fingerprints=None):
+        """Fetch and parse the given students of a semester from the results portal"""
+        results = []
+        fingerprints = fingerprints or {}
+        if self.deadline_passed():
+            for reg_number in registration_numbers:
+                self._append_result(results, self._unfinished_result(semester_link, reg_number), semester_link)
+            return results
+
+        try:
+            # Prefer direct concurrent fetching when the result page URL can be resolved
+            if registration_numbers:
+                url_template = self.resolve_result_url_template(semester_link, registration_numbers[0])
+                if url_template:
+                    return self._scrape_semester_concurrently(
+                        semester_link, url_template, registration_numbers, progress_callback, fingerprints
+                    )
+
+            with self._driver_lock:
+                return self._scrape_semester_with_driver(semester_link, registration_numbers, progress_callback, fingerprints)
+            
+        except Exception as e:
+            logger.error("Error scraping semester results: %s", e)
+            return results
+    
+    def _scrape_semester_with_driver(self, semester_link, registration_numbers, progress_callback, fingerprints):
+        """Search each student through the WebDriver when the result URL could not be resolved"""
+        results = []
         try:
+            if self.driver:
+                # Postback links only work from the homepage
+                self.driver.get(self.base_url)
+                time.sleep(3)
+            
             # Navigate to semester results page
             if not self.navigate_to_semester_results(semester_link):
                 return results
             
             total_students = len(registration_numbers)
             
+            def fetch_one(reg_number):
+                return self._search_with_driver(semester_link, reg_number, fingerprints)
+            
             for i, reg_number in enumerate(registration_numbers):
-                try:
-                    if progress_callback:
-                        progress = ((i + 1) / total_students) * 100
-                        progress_callback(progress, f"Processing student {reg_number}")
-                    
-                    # Search for student result
-                    if self.search_student_result(reg_number):
-                        result = self.extract_student_result(reg_number)
-                        result['semester'] = semester_link['semester']
-                        result['year'] = semester_link['year']
-                        results.append(result)
-                    else:
-                        # Student not found
-                        results.append({
-                            'registration_number': reg_number,
-                            'semester': semester_link['semester'],
-                            'year': semester_link['year'],
-                            'error': 'Could not search for student result'
-                        })
-                    
-                    # Go back to search page for next student
-                    self.driver.back()
-                    time.sleep(1)
-                    
-                except Exception as e:
-                    print(f"Error processing student {reg_number}: {e}")
-                    results.append({
-                        'registration_number': reg_number,
-                        'semester': semester_link['semester'],
-                        'year': semester_link['year'],
-                        'error': str(e)
-                    })
-                    
-                    # Try to go back to search page
-                    try:
-                        self.driver.back()
-                        time.sleep(1)
-                    except:
-                        # Re-navigate to semester page if back fails
-                        self.navigate_to_semester_results(semester_link)
+                if progress_callback:
+                    progress = ((i + 1) / total_students) * 100
+                    progress_callback(progress, f"Processing student {reg_number}")
+                
+                if self.deadline_passed():
+                    result = self._unfinished_result(semester_link, reg_number)
+                else:
+                    result = fetch_one(reg_number)
+                results.append(result)
+                if is_transient_failure(result):
+                    DEAD_LETTERS.inc(outcome='deferred')
+                else:
+                    self._finish_result(result, semester_link)
             
-            return results
+            return self._retry_dead_letters(semester_link, results, fetch_one, progress_callback=progress_callback)
             
         except Exception as e:
-            print(f"Error scraping semester results: {e}")
+            logger.error("Error scraping semester results: %s", e)
             return results
     
-    def scrape_multiple_semesters(self, semester_links, registration_numbers, admission_year=None, progress_callback=None):
-        """Scrape results for multiple semesters with homepage return between each"""
-        all_results = []
+    def _search_with_driver(self, semester_link, reg_number, fingerprints):
+        """Search and parse one student through the WebDriver session, returning an error result on failure"""
+        try:
+            # Search for student result
+            fetch_started_at = time.perf_counter()
+            found = self.search_student_result(reg_number)
+            self._record_phase('fetch', semester_link['semester'], fetch_started_at)
+            if found:
+                result = self._parse_or_reuse(
+                    reg_number, self.driver.page_source, fingerprints.get(reg_number), semester_link['semester']
+                )
+            else:
+                # Student not found
+                result = {'registration_number': reg_number, 'error': 'Could not search for student result'}
+        except Exception as e:
+            logger.warning("Error processing student %s: %s", reg_number, e)
+            result = {'registration_number': reg_number, 'error': str(e)}
+        result['semester'] = semester_link['semester']
+        result['year'] = semester_link['year']
         
+        # Go back to search page for next student
         try:
-            total_semesters = len(semester_links)
+            self.driver.back()
+            time.sleep(1)
+        except Exception:
+            # Re-navigate to semester page if back fails
+            self.navigate_to_semester_results(semester_link)
+        return result
+    
+    def scrape_multiple_semesters(self, semester_links, registration_numbers, admission_year=None, progress_callback=None):
+        """Scrape results for multiple semesters concurrently, all sharing the adaptive fetch limit
+
+        A semester link with "attempts" (its regular plus special/arrear exams, see select_semester_links)
+        has every attempt fetched at the same time, and each student's attempts merged into one record.
+        """
+        if not semester_links:
+            return []
+        # Every exam page to fetch, with the index of the requested semester it belongs to
+        exams = [
+            (index, exam_link)
+            for index, semester_link in enumerate(semester_links)
+            for exam_link in semester_link.get('attempts') or [semester_link]
+        ]
+        exam_progress = [0.0] * len(exams)
+        progress_lock = threading.Lock()
+        
+        mergers = {}
+        for index, semester_link in enumerate(semester_links):
+            if len(semester_link.get('attempts') or ()) > 1:
+                mergers[index] = AttemptMerger(semester_link['attempts'], self._emit_result)
+                for exam_link in semester_link['attempts']:
+                    self._attempt_mergers[exam_key(exam_link)] = mergers[index]
+        
+        def scrape_semester(exam_index, semester_link):
+            logger.info("Processing Semester %s: %s (Batch: %s, Published: %s)",
+                        semester_link['semester'], semester_link['text'],
+                        semester_link['batch_session'], semester_link['published_date'])
             
-            for i, semester_link in enumerate(semester_links):
-                if progress_callback:
-                    semester_progress = (i / total_semesters) * 100
-                    progress_callback(semester_progress, f"Processing Semester {semester_link['semester']} ({semester_link['batch_session']})")
-                
-                print(f"\n--- Processing Semester {semester_link['semester']} ---")
-                print(f"Exam: {semester_link['text']}")
-                print(f"Batch: {semester_link['batch_session']}")
-                print(f"Published: {semester_link['published_date']}")
-                
-                # Go back to homepage before each semester
-                print("Returning to homepage...")
-                self.driver.get(self.base_url)
-                time.sleep(3)
-                
-                # Get fresh links with admission year filter
-                fresh_links = self.get_available_result_links(admission_year)
-                
-                # Find exact matching link based on text and batch
-                matching_link = None
-                for link in fresh_links:
-                    if (link['text'] == semester_link['text'] and 
-                        link['batch_session'] == semester_link['batch_session']):
-                        matching_link = link
-                        break
-                
-                if matching_link:
-                    print(f"Found matching link: {matching_link['text']}")
-                    semester_results = self.scrape_semester_results(
-                        matching_link, 
-                        registration_numbers,
-                        progress_callback
-                    )
-                    all_results.extend(semester_results)
-                    print(f"Scraped {len(semester_results)} results for this semester")
-                else:
-                    print(f"Could not find matching link for: {semester_link['text']} ({semester_link['batch_session']})")
-                    # Add error entry for this semester
-                    for reg_num in registration_numbers:
-                        all_results.append({
-                            'registration_number': reg_num,
-                            'semester': semester_link['semester'],
-                            'year': semester_link['year'],
-                            'batch_session': semester_link['batch_session'],
-                            'error': f"Semester link not found: {semester_link['text']}"
-                        })
-            
-            return all_results
+            def update_progress(progress, message):
+                with progress_lock:
+                    exam_progress[exam_index] = progress
+                    overall = sum(exam_progress) / len(exam_progress)
+                progress_callback(overall, f"Semester {semester_link['semester']}: {message}")
             
-        except Exception as e:
-            print(f"Error scraping multiple semesters: {e}")
-            return all_results
+            try:
+                semester_results = self.scrape_semester_results(
+                    semester_link, registration_numbers, update_progress if progress_callback else None
+                )
+            except Exception as e:
+                logger.error("Error scraping semester %s: %s", semester_link['semester'], e)
+                return []
+            logger.info("Scraped %d results for semester %s", len(semester_results), semester_link['semester'])
+            return semester_results
+        
+        if progress_callback:
+            progress_callback(0, f"Processing {len(semester_links)} semesters")
+        
+        # Every exam link came from the homepage fetched at the start of the job, so no homepage
+        # round-trip is needed per semester; their students interleave under the shared limiter
+        try:
+            with ThreadPoolExecutor(max_workers=len(exams)) as executor:
+                futures = [
+                    executor.submit(scrape_semester, exam_index, exam_link)
+                    for exam_index, (_, exam_link) in enumerate(exams)
+                ]
+                exam_results = [future.result() for future in futures]
+        finally:
+            for merger in mergers.values():
+                for key in merger.keys:
+                    self._attempt_mergers.pop(key, None)
+        
+        aggregation_started_at = time.perf_counter()
+        all_results = []
+        for index, semester_link in enumerate(semester_links):
+            results = [exam_results[i] for i, (semester_index, _) in enumerate(exams) if semester_index == index]
+            if index in mergers:
+                merged = mergers[index].finish(registration_numbers, results)
+                if self.warehouse:
+                    self.warehouse.store_results(semester_link, merged)
+                all_results.extend(merged)
+            else:
+                all_results.extend(results[0])
+        self._record_phase('aggregation', None, aggregation_started_at)
+        return all_results
     
     def generate_registration_numbers(self, admission_year, branch_code, start_num, end_num):
         """Generate registration numbers based on the format YYBBBCCCNNN"""
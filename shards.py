@@ -0,0 +1,409 @@
+"""Shared shard queue for splitting a large scrape job across worker processes and machines.
+
+A job is planned once and cut into shards of (exam page, registration sub-range),
+stored in a SQLite file that every worker can reach (BEU_SHARD_QUEUE, e.g. on
+shared storage). Workers lease one shard at a time and keep the lease alive with
+heartbeats while they scrape it. A shard whose lease runs out (its worker died or
+hung) goes back to the queue for any other worker to steal, until it has used up
+its attempts and is marked failed. Finished shards keep their parsed results
+("partial" when some students still failed after the scraper's retries), and
+whichever worker completes the last shard builds the job's export from all of them.
+
+    python cli.py --spec university.json --enqueue --shard-size 50
+    python cli.py --work            # on every node, as many processes as wanted
+"""
+import os
+import json
+import sqlite3
+import threading
+import time
+import logging
+from result_cache import DATA_DIR, journal_mode
+from metrics import SHARD_LEASES
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SHARD_QUEUE_PATH = os.environ.get('BEU_SHARD_QUEUE', os.path.join(DATA_DIR, 'shards.sqlite3'))
+DEFAULT_SHARD_SIZE = 50
+DEFAULT_LEASE_SECONDS = 60
+
+SCHEMA = [
+    'CREATE TABLE IF NOT EXISTS shard_jobs ('
+    ' id TEXT PRIMARY KEY,'
+    ' spec_json TEXT NOT NULL,'
+    ' status TEXT NOT NULL,'
+    ' created_at REAL NOT NULL,'
+    ' updated_at REAL NOT NULL)',
+    'CREATE TABLE IF NOT EXISTS shards ('
+    ' job_id TEXT NOT NULL,'
+    ' shard_id INTEGER NOT NULL,'
+    ' admission_year INTEGER NOT NULL,'
+    ' branch_code TEXT NOT NULL,'
+    ' semester INTEGER,'
+    ' exam_json TEXT NOT NULL,'
+    ' registration_numbers_json TEXT NOT NULL,'
+    ' status TEXT NOT NULL,'
+    ' worker TEXT,'
+    ' lease_expires REAL,'
+    ' attempts INTEGER NOT NULL DEFAULT 0,'
+    ' error TEXT,'
+    ' results_json TEXT,'
+    ' updated_at REAL NOT NULL,'
+    ' PRIMARY KEY (job_id, shard_id))',
+    'CREATE INDEX IF NOT EXISTS shards_by_status ON shards (status, lease_expires)',
+]
+
+
+def _portable(semester_link):
+    # WebDriver elements cannot leave the process; attempts (special exams) are exam links themselves
+    link = {key: value for key, value in semester_link.items() if key != 'element'}
+    if link.get('attempts'):
+        link['attempts'] = [_portable(attempt) for attempt in link['attempts']]
+    return link
+
+
+def plan_shards(plans, shard_size=DEFAULT_SHARD_SIZE):
+    """(admission year, branch code, exam link, registration numbers) for every shard of planned groups"""
+    shards = []
+    for admission_year, branch_code, reg_numbers, semester_links in plans:
+        for semester_link in semester_links:
+            for start in range(0, len(reg_numbers), shard_size):
+                shards.append((admission_year, branch_code, _portable(semester_link), reg_numbers[start:start + shard_size]))
+    return shards
+
+
+class ShardQueue:
+    """Shards of distributed scrape jobs in a SQLite file shared by every worker"""
+
+    def __init__(self, path=DEFAULT_SHARD_QUEUE_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(f"PRAGMA journal_mode={journal_mode('BEU_SHARD_QUEUE')}")
+            for statement in SCHEMA:
+                conn.execute(statement)
+
+    def _connect(self):
+        # One connection per thread; sqlite3 connections must not cross threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, job_id, spec, shards):
+        """Add a job and its shards; returns the number of shards"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT INTO shard_jobs (id, spec_json, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?)',
+                (job_id, json.dumps(spec, default=str), 'running', now, now)
+            )
+            conn.executemany(
+                'INSERT INTO shards (job_id, shard_id, admission_year, branch_code, semester, exam_json, '
+                'registration_numbers_json, status, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [
+                    (job_id, shard_id, admission_year, branch_code, exam['semester'], json.dumps(exam, default=str),
+                     json.dumps(reg_numbers), 'pending', now)
+                    for shard_id, (admission_year, branch_code, exam, reg_numbers) in enumerate(shards)
+                ]
+            )
+        return len(shards)
+
+    def lease(self, worker, lease_seconds=DEFAULT_LEASE_SECONDS, max_attempts=3):
+        """Lease the next pending shard, or steal one whose lease expired; None when nothing is left to do"""
+        conn = self._connect()
+        now = time.time()
+        with conn:
+            # IMMEDIATE takes the write lock up front so two workers never lease the same shard
+            conn.execute('BEGIN IMMEDIATE')
+            # A shard that killed or hung its worker on every attempt is given up rather than re-leased forever
+            expired = conn.execute(
+                "UPDATE shards SET status = 'failed', lease_expires = NULL, "
+                "error = 'Lease expired on attempt ' || attempts || ' (worker died or hung)', updated_at = ? "
+                "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, now, max_attempts)
+            ).rowcount
+            row = conn.execute(
+                "SELECT * FROM shards WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?) "
+                "ORDER BY status = 'leased', rowid LIMIT 1",
+                (now,)
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE shards SET status = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1, "
+                    "updated_at = ? WHERE job_id = ? AND shard_id = ?",
+                    (worker, now + lease_seconds, now, row['job_id'], row['shard_id'])
+                )
+        if expired:
+            SHARD_LEASES.inc(expired, outcome='expired')
+            logger.warning("%d shard(s) failed: their lease expired on the last attempt", expired)
+        if row is None:
+            return None
+        stolen = row['status'] == 'leased'
+        SHARD_LEASES.inc(outcome='stolen' if stolen else 'leased')
+        if stolen:
+            logger.warning("Shard %s/%d: lease of %s expired, taken over by %s",
+                           row['job_id'], row['shard_id'], row['worker'], worker)
+        return {
+            'job_id': row['job_id'],
+            'shard_id': row['shard_id'],
+            'admission_year': row['admission_year'],
+            'branch_code': row['branch_code'],
+            'exam': json.loads(row['exam_json']),
+            'registration_numbers': json.loads(row['registration_numbers_json']),
+            'attempts': row['attempts'] + 1
+        }
+
+    def heartbeat(self, shard, worker, lease_seconds=DEFAULT_LEASE_SECONDS):
+        """Extend a lease; False when the shard was stolen or finished by another worker meanwhile"""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE shards SET lease_expires = ? WHERE job_id = ? AND shard_id = ? AND worker = ? AND status = 'leased'",
+                (time.time() + lease_seconds, shard['job_id'], shard['shard_id'], worker)
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, shard, worker, results, failed_students=None):
+        """Store a shard's results, as partial when some students failed; False when another worker already completed it"""
+        status = 'partial' if failed_students else 'done'
+        error = f"{len(failed_students)} students failed: {', '.join(failed_students)}" if failed_students else None
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE shards SET status = ?, worker = ?, lease_expires = NULL, error = ?, results_json = ?, "
+                "updated_at = ? WHERE job_id = ? AND shard_id = ? AND status NOT IN ('done', 'partial')",
+                (status, worker, error, json.dumps(results, default=str), time.time(), shard['job_id'], shard['shard_id'])
+            )
+        SHARD_LEASES.inc(outcome=('completed' if status == 'done' else 'partial') if cursor.rowcount else 'duplicate')
+        return cursor.rowcount == 1
+
+    def fail(self, shard, worker, error, max_attempts=3):
+        """Give a shard back after an error, or mark it failed once it has used up its attempts"""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE shards SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "lease_expires = NULL, error = ?, updated_at = ? "
+                "WHERE job_id = ? AND shard_id = ? AND worker = ? AND status = 'leased'",
+                (max_attempts, str(error), time.time(), shard['job_id'], shard['shard_id'], worker)
+            )
+        SHARD_LEASES.inc(outcome='failed')
+
+    def next_expiry(self):
+        """When the earliest lease held by some worker runs out, or None when no shard is leased"""
+        return self._connect().execute("SELECT MIN(lease_expires) FROM shards WHERE status = 'leased'").fetchone()[0]
+
+    def progress(self, job_id):
+        """Shard counts by status for one job"""
+        rows = self._connect().execute(
+            'SELECT status, COUNT(*) AS shards FROM shards WHERE job_id = ? GROUP BY status', (job_id,)
+        ).fetchall()
+        counts = {'pending': 0, 'leased': 0, 'done': 0, 'partial': 0, 'failed': 0}
+        counts.update((row['status'], row['shards']) for row in rows)
+        counts['total'] = sum(counts.values())
+        return counts
+
+    def claim_export(self, job_id):
+        """True for exactly one caller once every shard of the job is done, partial or failed"""
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            open_shards = conn.execute(
+                "SELECT COUNT(*) FROM shards WHERE job_id = ? AND status NOT IN ('done', 'partial', 'failed')", (job_id,)
+            ).fetchone()[0]
+            if open_shards:
+                return False
+            cursor = conn.execute(
+                "UPDATE shard_jobs SET status = 'exporting', updated_at = ? WHERE id = ? AND status = 'running'",
+                (time.time(), job_id)
+            )
+        return cursor.rowcount == 1
+
+    def finished_jobs(self):
+        """Running jobs with no shard left open, e.g. after lease() gave up a job's last shard"""
+        return [row['id'] for row in self._connect().execute(
+            "SELECT id FROM shard_jobs WHERE status = 'running' AND NOT EXISTS ("
+            "SELECT 1 FROM shards WHERE job_id = shard_jobs.id AND status IN ('pending', 'leased'))"
+        )]
+
+    def finish_job(self, job_id, status):
+        with self._connect() as conn:
+            conn.execute('UPDATE shard_jobs SET status = ?, updated_at = ? WHERE id = ?', (status, time.time(), job_id))
+
+    def job(self, job_id):
+        row = self._connect().execute('SELECT * FROM shard_jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+        return {'id': row['id'], 'spec': json.loads(row['spec_json']), 'status': row['status']}
+
+    def results(self, job_id):
+        """(admission year, branch code, results) of every finished shard in shard order, and the failed and partial shards"""
+        finished, incomplete = [], []
+        for row in self._connect().execute(
+            'SELECT shard_id, admission_year, branch_code, semester, status, error, results_json, '
+            'registration_numbers_json FROM shards WHERE job_id = ? ORDER BY shard_id', (job_id,)
+        ):
+            if row['status'] in ('done', 'partial'):
+                finished.append((row['admission_year'], row['branch_code'], json.loads(row['results_json'])))
+            if row['status'] != 'done':
+                incomplete.append({
+                    'shard_id': row['shard_id'],
+                    'status': row['status'],
+                    'semester': row['semester'],
+                    'registration_numbers': json.loads(row['registration_numbers_json']),
+                    'error': row['error']
+                })
+        return finished, incomplete
+
+
+def export_sharded_job(queue, job_id, jobs=None):
+    """Merge every shard's results into the job's export(s) and record them on the job; returns the job summary"""
+    from processor import ResultProcessor, export_results
+    from jobs import JOBS
+
+    jobs = jobs or JOBS
+    spec = queue.job(job_id)['spec']
+    export_format = spec.get('format', 'excel').lower()
+    selected_semesters = spec.get('semesters') or []
+    finished, incomplete = queue.results(job_id)
+
+    all_results = []
+    groups = {}
+    for admission_year, branch_code, results in finished:
+        all_results.extend(results)
+        groups.setdefault((admission_year, branch_code), []).extend(results)
+
+    processor = ResultProcessor()
+    exports = []
+    if all_results and export_format in ('csv', 'workbook'):
+        branch_code = next(iter(groups))[1] if len(groups) == 1 else 'multi'
+        exports.append(export_results(processor, all_results, export_format, branch_code, None, selected_semesters))
+    elif export_format == 'excel':
+        # Excel layouts are per batch and branch, as in a single-box job
+        for (admission_year, branch_code), results in groups.items():
+            exports.append(export_results(processor, results, 'excel', branch_code, admission_year, selected_semesters))
+    for filename, filepath in exports:
+        jobs.add_artifact(job_id, filename, filepath)
+
+    summary = {
+        'total_results': len(all_results),
+        'successful_results': len([result for result in all_results if not result.get('error')]),
+        'failed_results': len([result for result in all_results if result.get('error')]),
+        'failed_shards': [shard for shard in incomplete if shard['status'] == 'failed'],
+        'partial_shards': [shard for shard in incomplete if shard['status'] == 'partial'],
+        'download_urls': [f'/download/{filename}' for filename, _ in exports]
+    }
+    status = 'failed' if not all_results else 'partial' if incomplete else 'completed'
+    queue.finish_job(job_id, status)
+    jobs.update(
+        job_id, status=status, progress=100, result=summary,
+        message=f"{len(all_results)} results from {len(finished)} shards"
+                + (f", {len(summary['partial_shards'])} with failed students" if summary['partial_shards'] else '')
+                + (f", {len(summary['failed_shards'])} shards failed" if summary['failed_shards'] else '')
+    )
+    return dict(summary, status=status)
+
+
+class ShardWorker:
+    """Leases shards from the queue and scrapes them with one long-lived scraper"""
+
+    def __init__(self, queue, scraper, worker=None, lease_seconds=DEFAULT_LEASE_SECONDS, max_attempts=3, jobs=None):
+        from jobs import JOBS, worker_id
+
+        self.queue = queue
+        self.scraper = scraper
+        self.worker = worker or worker_id()
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.jobs = jobs or JOBS
+
+    def run(self, follow=False, poll_interval=5.0, stop=None):
+        """Work until every shard is finished (or, with follow, until stop is set); returns the shards completed"""
+        completed = 0
+        while not (stop and stop.is_set()):
+            shard = self.queue.lease(self.worker, self.lease_seconds, self.max_attempts)
+            self._export_finished()
+            if shard is None:
+                # Shards still leased elsewhere may belong to a dead worker: stay until they finish or can be stolen
+                expiry = self.queue.next_expiry()
+                if expiry is None and not follow:
+                    break
+                wait = poll_interval if expiry is None else min(max(expiry - time.time(), 0) + 0.1, poll_interval)
+                time.sleep(wait)
+                continue
+            completed += self.process(shard)
+        return completed
+
+    def _export_finished(self):
+        # A job whose last open shard was given up by lease() has no completing worker to export it
+        for job_id in self.queue.finished_jobs():
+            if self.queue.claim_export(job_id):
+                self._export(job_id)
+
+    def _export(self, job_id):
+        # claim_export moved the job to "exporting", so a failed export must close it or it never leaves that state
+        try:
+            export_sharded_job(self.queue, job_id, self.jobs)
+        except Exception as e:
+            logger.exception("Export of sharded job %s failed", job_id)
+            self.queue.finish_job(job_id, 'failed')
+            self.jobs.update(job_id, status='failed', message=f'Export failed: {e}')
+
+    def process(self, shard):
+        """Scrape one shard under a heartbeat-kept lease; the worker completing a job's last shard exports it"""
+        exam = shard['exam']
+        logger.info("Shard %s/%d: semester %s, %d students (attempt %d)", shard['job_id'], shard['shard_id'],
+                    exam['semester'], len(shard['registration_numbers']), shard['attempts'])
+        stop = threading.Event()
+
+        def keep_alive():
+            while not stop.wait(self.lease_seconds / 3):
+                if not self.queue.heartbeat(shard, self.worker, self.lease_seconds):
+                    logger.warning("Shard %s/%d: lease lost to another worker", shard['job_id'], shard['shard_id'])
+                    return
+
+        heartbeat = threading.Thread(target=keep_alive, name='shard-heartbeat', daemon=True)
+        heartbeat.start()
+        try:
+            results = self.scraper.scrape_multiple_semesters(
+                [exam], shard['registration_numbers'], shard['admission_year']
+            )
+        except Exception as e:
+            logger.exception("Shard %s/%d failed", shard['job_id'], shard['shard_id'])
+            self.queue.fail(shard, self.worker, e, self.max_attempts)
+            return 0
+        finally:
+            stop.set()
+            heartbeat.join()
+
+        from scraper import is_transient_failure
+
+        if shard['registration_numbers'] and not results:
+            # Nothing came back at all (e.g. the exam page could not be resolved): retry the shard like a crash
+            self.queue.fail(shard, self.worker, 'No results: the exam page could not be scraped', self.max_attempts)
+            return 0
+        # Students still failing after the scraper's own retry pass, or missing because the exam page itself
+        # could not be scraped, are reported on the shard instead of hidden in it
+        returned = {result['registration_number']: result for result in results}
+        failed_students = [
+            reg_number for reg_number in shard['registration_numbers']
+            if reg_number not in returned or is_transient_failure(returned[reg_number])
+        ]
+        stored = self.queue.complete(
+            shard, self.worker, [{key: value for key, value in result.items() if key != 'content_hash'} for result in results],
+            failed_students
+        )
+        progress = self.queue.progress(shard['job_id'])
+        finished = progress['done'] + progress['partial']
+        self.jobs.update(
+            shard['job_id'],
+            progress=round((finished + progress['failed']) / progress['total'] * 100, 1),
+            message=f"{finished} of {progress['total']} shards done"
+                    + (f", {progress['partial']} with failed students" if progress['partial'] else '')
+        )
+        if self.queue.claim_export(shard['job_id']):
+            self._export(shard['job_id'])
+        return 1 if stored else 0
@@ -0,0 +1,229 @@
+"""Frozen, columnar copies of finished batches for cross-batch cohort analytics.
+
+A snapshot is one directory per (branch, admission year) holding two long-format
+tables, `semesters` (one row per student and semester) and `subjects` (one row per
+student, semester and paper). Every column is its own .npy file, so a query opens
+only the columns it needs, memory-mapped, and pages in only what it reads:
+
+    snapshots/105_2023/manifest.json
+    snapshots/105_2023/semesters/sgpa.npy
+    snapshots/105_2023/subjects/grade.npy
+    ...
+
+Every batch uses the same schema (SCHEMA below), so comparing the 2021, 2022 and
+2023 CSE batches runs the same aggregation over three sets of files.
+"""
+import os
+import json
+import shutil
+import time
+from result_cache import DATA_DIR
+from warehouse import BACKLOG_GRADES
+
+DEFAULT_SNAPSHOT_DIR = os.path.join(DATA_DIR, 'snapshots')
+SNAPSHOT_VERSION = 1
+
+# Column dtypes per table; 'U' columns are fixed-width strings sized to the longest value in the batch
+SCHEMA = {
+    'semesters': {
+        'registration_number': 'U',
+        'admission_year': 'int32',
+        'branch_code': 'U',
+        'college_code': 'U',
+        'semester': 'int32',
+        'exam_year': 'int32',
+        'sgpa': 'float64',
+        'cgpa': 'float64',
+        'result': 'U',
+    },
+    'subjects': {
+        'registration_number': 'U',
+        'admission_year': 'int32',
+        'branch_code': 'U',
+        'college_code': 'U',
+        'semester': 'int32',
+        'subject_code': 'U',
+        'subject_name': 'U',
+        'marks': 'float64',
+        'grade': 'U',
+        'passed': 'bool',
+    },
+}
+
+
+def _column(np, values, dtype):
+    # Missing numbers become NaN (floats) or 0 (integers); missing strings become ''
+    if dtype == 'U':
+        values = ['' if value is None else str(value) for value in values]
+        width = max((len(value) for value in values), default=0)
+        return np.array(values, dtype=f'U{max(width, 1)}')
+    if dtype == 'float64':
+        return np.array([float('nan') if value is None else value for value in values], dtype=dtype)
+    return np.array([0 if value is None else value for value in values], dtype=dtype)
+
+
+class SnapshotStore:
+    """Directory of per-batch columnar snapshots, written from the warehouse and read memory-mapped"""
+
+    def __init__(self, directory=DEFAULT_SNAPSHOT_DIR):
+        self.directory = directory
+
+    def path(self, branch_code, admission_year):
+        return os.path.join(self.directory, f'{branch_code}_{int(admission_year)}')
+
+    def freeze(self, warehouse, branch_code, admission_year):
+        """Write (or rewrite) the snapshot of one batch and return its manifest"""
+        import numpy as np
+
+        semester_rows, subject_rows = warehouse.batch_rows(branch_code, admission_year)
+        for row in subject_rows:
+            row['passed'] = bool(row['grade']) and row['grade'].upper() not in BACKLOG_GRADES
+        tables = {'semesters': semester_rows, 'subjects': subject_rows}
+
+        target = self.path(branch_code, admission_year)
+        staging = f'{target}.tmp-{os.getpid()}'
+        shutil.rmtree(staging, ignore_errors=True)
+        manifest = {
+            'version': SNAPSHOT_VERSION,
+            'branch_code': str(branch_code),
+            'admission_year': int(admission_year),
+            'created_at': time.time(),
+            'tables': {}
+        }
+        for table, rows in tables.items():
+            os.makedirs(os.path.join(staging, table))
+            columns = {}
+            for name, dtype in SCHEMA[table].items():
+                array = _column(np, [row[name] for row in rows], dtype)
+                np.save(os.path.join(staging, table, f'{name}.npy'), array)
+                columns[name] = array.dtype.str
+            manifest['tables'][table] = {'rows': len(rows), 'columns': columns}
+        with open(os.path.join(staging, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+        # Swap the finished directory in so readers never see a half-written snapshot
+        previous = f'{target}.old-{os.getpid()}'
+        if os.path.exists(target):
+            os.replace(target, previous)
+        os.replace(staging, target)
+        shutil.rmtree(previous, ignore_errors=True)
+        return manifest
+
+    def manifest(self, branch_code, admission_year):
+        """Manifest of one snapshot, or None when the batch has not been frozen"""
+        try:
+            with open(os.path.join(self.path(branch_code, admission_year), 'manifest.json'), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def list(self):
+        """Manifests of every frozen batch, by branch then admission year"""
+        if not os.path.isdir(self.directory):
+            return []
+        manifests = []
+        for name in sorted(os.listdir(self.directory)):
+            if '.' in name or '_' not in name:
+                continue
+            branch_code, admission_year = name.rsplit('_', 1)
+            manifest = self.manifest(branch_code, admission_year)
+            if manifest:
+                manifests.append(manifest)
+        return manifests
+
+    def columns(self, table, branch_code, admission_year, names):
+        """Memory-mapped arrays of the requested columns of one table, or None when the batch is not frozen"""
+        import numpy as np
+
+        if table not in SCHEMA:
+            raise ValueError(f"Unknown table '{table}', expected one of {sorted(SCHEMA)}")
+        unknown = [name for name in names if name not in SCHEMA[table]]
+        if unknown:
+            raise ValueError(f"Unknown {table} columns: {unknown}")
+        directory = os.path.join(self.path(branch_code, admission_year), table)
+        if not os.path.isdir(directory):
+            return None
+        return {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r') for name in names}
+
+
+def _batches(store, branch_code, admission_years):
+    if admission_years:
+        return [int(year) for year in admission_years]
+    return [manifest['admission_year'] for manifest in store.list() if manifest['branch_code'] == str(branch_code)]
+
+
+def sgpa_trend(store, branch_code, admission_years=None, semester=None):
+    """Mean, median, best SGPA and student count per (batch, semester) of one branch"""
+    import numpy as np
+
+    rows = []
+    for admission_year in _batches(store, branch_code, admission_years):
+        columns = store.columns('semesters', branch_code, admission_year, ['semester', 'sgpa'])
+        if columns is None:
+            continue
+        semesters, sgpa = columns['semester'], columns['sgpa']
+        keep = ~np.isnan(sgpa)
+        if semester not in (None, ''):
+            keep &= semesters == int(semester)
+        semesters, sgpa = semesters[keep], sgpa[keep]
+        # Sort once by (semester, sgpa) so every group is a contiguous, already ordered run
+        order = np.lexsort((sgpa, semesters))
+        semesters, sgpa = semesters[order], sgpa[order]
+        values, starts, counts = np.unique(semesters, return_index=True, return_counts=True)
+        for value, start, count in zip(values, starts, counts):
+            group = sgpa[start:start + count]
+            rows.append({
+                'admission_year': admission_year,
+                'semester': int(value),
+                'students': int(count),
+                'mean_sgpa': round(float(group.mean()), 3),
+                'median_sgpa': round(float(np.median(group)), 3),
+                'max_sgpa': float(group[-1])
+            })
+    return rows
+
+
+def subject_pass_rates(store, branch_code, admission_years=None, subject=None, semester=None):
+    """Appearances, passes, pass rate and mean marks per (batch, subject) of one branch"""
+    import numpy as np
+
+    rows = []
+    for admission_year in _batches(store, branch_code, admission_years):
+        columns = store.columns(
+            'subjects', branch_code, admission_year, ['semester', 'subject_code', 'marks', 'passed']
+        )
+        if columns is None:
+            continue
+        keep = np.ones(len(columns['semester']), dtype=bool)
+        if semester not in (None, ''):
+            keep &= columns['semester'] == int(semester)
+        if subject:
+            keep &= columns['subject_code'] == subject
+        codes = columns['subject_code'][keep]
+        semesters = columns['semester'][keep]
+        marks = columns['marks'][keep]
+        passed = columns['passed'][keep]
+        values, first, inverse, counts = np.unique(codes, return_index=True, return_inverse=True, return_counts=True)
+        passes = np.bincount(inverse, weights=passed, minlength=len(values))
+        marked = ~np.isnan(marks)
+        marks_total = np.bincount(inverse[marked], weights=marks[marked], minlength=len(values))
+        marks_count = np.bincount(inverse[marked], minlength=len(values))
+        for index, code in enumerate(values):
+            if not code:
+                continue
+            rows.append({
+                'admission_year': admission_year,
+                'subject_code': str(code),
+                'semester': int(semesters[first[index]]),
+                'appeared': int(counts[index]),
+                'passed': int(passes[index]),
+                'pass_rate': round(float(passes[index]) / counts[index] * 100, 2),
+                'mean_marks': round(float(marks_total[index] / marks_count[index]), 2) if marks_count[index] else None
+            })
+    return rows
+
+
+COHORT_VIEWS = {
+    'sgpa_trend': sgpa_trend,
+    'pass_rates': subject_pass_rates,
+}
@@ -0,0 +1,277 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from result_cache import DATA_DIR, exam_key
+
+DEFAULT_WAREHOUSE_PATH = os.path.join(DATA_DIR, 'warehouse.sqlite3')
+
+# Registration numbers are YY BBB CCC NNN: admission year, branch, college, roll
+REGISTRATION_PATTERN = re.compile(r'^(\d{2})(\d{3})(\d{3})(\d{3})$')
+SUBJECT_CODE_PATTERN = re.compile(r'^\d{5,6}[A-Z]?$')
+BACKLOG_GRADES = ('F', 'AB')
+# Filters every /query view accepts (see ResultWarehouse._student_filters)
+STUDENT_FILTERS = ('branch', 'admission_year', 'college', 'semester')
+
+SCHEMA = [
+    'CREATE TABLE IF NOT EXISTS students ('
+    ' registration_number TEXT PRIMARY KEY,'
+    ' name TEXT,'
+    ' admission_year INTEGER,'
+    ' branch_code TEXT,'
+    ' college_code TEXT,'
+    ' updated_at REAL NOT NULL)',
+    'CREATE TABLE IF NOT EXISTS semester_results ('
+    ' registration_number TEXT NOT NULL,'
+    ' semester INTEGER NOT NULL,'
+    ' exam_key TEXT,'
+    ' exam_year INTEGER,'
+    ' sgpa REAL,'
+    ' cgpa REAL,'
+    ' result TEXT,'
+    ' updated_at REAL NOT NULL,'
+    ' PRIMARY KEY (registration_number, semester))',
+    'CREATE TABLE IF NOT EXISTS subject_results ('
+    ' registration_number TEXT NOT NULL,'
+    ' semester INTEGER NOT NULL,'
+    ' subject_key TEXT NOT NULL,'
+    ' subject_code TEXT,'
+    ' subject_name TEXT,'
+    ' marks REAL,'
+    ' grade TEXT,'
+    ' PRIMARY KEY (registration_number, semester, subject_key))',
+    'CREATE INDEX IF NOT EXISTS students_by_branch ON students (branch_code, admission_year)',
+    'CREATE INDEX IF NOT EXISTS students_by_year ON students (admission_year)',
+    'CREATE INDEX IF NOT EXISTS semester_results_by_semester ON semester_results (semester, sgpa)',
+    'CREATE INDEX IF NOT EXISTS semester_results_by_update ON semester_results (updated_at)',
+    'CREATE INDEX IF NOT EXISTS subject_results_by_code ON subject_results (subject_code, grade)',
+    'CREATE INDEX IF NOT EXISTS subject_results_by_grade ON subject_results (grade, semester)',
+]
+
+
+def split_registration_number(registration_number):
+    """Return (admission_year, branch_code, college_code) or None for a malformed number"""
+    match = REGISTRATION_PATTERN.match(str(registration_number))
+    if not match:
+        return None
+    return 2000 + int(match.group(1)), match.group(2), match.group(3)
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class ResultWarehouse:
+    """Indexed SQLite store of every parsed result, queried by /query without touching the portal"""
+
+    def __init__(self, path=DEFAULT_WAREHOUSE_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            for statement in SCHEMA:
+                conn.execute(statement)
+
+    def _connect(self):
+        # One connection per thread; sqlite3 connections must not cross threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def store_results(self, semester_link, results):
+        """Upsert the successfully parsed results of one semester, returning how many were stored"""
+        now = time.time()
+        key = exam_key(semester_link) if semester_link else None
+        students, semesters, subjects, replaced = [], [], [], []
+        for result in results:
+            parts = split_registration_number(result.get('registration_number'))
+            semester = _int(result.get('semester'))
+            if result.get('error') or not parts or semester is None:
+                continue
+            registration_number = result['registration_number']
+            students.append((registration_number, result.get('name') or None) + parts + (now,))
+            semesters.append((
+                registration_number, semester, key, _int(result.get('year')),
+                _number(result.get('sgpa')), _number(result.get('cgpa')), result.get('result') or None, now
+            ))
+            replaced.append((registration_number, semester))
+            for subject_key, details in (result.get('subjects') or {}).items():
+                code = details.get('code') or (subject_key if SUBJECT_CODE_PATTERN.match(subject_key) else None)
+                name = details.get('name') or (None if code == subject_key else subject_key)
+                subjects.append((
+                    registration_number, semester, subject_key, code, name,
+                    _number(details.get('marks')), (details.get('grade') or '').upper() or None
+                ))
+
+        if not students:
+            return 0
+        with self._connect() as conn:
+            # Keep a known name when a later page (e.g. a no-name special exam page) lacks one
+            conn.executemany(
+                'INSERT INTO students (registration_number, name, admission_year, branch_code, college_code, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (registration_number) DO UPDATE SET '
+                'name = COALESCE(excluded.name, students.name), updated_at = excluded.updated_at',
+                students
+            )
+            conn.executemany(
+                'INSERT OR REPLACE INTO semester_results '
+                '(registration_number, semester, exam_key, exam_year, sgpa, cgpa, result, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', semesters
+            )
+            conn.executemany('DELETE FROM subject_results WHERE registration_number = ? AND semester = ?', replaced)
+            conn.executemany(
+                'INSERT OR REPLACE INTO subject_results '
+                '(registration_number, semester, subject_key, subject_code, subject_name, marks, grade) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)', subjects
+            )
+        return len(semesters)
+
+    def _rows(self, sql, params):
+        return [dict(row) for row in self._connect().execute(sql, params).fetchall()]
+
+    @staticmethod
+    def _check_filters(filters, allowed):
+        # A misspelt filter would otherwise be ignored and widen the query without any sign
+        unknown = sorted(set(filters) - set(allowed))
+        if unknown:
+            raise ValueError(f"Unknown filters {unknown}, expected some of {sorted(allowed)}")
+
+    @staticmethod
+    def _student_filters(filters, params):
+        clauses = []
+        for column, name in (('s.branch_code', 'branch'), ('s.admission_year', 'admission_year'),
+                             ('s.college_code', 'college'), ('r.semester', 'semester')):
+            if filters.get(name) not in (None, ''):
+                clauses.append(f"{column} = ?")
+                params.append(filters[name])
+        return clauses
+
+    def students(self, limit=100, offset=0, **filters):
+        """Semester results joined with student details, optionally filtered and bounded by SGPA"""
+        self._check_filters(filters, STUDENT_FILTERS + ('min_sgpa', 'max_sgpa'))
+        params = []
+        clauses = self._student_filters(filters, params)
+        if filters.get('min_sgpa') not in (None, ''):
+            clauses.append('r.sgpa >= ?')
+            params.append(float(filters['min_sgpa']))
+        if filters.get('max_sgpa') not in (None, ''):
+            clauses.append('r.sgpa <= ?')
+            params.append(float(filters['max_sgpa']))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        return self._rows(
+            'SELECT s.registration_number, s.name, s.branch_code, s.admission_year, r.semester, r.sgpa, r.cgpa, r.result '
+            f'FROM semester_results r JOIN students s USING (registration_number) {where} '
+            'ORDER BY s.registration_number, r.semester LIMIT ? OFFSET ?',
+            params + [int(limit), int(offset)]
+        )
+
+    def backlogs(self, subject=None, limit=1000, offset=0, **filters):
+        """Students holding a failing grade, optionally in one subject (code or part of its name)"""
+        self._check_filters(filters, STUDENT_FILTERS)
+        params = list(BACKLOG_GRADES)
+        clauses = [f"m.grade IN ({','.join('?' * len(BACKLOG_GRADES))})"]
+        clauses.extend(self._student_filters(filters, params))
+        if subject:
+            if SUBJECT_CODE_PATTERN.match(subject):
+                clauses.append('m.subject_code = ?')
+                params.append(subject)
+            else:
+                clauses.append('m.subject_name LIKE ?')
+                params.append(f"%{subject}%")
+        return self._rows(
+            'SELECT s.registration_number, s.name, s.branch_code, s.admission_year, m.semester, '
+            'm.subject_code, m.subject_name, m.marks, m.grade '
+            'FROM subject_results m JOIN students s USING (registration_number) '
+            'JOIN semester_results r ON r.registration_number = m.registration_number AND r.semester = m.semester '
+            f"WHERE {' AND '.join(clauses)} ORDER BY s.branch_code, s.registration_number, m.semester LIMIT ? OFFSET ?",
+            params + [int(limit), int(offset)]
+        )
+
+    def toppers(self, n=10, by='sgpa', **filters):
+        """Top n students per branch by SGPA of one semester, or by CGPA (as of a semester, else each student's latest)"""
+        self._check_filters(filters, STUDENT_FILTERS)
+        if by not in ('sgpa', 'cgpa'):
+            raise ValueError(f"Unknown ranking '{by}', expected 'sgpa' or 'cgpa'")
+        # Without a semester every semester row would compete, so one student could take several places
+        if by == 'sgpa' and filters.get('semester') in (None, ''):
+            raise ValueError('SGPA toppers need a semester')
+        order_column = f"r.{by}"
+        params = []
+        clauses = self._student_filters(filters, params) + [f"{order_column} IS NOT NULL"]
+        if by == 'cgpa' and filters.get('semester') in (None, ''):
+            clauses.append(
+                'r.semester = (SELECT MAX(l.semester) FROM semester_results l '
+                'WHERE l.registration_number = r.registration_number AND l.cgpa IS NOT NULL)'
+            )
+        return self._rows(
+            'SELECT * FROM ('
+            ' SELECT s.registration_number, s.name, s.branch_code, s.admission_year, r.semester, r.sgpa, r.cgpa,'
+            f' ROW_NUMBER() OVER (PARTITION BY s.branch_code ORDER BY {order_column} DESC, s.registration_number) AS rank'
+            ' FROM semester_results r JOIN students s USING (registration_number)'
+            f" WHERE {' AND '.join(clauses)}"
+            ') WHERE rank <= ? ORDER BY branch_code, rank',
+            params + [int(n)]
+        )
+
+    def ranking_rows(self, since=None):
+        """Semester scores and subject marks with their student's batch, for the in-memory rank index
+
+        With since, only semesters stored after that time (and their subjects) are returned.
+        """
+        since = -1 if since is None else since
+        semester_rows = self._rows(
+            'SELECT s.registration_number, s.name, s.branch_code, s.admission_year, r.semester, r.sgpa, r.cgpa, '
+            'r.updated_at FROM semester_results r JOIN students s USING (registration_number) '
+            'WHERE r.updated_at > ? AND s.branch_code IS NOT NULL AND s.admission_year IS NOT NULL',
+            [since]
+        )
+        subject_rows = self._rows(
+            'SELECT m.registration_number, m.semester, m.subject_code, m.marks FROM subject_results m '
+            'JOIN semester_results r ON r.registration_number = m.registration_number AND r.semester = m.semester '
+            'WHERE r.updated_at > ? AND m.subject_code IS NOT NULL AND m.marks IS NOT NULL',
+            [since]
+        )
+        return semester_rows, subject_rows
+
+    def batch_rows(self, branch_code, admission_year):
+        """Every semester result and subject mark of one batch, in long format, for freezing into a snapshot"""
+        params = [str(branch_code), int(admission_year)]
+        semester_rows = self._rows(
+            'SELECT s.registration_number, s.admission_year, s.branch_code, s.college_code, r.semester, r.exam_year, '
+            'r.sgpa, r.cgpa, r.result '
+            'FROM semester_results r JOIN students s USING (registration_number) '
+            'WHERE s.branch_code = ? AND s.admission_year = ? ORDER BY s.registration_number, r.semester',
+            params
+        )
+        subject_rows = self._rows(
+            'SELECT s.registration_number, s.admission_year, s.branch_code, s.college_code, m.semester, '
+            'm.subject_code, m.subject_name, m.marks, m.grade '
+            'FROM subject_results m JOIN students s USING (registration_number) '
+            'WHERE s.branch_code = ? AND s.admission_year = ? ORDER BY s.registration_number, m.semester, m.subject_key',
+            params
+        )
+        return semester_rows, subject_rows
+
+    def stats(self):
+        conn = self._connect()
+        return {
+            table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+            for table in ('students', 'semester_results', 'subject_results')
+        }
@@ -0,0 +1,257 @@
+import os
+import re
+import hashlib
+import heapq
+import itertools
+import logging
+import threading
+from datetime import datetime
+from scraper import BEUResultScraper
+from result_cache import exam_key
+from processor import select_semester_links
+from metrics import WATCHER_POLLS, PREWARM_STUDENTS
+
+logger = logging.getLogger(__name__)
+
+# The exam table is the only part of the homepage we care about
+EXAM_TABLE_PATTERN = re.compile(r'<table\b.*?</table>', re.IGNORECASE | re.DOTALL)
+
+# Pre-scrapes yield to interactive jobs: a lower priority value runs first
+PRIORITY_NEW_EXAM = 10
+PRIORITY_REPUBLISHED_EXAM = 20
+
+
+def exam_table_digest(page_source):
+    """SHA-256 of the homepage tables with whitespace collapsed, so cosmetic changes elsewhere are ignored"""
+    tables = EXAM_TABLE_PATTERN.findall(page_source) or [page_source]
+    normalized = re.sub(r'\s+', ' ', ''.join(tables))
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+def semester_exams(link, links):
+    """The exam to pre-scrape for a newly published link, with its semester's other attempts
+
+    Pre-scraping a special/arrear exam (or a re-published regular one) on its own would store that single
+    attempt over the student's merged record in the warehouse, so the whole attempt set is scraped instead.
+    """
+    admission_year = link.get('batch_admission_year')
+    if not admission_year:
+        return link
+    for semester_link in select_semester_links(links, admission_year, admission_year + 4, [link['semester']]):
+        if any(exam_key(exam) == exam_key(link) for exam in semester_link.get('attempts') or [semester_link]):
+            return semester_link
+    return link
+
+
+class PublicationWatcher:
+    """Polls the results homepage and pre-scrapes newly published exams into the result cache"""
+
+    def __init__(self, cache, branch_codes, interval=300, max_students=120, stop_after_missing=20,
+                 concurrency=2, max_concurrency=8, scraper_factory=BEUResultScraper, warehouse=None, rank_index=None,
+                 leases=None, owner=None):
+        self.cache = cache
+        # With a shared lease store (jobs.JobRegistry), only the process holding the lease polls and pre-scrapes
+        self.leases = leases
+        self.owner = owner
+        self.warehouse = warehouse
+        self.rank_index = rank_index
+        self.branch_codes = dict(branch_codes)
+        self.interval = interval
+        self.max_students = max_students
+        self.stop_after_missing = stop_after_missing
+        self.concurrency = concurrency
+        self.max_concurrency = max_concurrency
+        self.scraper_factory = scraper_factory
+
+        self._etag = None
+        self._last_modified = None
+        self._digest = None
+        self._queue = []
+        self._sequence = itertools.count()
+        self._queue_ready = threading.Condition()
+        self._stop = threading.Event()
+        self._threads = []
+        self.status = {
+            'last_poll': None,
+            'last_change': None,
+            'polls': 0,
+            'queued': 0,
+            'prewarming': None,
+            'prewarmed_exams': 0,
+            'last_error': None,
+            'leader': leases is None
+        }
+
+    def start(self):
+        """Start the polling and pre-scrape threads"""
+        for name, target in (('publication-watcher', self._poll_loop), ('result-prewarmer', self._prewarm_loop)):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info("Publication watcher started (interval %ss, %d branches)", self.interval, len(self.branch_codes))
+        return self
+
+    def stop(self):
+        self._stop.set()
+        with self._queue_ready:
+            self._queue_ready.notify_all()
+
+    def is_leader(self):
+        """Take or renew the watcher lease; it outlives two poll intervals so a live leader never loses it"""
+        if self.leases is None:
+            return True
+        leader = self.leases.claim_lease('publication-watcher', self.owner, self.interval * 2 + 60)
+        if leader != self.status['leader']:
+            logger.info("Publication watcher %s", 'took the lease' if leader else 'is standing by: another worker polls')
+        self.status['leader'] = leader
+        return leader
+
+    def _poll_loop(self):
+        while not self._stop.is_set():
+            try:
+                if self.is_leader():
+                    self.poll_once()
+            except Exception as e:
+                logger.warning("Publication watcher poll failed: %s", e)
+                self.status['last_error'] = str(e)
+            self._stop.wait(self.interval)
+
+    def poll_once(self, scraper=None):
+        """Check the homepage once and queue pre-scrapes for new or re-published exams"""
+        scraper = scraper or self.scraper_factory()
+        self.status['polls'] += 1
+        self.status['last_poll'] = datetime.now().isoformat(timespec='seconds')
+
+        # Conditional GET: a 304 costs the portal (and us) next to nothing
+        headers = {}
+        if self._etag:
+            headers['If-None-Match'] = self._etag
+        if self._last_modified:
+            headers['If-Modified-Since'] = self._last_modified
+        response = scraper.session.get(scraper.base_url, headers=headers, timeout=scraper.request_timeout)
+        if response.status_code == 304:
+            WATCHER_POLLS.inc(result='not_modified')
+            return []
+        response.raise_for_status()
+        self._etag = response.headers.get('ETag')
+        self._last_modified = response.headers.get('Last-Modified')
+
+        # The portal is ASP.NET and rarely sends validators, so fall back to hashing the exam table
+        digest = exam_table_digest(response.text)
+        if digest == self._digest:
+            WATCHER_POLLS.inc(result='unchanged')
+            return []
+        self._digest = digest
+        WATCHER_POLLS.inc(result='changed')
+
+        links = scraper.parse_result_links(response.text)
+        known = self.cache.known_exams()
+        first_run = not known
+        new_links = [link for link in links if exam_key(link) not in known]
+        # Same exam and batch already seen under an older published_date means a re-publication
+        seen_exams = {key.rsplit('|', 1)[0] for key in known}
+        queued = set()
+
+        for link in new_links:
+            self.cache.mark_exam_seen(link)
+            if first_run:
+                # The first poll only records what is already published
+                continue
+            republished = f"{link['text']}|{link['batch_session']}" in seen_exams
+            logger.info("%s exam detected: %s (Batch: %s, Published: %s)",
+                        'Re-published' if republished else 'New', link['text'],
+                        link['batch_session'], link['published_date'])
+            # A new regular and special exam of one semester share a single pre-scrape of the semester
+            semester_link = semester_exams(link, links)
+            if exam_key(semester_link) not in queued:
+                queued.add(exam_key(semester_link))
+                self.enqueue(semester_link, PRIORITY_REPUBLISHED_EXAM if republished else PRIORITY_NEW_EXAM)
+
+        if new_links and not first_run:
+            self.status['last_change'] = self.status['last_poll']
+        return [] if first_run else new_links
+
+    def enqueue(self, semester_link, priority=PRIORITY_NEW_EXAM):
+        with self._queue_ready:
+            heapq.heappush(self._queue, (priority, next(self._sequence), semester_link))
+            self.status['queued'] = len(self._queue)
+            self._queue_ready.notify()
+
+    def _prewarm_loop(self):
+        while not self._stop.is_set():
+            with self._queue_ready:
+                while not self._queue and not self._stop.is_set():
+                    self._queue_ready.wait()
+                if self._stop.is_set():
+                    return
+                _, _, semester_link = heapq.heappop(self._queue)
+                self.status['queued'] = len(self._queue)
+            try:
+                self.prewarm(semester_link)
+            except Exception as e:
+                logger.warning("Pre-scrape of %s failed: %s", semester_link['text'], e)
+                self.status['last_error'] = str(e)
+
+    def prewarm(self, semester_link):
+        """Scrape every configured branch of one exam into the result cache"""
+        admission_year = semester_link.get('batch_admission_year')
+        if not admission_year:
+            logger.info("Skipping pre-scrape of %s: no admission year in batch %s",
+                        semester_link['text'], semester_link['batch_session'])
+            return 0
+
+        self.status['prewarming'] = semester_link['text']
+        # A small window keeps the pre-scrape from crowding out interactive jobs on the same portal
+        scraper = self.scraper_factory(initial_concurrency=self.concurrency, max_concurrency=self.max_concurrency)
+        scraper.cache = self.cache
+        scraper.warehouse = self.warehouse
+        scraper.rank_index = self.rank_index
+        cached = 0
+        try:
+            for branch_name, branch_code in self.branch_codes.items():
+                cached += self._prewarm_branch(scraper, semester_link, admission_year, branch_code)
+            for exam_link in semester_link.get('attempts') or [semester_link]:
+                self.cache.mark_exam_prewarmed(exam_link)
+            self.status['prewarmed_exams'] += 1
+            logger.info("Pre-scraped %s: %d results cached", semester_link['text'], cached)
+        finally:
+            self.status['prewarming'] = None
+            scraper.close_driver()
+        return cached
+
+    def _prewarm_branch(self, scraper, semester_link, admission_year, branch_code):
+        # Registration numbers are dense from 001, so stop once a whole chunk has no record
+        chunk_size = max(self.stop_after_missing, 1)
+        cached = 0
+        for start in range(1, self.max_students + 1, chunk_size):
+            if self._stop.is_set():
+                break
+            end = min(start + chunk_size - 1, self.max_students)
+            reg_numbers = scraper.generate_registration_numbers(admission_year, branch_code, start, end)
+            if semester_link.get('attempts'):
+                # Attempts are merged before anything reaches the warehouse or the rank index
+                results = scraper.scrape_multiple_semesters([semester_link], reg_numbers, admission_year)
+            else:
+                results = scraper.scrape_semester_results(semester_link, reg_numbers)
+            found = [result for result in results if not result.get('error')]
+            cached += len(found)
+            PREWARM_STUDENTS.inc(len(found))
+            if all(result.get('no_record') for result in results):
+                break
+        return cached
+
+
+def watcher_from_env(cache, branch_codes, warehouse=None, rank_index=None, leases=None, owner=None):
+    """Build a watcher from BEU_WATCH_* settings, or None when BEU_WATCH_PUBLICATIONS is off"""
+    if os.environ.get('BEU_WATCH_PUBLICATIONS', '').lower() not in ('1', 'true', 'yes'):
+        return None
+    return PublicationWatcher(
+        cache,
+        branch_codes,
+        interval=float(os.environ.get('BEU_WATCH_INTERVAL', 300)),
+        max_students=int(os.environ.get('BEU_PREWARM_MAX_STUDENTS', 120)),
+        warehouse=warehouse,
+        rank_index=rank_index,
+        leases=leases,
+        owner=owner
+    )
@@ -0,0 +1,294 @@
+"""Multi-sheet .xlsx writer that renders its sheets in parallel worker processes.
+
+Sheets are laid out and serialised to SpreadsheetML by worker processes,
+each writing one worksheet part to a scratch directory. Cells use inline
+strings and every sheet shares the fixed style table below, so the parts
+need nothing from each other and are zipped into one workbook at the end.
+"""
+import os
+import re
+import shutil
+import tempfile
+import zipfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Cell styles (indexes into cellXfs in STYLES_XML), matching the formatted single-sheet export
+STYLE_DEFAULT = 0
+STYLE_TITLE = 1
+STYLE_SUBTITLE = 2
+STYLE_HEADER = 3
+STYLE_SEMESTER = 4
+STYLE_SUBHEADER = 5
+STYLE_SUBJECT_HEADER = 6
+STYLE_DATA = 7
+STYLE_DATA_LEFT = 8
+
+MAX_SHEET_TITLE = 31
+INVALID_TITLE_CHARS = set('[]:*?/\\')
+# Control characters XML 1.0 does not allow; Excel will not open a workbook containing one
+INVALID_XML_CHARS = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+MAIN_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+_CENTER = '<alignment horizontal="center" vertical="center"/>'
+STYLES_XML = (
+    XML_DECLARATION +
+    f'<styleSheet xmlns="{MAIN_NS}">'
+    '<fonts count="7">'
+    '<font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="14"/><color rgb="FFFFFFFF"/><name val="Arial"/></font>'
+    '<font><b/><sz val="12"/><name val="Arial"/></font>'
+    '<font><b/><sz val="10"/><name val="Arial"/></font>'
+    '<font><b/><sz val="9"/><name val="Arial"/></font>'
+    '<font><b/><sz val="8"/><name val="Arial"/></font>'
+    '<font><sz val="9"/><name val="Arial"/></font>'
+    '</fonts>'
+    '<fills count="5">'
+    '<fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill>'
+    '<fill><patternFill patternType="solid"><fgColor rgb="FF366092"/><bgColor rgb="FF366092"/></patternFill></fill>'
+    '<fill><patternFill patternType="solid"><fgColor rgb="FFD9E2F3"/><bgColor rgb="FFD9E2F3"/></patternFill></fill>'
+    '<fill><patternFill patternType="solid"><fgColor rgb="FFE2EFDA"/><bgColor rgb="FFE2EFDA"/></patternFill></fill>'
+    '</fills>'
+    '<borders count="2">'
+    '<border><left/><right/><top/><bottom/><diagonal/></border>'
+    '<border><left style="thin"/><right style="thin"/><top style="thin"/><bottom style="thin"/><diagonal/></border>'
+    '</borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="9">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    f'<xf numFmtId="0" fontId="1" fillId="2" borderId="0" xfId="0" applyFont="1" applyFill="1" applyAlignment="1">{_CENTER}</xf>'
+    f'<xf numFmtId="0" fontId="2" fillId="3" borderId="0" xfId="0" applyFont="1" applyFill="1" applyAlignment="1">{_CENTER}</xf>'
+    f'<xf numFmtId="0" fontId="3" fillId="0" borderId="1" xfId="0" applyFont="1" applyBorder="1" applyAlignment="1">{_CENTER}</xf>'
+    f'<xf numFmtId="0" fontId="3" fillId="4" borderId="1" xfId="0" applyFont="1" applyFill="1" applyBorder="1" applyAlignment="1">{_CENTER}</xf>'
+    f'<xf numFmtId="0" fontId="4" fillId="0" borderId="1" xfId="0" applyFont="1" applyBorder="1" applyAlignment="1">{_CENTER}</xf>'
+    f'<xf numFmtId="0" fontId="5" fillId="0" borderId="1" xfId="0" applyFont="1" applyBorder="1" applyAlignment="1">{_CENTER}</xf>'
+    f'<xf numFmtId="0" fontId="6" fillId="0" borderId="1" xfId="0" applyFont="1" applyBorder="1" applyAlignment="1">{_CENTER}</xf>'
+    '<xf numFmtId="0" fontId="6" fillId="0" borderId="1" xfId="0" applyFont="1" applyBorder="1"/>'
+    '</cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+
+def escape(text):
+    """XML-escape cell text and drop invalid control characters (xml.sax.saxutils alone would add ~15 ms to importing the processor)"""
+    return INVALID_XML_CHARS.sub('', text).replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def column_letter(index):
+    """Spreadsheet column letter for a 1-based column index"""
+    letters = ''
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def sheet_title(title, taken):
+    """Excel-safe sheet title (31 characters, no []:*?/\\), made unique among `taken`"""
+    title = INVALID_XML_CHARS.sub('', title)
+    title = ''.join('_' if char in INVALID_TITLE_CHARS else char for char in title)[:MAX_SHEET_TITLE] or 'Sheet'
+    candidate, counter = title, 2
+    while candidate.lower() in taken:
+        suffix = f' ({counter})'
+        candidate = title[:MAX_SHEET_TITLE - len(suffix)] + suffix
+        counter += 1
+    taken.add(candidate.lower())
+    return candidate
+
+
+class Sheet:
+    """Cells, merged ranges and layout of one worksheet before it is serialised"""
+
+    def __init__(self):
+        self.rows = {}
+        self.merges = []
+        self.row_heights = {}
+        self.widths = {}
+        self.freeze = None
+
+    def set(self, row, column, value, style=STYLE_DEFAULT):
+        self.rows.setdefault(row, {})[column] = (value, style)
+
+    def merge(self, first_row, first_column, last_row, last_column):
+        self.merges.append(
+            f'{column_letter(first_column)}{first_row}:{column_letter(last_column)}{last_row}'
+        )
+
+    def fit_columns(self, minimum=10, maximum=25):
+        """Width of each column from its longest value, clamped like the single-sheet export"""
+        lengths = {}
+        for cells in self.rows.values():
+            for column, (value, _) in cells.items():
+                if value not in (None, ''):
+                    lengths[column] = max(lengths.get(column, 0), len(str(value)))
+        for column, length in lengths.items():
+            self.widths[column] = min(max(length + 2, minimum), maximum)
+
+    def to_xml(self):
+        parts = [XML_DECLARATION, f'<worksheet xmlns="{MAIN_NS}" xmlns:r="{REL_NS}">']
+        if self.freeze:
+            row, column = self.freeze
+            split = f'xSplit="{column - 1}" ' if column > 1 else ''
+            parts.append(
+                '<sheetViews><sheetView workbookViewId="0">'
+                f'<pane {split}ySplit="{row - 1}" topLeftCell="{column_letter(column)}{row}" '
+                f'activePane="{"bottomRight" if split else "bottomLeft"}" state="frozen"/></sheetView></sheetViews>'
+            )
+        if self.widths:
+            parts.append('<cols>')
+            parts.extend(
+                f'<col min="{column}" max="{column}" width="{width}" customWidth="1"/>'
+                for column, width in sorted(self.widths.items())
+            )
+            parts.append('</cols>')
+        parts.append('<sheetData>')
+        letters = {}
+        for row in sorted(set(self.rows) | set(self.row_heights)):
+            height = self.row_heights.get(row)
+            parts.append(f'<row r="{row}" ht="{height}" customHeight="1">' if height else f'<row r="{row}">')
+            cells = self.rows.get(row, {})
+            for column in sorted(cells):
+                value, style = cells[column]
+                letter = letters.get(column) or letters.setdefault(column, column_letter(column))
+                if value is None or value == '':
+                    parts.append(f'<c r="{letter}{row}" s="{style}"/>')
+                elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                    parts.append(f'<c r="{letter}{row}" s="{style}"><v>{value}</v></c>')
+                else:
+                    parts.append(f'<c r="{letter}{row}" s="{style}" t="inlineStr"><is><t>{escape(str(value))}</t></is></c>')
+            parts.append('</row>')
+        parts.append('</sheetData>')
+        if self.merges:
+            parts.append(f'<mergeCells count="{len(self.merges)}">')
+            parts.extend(f'<mergeCell ref="{ref}"/>' for ref in self.merges)
+            parts.append('</mergeCells>')
+        parts.append('</worksheet>')
+        return ''.join(parts)
+
+
+def render_sheet(build, args, filepath):
+    """Worker entry point: lay out one sheet with build(*args) and write its SpreadsheetML to filepath"""
+    with open(filepath, 'w', encoding='utf-8') as f:
+        f.write(build(*args).to_xml())
+    return filepath
+
+
+def _package_parts(titles):
+    """Workbook, relationship and content-type parts for sheets 1..n"""
+    count = len(titles)
+    content_types = (
+        XML_DECLARATION +
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/styles.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        + ''.join(
+            f'<Override PartName="/xl/worksheets/sheet{n}.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            for n in range(1, count + 1)
+        ) +
+        '</Types>'
+    )
+    root_rels = (
+        XML_DECLARATION +
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        f'<Relationship Id="rId1" Type="{REL_NS}/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    )
+    workbook = (
+        XML_DECLARATION +
+        f'<workbook xmlns="{MAIN_NS}" xmlns:r="{REL_NS}"><sheets>'
+        + ''.join(f'<sheet name="{escape(title).replace(chr(34), "&quot;")}" sheetId="{n}" r:id="rId{n}"/>' for n, title in enumerate(titles, 1)) +
+        '</sheets></workbook>'
+    )
+    workbook_rels = (
+        XML_DECLARATION +
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        + ''.join(
+            f'<Relationship Id="rId{n}" Type="{REL_NS}/worksheet" Target="worksheets/sheet{n}.xml"/>'
+            for n in range(1, count + 1)
+        ) +
+        f'<Relationship Id="rId{count + 1}" Type="{REL_NS}/styles" Target="styles.xml"/>'
+        '</Relationships>'
+    )
+    return [
+        ('[Content_Types].xml', content_types),
+        ('_rels/.rels', root_rels),
+        ('xl/workbook.xml', workbook),
+        ('xl/_rels/workbook.xml.rels', workbook_rels),
+        ('xl/styles.xml', STYLES_XML),
+    ]
+
+
+def _pool_context():
+    # Exports run inside threaded web workers; forking a process mid-way through another thread's logging or
+    # sqlite call can leave that lock held forever in the child, so workers start from a clean interpreter
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _pool(workers):
+    """Render processes kept between exports, since starting clean interpreters costs more than a small workbook"""
+    with _pools_lock:
+        if workers not in _pools:
+            _pools[workers] = ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context())
+        return _pools[workers]
+
+
+def _discard_pool(workers, executor):
+    with _pools_lock:
+        if _pools.get(workers) is executor:
+            del _pools[workers]
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def write_workbook(filepath, parts, workers=1):
+    """Write an .xlsx with one sheet per (title, build, args, weight) part, rendering up to `workers` sheets at once"""
+    taken = set()
+    titles = [sheet_title(title, taken) for title, _, _, _ in parts]
+    scratch = tempfile.mkdtemp(prefix='workbook_', dir=os.path.dirname(os.path.abspath(filepath)))
+    try:
+        sheet_paths = [os.path.join(scratch, f'sheet{n}.xml') for n in range(1, len(parts) + 1)]
+        if min(workers, len(parts)) > 1:
+            executor = _pool(workers)
+            # Heaviest sheets first so one large branch does not start last and hold up the whole workbook
+            order = sorted(range(len(parts)), key=lambda i: parts[i][3], reverse=True)
+            try:
+                futures = [executor.submit(render_sheet, parts[i][1], parts[i][2], sheet_paths[i]) for i in order]
+                for future in futures:
+                    future.result()
+            except BrokenProcessPool:
+                # A render process died; the next export starts a fresh pool
+                _discard_pool(workers, executor)
+                raise
+        else:
+            for (_, build, args, _), sheet_path in zip(parts, sheet_paths):
+                render_sheet(build, args, sheet_path)
+
+        with zipfile.ZipFile(filepath, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for name, content in _package_parts(titles):
+                archive.writestr(name, content)
+            for n, sheet_path in enumerate(sheet_paths, 1):
+                archive.write(sheet_path, f'xl/worksheets/sheet{n}.xml')
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    return filepath
+
+
+def workers_from_env():
+    """Worker processes for workbook exports: BEU_EXPORT_WORKERS, defaulting to the CPU count"""
+    return max(1, int(os.environ.get('BEU_EXPORT_WORKERS', os.cpu_count() or 1)))